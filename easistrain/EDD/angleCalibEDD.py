@@ -1,40 +1,61 @@
-from typing import Sequence, Union
+from typing import Optional, Sequence, Union
 import h5py
 import numpy as np
-import silx.math.fit.peaks
 import scipy.optimize
 import scipy.constants
 
 from easistrain.EDD.constants import pCstInkeVS, speedLightInAPerS
+from easistrain.EDD.calibrants import calibrantLines
+from easistrain.EDD.calibrationBoxes import calibrantLineEnergies, findCalibrationBoxes
+from easistrain.EDD.calibrationStore import calibrationResults
+from easistrain.EDD.io import (
+    H5File,
+    WritePolicy,
+    closeFile,
+    fileName,
+    openFile,
+    openedFile,
+    scanStartTime,
+)
 from easistrain.EDD.utils import (
-    calcBackground,
-    guessParameters,
+    calibrationFits,
     linefunc,
     run_from_cli,
-    splitPseudoVoigt,
     uChEConversion,
 )
 
 
 def angleCalibrationEDD(
-    fileRead: str,
-    fileSave: str,
+    fileRead: H5File,
+    fileSave: H5File,
     sample: str,
     dataset: str,
     scanNumber: Union[str, int],
     nameHorizontalDetector: str,
     nameVerticalDetector: str,
-    numberOfBoxes: int,
-    nbPeaksInBoxes: Sequence[int],
-    rangeFitHD: Sequence[int],
-    rangeFitVD: Sequence[int],
-    pathFileDetectorCalibration: str,
+    numberOfBoxes: Optional[int],
+    nbPeaksInBoxes: Optional[Sequence[int]],
+    rangeFitHD: Optional[Sequence[int]],
+    rangeFitVD: Optional[Sequence[int]],
+    pathFileDetectorCalibration: H5File,
     scanDetectorCalibration: str,
     sampleCalibrantFile: str,
+    writePolicy: Optional[dict] = None,
+    roughTwoTheta: Optional[Union[float, Sequence[float]]] = None,
+    boxSearch: Optional[dict] = None,
 ):
-    """Main function."""
+    """Main function.
+
+    When rangeFitHD or rangeFitVD is None, the boxes and the number of peaks in the boxes are found
+    in the patterns from the d-spacings of sampleCalibrantFile diffracted at roughTwoTheta (deg, of both
+    detectors or of each detector) and the energy calibration (see findCalibrationBoxes, boxSearch are its options).
+    """
+    policy = WritePolicy.from_config(writePolicy)
 
-    with h5py.File(fileRead, "r") as h5Read:  ## Read the h5 file of raw data
+    with openedFile(fileRead) as h5Read:  ## Read the h5 file of raw data
+        startTime = scanStartTime(
+            h5Read, f"{sample}_{dataset}_{scanNumber}.1"
+        )  ## start time of the calibration scan
         patternHorizontalDetector = h5Read[
             sample
             + "_"
@@ -58,7 +79,43 @@ def angleCalibrationEDD(
             0
         ]  ## pattern of vertical detector
 
-    h5Save = h5py.File(fileSave, "a")  ## create/append h5 file to save in
+    detectorCalibration = calibrationResults(
+        pathFileDetectorCalibration, "detectorCalibration", scanDetectorCalibration
+    )  ## energy calibration of the two detectors (cached)
+    calibCoeffsHD = detectorCalibration[
+        "calibCoeffsHD"
+    ]  ## the energy calibration coefficients of the horizontal detector
+    calibCoeffsVD = detectorCalibration[
+        "calibCoeffsVD"
+    ]  ## the energy calibration coefficients of the vertical detector
+    uncertaintyCalibCoeffsHD = detectorCalibration[
+        "uncertaintyCalibCoeffsHD"
+    ]  ## the uncertainty of the energy calibration coefficients of the horizontal detector
+    uncertaintyCalibCoeffsVD = detectorCalibration[
+        "uncertaintyCalibCoeffsVD"
+    ]  ## the uncertainty of the energy calibration coefficients of the vertical detector
+
+    if rangeFitHD is None or rangeFitVD is None:
+        if roughTwoTheta is None:
+            raise ValueError("roughTwoTheta is needed to find the fit boxes")
+        (rangeFitHD, rangeFitVD), nbPeaksInBoxes = findCalibrationBoxes(
+            [patternHorizontalDetector, patternVerticalDetector],
+            [
+                np.polyval(calibCoeffsHD, np.arange(len(patternHorizontalDetector))),
+                np.polyval(calibCoeffsVD, np.arange(len(patternVerticalDetector))),
+            ],
+            [
+                calibrantLineEnergies(sampleCalibrantFile, twoTheta)
+                for twoTheta in np.broadcast_to(roughTwoTheta, (2,))
+            ],
+            **(boxSearch or {}),
+        )  ## boxes of the horizontal and vertical detectors
+        numberOfBoxes = len(nbPeaksInBoxes)
+        print(
+            f"Boxes found: rangeFitHD {rangeFitHD}, rangeFitVD {rangeFitVD}, nbPeaksInBoxes {nbPeaksInBoxes}"
+        )
+
+    h5Save = openFile(fileSave, "a")  ## create/append h5 file to save in
     if "angleCalibration" not in h5Save.keys():
         angleCalibrationLevel1 = h5Save.create_group(
             "angleCalibration"
@@ -81,10 +138,10 @@ def angleCalibrationEDD(
 
     infoGroup = fitLevel1_2.create_group("infos")  ## infos group creation
     infoGroup.create_dataset(
-        "fileRead", dtype=h5py.string_dtype(encoding="utf-8"), data=fileRead
+        "fileRead", dtype=h5py.string_dtype(encoding="utf-8"), data=fileName(fileRead)
     )  ## save path of raw data file in infos group
     infoGroup.create_dataset(
-        "fileSave", dtype=h5py.string_dtype(encoding="utf-8"), data=fileSave
+        "fileSave", dtype=h5py.string_dtype(encoding="utf-8"), data=fileName(fileSave)
     )  ## save path of the file in which results will be saved in info group
     infoGroup.create_dataset(
         "sample", dtype=h5py.string_dtype(encoding="utf-8"), data=sample
@@ -95,6 +152,10 @@ def angleCalibrationEDD(
     infoGroup.create_dataset(
         "scanNumber", dtype=h5py.string_dtype(encoding="utf-8"), data=str(scanNumber)
     )  ## save of the number of the scan in infos group
+    if startTime is not None:
+        infoGroup.create_dataset(
+            "startTime", dtype=h5py.string_dtype(encoding="utf-8"), data=startTime
+        )  ## save of the start time of the scan in infos group (see calibrationStore)
     infoGroup.create_dataset(
         "nameHorizontalDetector",
         dtype=h5py.string_dtype(encoding="utf-8"),
@@ -118,257 +179,75 @@ def angleCalibrationEDD(
         "rangeFitVD", dtype="int", data=rangeFitVD
     )  ## save of the range of the fit of each box/window of the vertical detector in infos group
 
-    fitParamsHD = np.array(())
-    fitParamsVD = np.array(())
-    uncertaintyFitParamsHD = np.array(())
-    uncertaintyFitParamsVD = np.array(())
-    curveAngleCalibrationHD = np.zeros((np.sum(nbPeaksInBoxes), 2), float)
-    curveAngleCalibrationVD = np.zeros((np.sum(nbPeaksInBoxes), 2), float)
+    boxesFits = calibrationFits(
+        {
+            "HorizontalDetector": patternHorizontalDetector,
+            "VerticalDetector": patternVerticalDetector,
+        },
+        {"HorizontalDetector": rangeFitHD, "VerticalDetector": rangeFitVD},
+        nbPeaksInBoxes,
+        stripIterations=4000,
+    )  ## fit of all the boxes of the two detectors
     for i in range(numberOfBoxes):
-        peakHorizontalDetector = np.transpose(
-            (
-                np.arange(rangeFitHD[2 * i], rangeFitHD[(2 * i) + 1]),
-                patternHorizontalDetector[rangeFitHD[2 * i] : rangeFitHD[(2 * i) + 1]],
-            )
-        )  ## peak of the horizontal detector
-        peakVerticalDetector = np.transpose(
-            (
-                np.arange(rangeFitVD[2 * i], rangeFitVD[(2 * i) + 1]),
-                patternVerticalDetector[rangeFitVD[2 * i] : rangeFitVD[(2 * i) + 1]],
-            )
-        )  ## peak of the vertical detector
-        backgroundHorizontalDetector = silx.math.fit.strip(
-            data=peakHorizontalDetector[:, 1],
-            w=5,
-            niterations=4000,
-            factor=1,
-            anchors=None,
-        )  ## stripped background of the horizontal detector (obtained by stripping the yData)
-        backgroundVerticalDetector = silx.math.fit.strip(
-            data=peakVerticalDetector[:, 1],
-            w=5,
-            niterations=4000,
-            factor=1,
-            anchors=None,
-        )  ## stripped background of the vertical detector (obtained by stripping the yData)
-        fitLevel1_2.create_group(
+        fitLine = fitLevel1_2.create_group(
             f"fitLine_{str(i)}"
         )  ## create group for each calibration peak
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "rawHorizontalDetector", dtype="float64", data=peakHorizontalDetector
-        )  ## create dataset for raw data of each calibration peak
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "rawVerticalDetector", dtype="f", data=peakVerticalDetector
-        )  ## create dataset for raw data of each calibration peak
-
-        peaksGuessHD, peaksIndexHD = guessParameters(
-            peakHorizontalDetector[:, 0],
-            peakHorizontalDetector[:, 1] - backgroundHorizontalDetector,
-            nbPeaksInBoxes[i],
-            withBounds=False,
-        )  ## guess fit parameters for HD
-        peaksGuessVD, peaksIndexVD = guessParameters(
-            peakVerticalDetector[:, 0],
-            peakVerticalDetector[:, 1] - backgroundVerticalDetector,
-            nbPeaksInBoxes[i],
-            withBounds=False,
-        )  ## guess fit parameters for VD
-        yCalculatedBackgroundHD = calcBackground(
-            peakHorizontalDetector[:, 0],
-            peakHorizontalDetector[:, 1],
-            peaksGuessHD[-1],
-            peaksGuessHD[2],
-            peaksIndexHD,
-        )  ## calculated ybackground of the horizontal detector
-        yCalculatedBackgroundVD = calcBackground(
-            peakVerticalDetector[:, 0],
-            peakVerticalDetector[:, 1],
-            peaksGuessVD[-1],
-            peaksGuessVD[2],
-            peaksIndexVD,
-        )  ## calculated ybackground of the vertical detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "backgroundHorizontalDetector",
-            dtype="float64",
-            data=np.transpose((peakHorizontalDetector[:, 0], yCalculatedBackgroundHD)),
-        )  ## create dataset for background of each calibration peak for HD
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "backgroundVerticalDetector",
-            dtype="float64",
-            data=np.transpose((peakVerticalDetector[:, 0], yCalculatedBackgroundVD)),
-        )  ## create dataset for background of each calibration peak for VD
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "bgdSubsDataHorizontalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakHorizontalDetector[:, 0],
-                    peakHorizontalDetector[:, 1] - yCalculatedBackgroundHD,
-                )
-            ),
-        )  ## create dataset for HD raw data after subst of background
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "bgdSubsDataVerticalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakVerticalDetector[:, 0],
-                    peakVerticalDetector[:, 1] - yCalculatedBackgroundVD,
-                )
-            ),
-        )  ## create dataset for VD raw data after subst of background
-        initialGuessHD = np.zeros(5 * nbPeaksInBoxes[i])
-        initialGuessVD = np.zeros(5 * nbPeaksInBoxes[i])
-        for n in range(nbPeaksInBoxes[i]):
-            initialGuessHD[5 * n] = peaksGuessHD[3 * n]
-            initialGuessHD[5 * n + 1] = peaksGuessHD[3 * n + 1]
-            initialGuessHD[5 * n + 2] = peaksGuessHD[3 * n + 2]
-            initialGuessHD[5 * n + 3] = peaksGuessHD[3 * n + 2]
-            initialGuessHD[5 * n + 4] = 0.5
-            initialGuessVD[5 * n] = peaksGuessVD[3 * n]
-            initialGuessVD[5 * n + 1] = peaksGuessVD[3 * n + 1]
-            initialGuessVD[5 * n + 2] = peaksGuessVD[3 * n + 2]
-            initialGuessVD[5 * n + 3] = peaksGuessVD[3 * n + 2]
-            initialGuessVD[5 * n + 4] = 0.5
-        optimal_parametersHD, covarianceHD = scipy.optimize.curve_fit(
-            f=splitPseudoVoigt,
-            xdata=peakHorizontalDetector[:, 0],
-            ydata=peakHorizontalDetector[:, 1] - yCalculatedBackgroundHD,
-            p0=initialGuessHD,
-            sigma=None,
-        )  ## fit of the peak of the Horizontal detector
-        optimal_parametersVD, covarianceVD = scipy.optimize.curve_fit(
-            f=splitPseudoVoigt,
-            xdata=peakVerticalDetector[:, 0],
-            ydata=peakVerticalDetector[:, 1] - yCalculatedBackgroundVD,
-            p0=initialGuessVD,
-            sigma=None,
-        )  ## fit of the peak of the Vertical detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "fitHorizontalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakHorizontalDetector[:, 0],
-                    splitPseudoVoigt(peakHorizontalDetector[:, 0], optimal_parametersHD)
-                    + yCalculatedBackgroundHD,
-                )
-            ),
-        )  ## fitted data of the horizontal detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "fitVerticalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakVerticalDetector[:, 0],
-                    splitPseudoVoigt(peakVerticalDetector[:, 0], optimal_parametersVD)
-                    + yCalculatedBackgroundVD,
-                )
-            ),
-        )  ## fitted data of the vertical detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "errorHorizontalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakHorizontalDetector[:, 0],
-                    np.absolute(
-                        splitPseudoVoigt(
-                            peakHorizontalDetector[:, 0], optimal_parametersHD
-                        )
-                        + yCalculatedBackgroundHD
-                        - peakHorizontalDetector[:, 1]
-                    ),
-                )
-            ),
-        )  ## error of the horizontal detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "errorVerticalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakVerticalDetector[:, 0],
-                    np.absolute(
-                        splitPseudoVoigt(
-                            peakVerticalDetector[:, 0], optimal_parametersVD
-                        )
-                        + yCalculatedBackgroundVD
-                        - peakVerticalDetector[:, 1]
-                    ),
-                )
-            ),
-        )  ## error of the vertical detector
-        for n in range(nbPeaksInBoxes[i]):
-            fitParamsHD = np.append(
-                fitParamsHD,
-                np.append(
-                    optimal_parametersHD[5 * n : 5 * n + 5],
-                    100
-                    * np.sum(
-                        np.absolute(
-                            splitPseudoVoigt(
-                                peakHorizontalDetector[:, 0], optimal_parametersHD
-                            )
-                            + backgroundHorizontalDetector
-                            - peakHorizontalDetector[:, 1]
-                        )
-                    )
-                    / np.sum(peakHorizontalDetector[:, 1]),
-                ),
-                axis=0,
-            )  ##
-            fitParamsVD = np.append(
-                fitParamsVD,
-                np.append(
-                    optimal_parametersVD[5 * n : 5 * n + 5],
-                    100
-                    * np.sum(
-                        np.absolute(
-                            splitPseudoVoigt(
-                                peakVerticalDetector[:, 0], optimal_parametersVD
-                            )
-                            + backgroundVerticalDetector
-                            - peakVerticalDetector[:, 1]
-                        )
-                    )
-                    / np.sum(peakVerticalDetector[:, 1]),
-                ),
-                axis=0,
-            )  ##
-            uncertaintyFitParamsHD = np.append(
-                uncertaintyFitParamsHD,
-                np.sqrt(np.diag(covarianceHD))[5 * n : 5 * n + 5],
-                axis=0,
-            )  ##
-            uncertaintyFitParamsVD = np.append(
-                uncertaintyFitParamsVD,
-                np.sqrt(np.diag(covarianceVD))[5 * n : 5 * n + 5],
-                axis=0,
-            )  ##
-    rawDataLevel1_1.create_dataset(
-        "horizontalDetector", dtype="float64", data=patternHorizontalDetector
+        for detector, boxFits in boxesFits.items():
+            for curve in ("raw", "background", "bgdSubsData", "fit", "error"):
+                policy.create_dataset(
+                    fitLine,
+                    curve + detector,
+                    dtype="float64",
+                    data=boxFits[i][curve],
+                    curve=True,
+                )  ## raw data, background, data without background, fitted data and error of each calibration peak
+    fitParamsHD, fitParamsVD, uncertaintyFitParamsHD, uncertaintyFitParamsVD = (
+        np.concatenate([boxFit[params] for boxFit in boxesFits[detector]])
+        for params, detector in (
+            ("fitParams", "HorizontalDetector"),
+            ("fitParams", "VerticalDetector"),
+            ("uncertaintyFitParams", "HorizontalDetector"),
+            ("uncertaintyFitParams", "VerticalDetector"),
+        )
+    )
+    curveAngleCalibrationHD = np.zeros((np.sum(nbPeaksInBoxes), 2), float)
+    curveAngleCalibrationVD = np.zeros((np.sum(nbPeaksInBoxes), 2), float)
+    policy.create_dataset(
+        rawDataLevel1_1,
+        "horizontalDetector",
+        dtype="float64",
+        data=patternHorizontalDetector,
+        curve=True,
     )  ## save raw data of the horizontal detector
-    rawDataLevel1_1.create_dataset(
-        "verticalDetector", dtype="float64", data=patternVerticalDetector
+    policy.create_dataset(
+        rawDataLevel1_1,
+        "verticalDetector",
+        dtype="float64",
+        data=patternVerticalDetector,
+        curve=True,
     )  ## save raw data of the vertical detector
-    fitLevel1_2["fitParams"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["fitParams"],
         "fitParamsHD",
         dtype="float64",
         data=np.reshape(fitParamsHD, (int(np.size(fitParamsHD) / 6), 6)),
     )  ## save parameters of the fit of HD
-    fitLevel1_2["fitParams"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["fitParams"],
         "fitParamsVD",
         dtype="float64",
         data=np.reshape(fitParamsVD, (int(np.size(fitParamsVD) / 6), 6)),
     )  ## save parameters of the fit of VD
-    fitLevel1_2["fitParams"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["fitParams"],
         "uncertaintyFitParamsHD",
         dtype="float64",
         data=np.reshape(
             uncertaintyFitParamsHD, (int(np.size(uncertaintyFitParamsHD) / 5), 5)
         ),
     )  ## save uncertainty on the parameters of the fit of HD
-    fitLevel1_2["fitParams"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["fitParams"],
         "uncertaintyFitParamsVD",
         dtype="float64",
         data=np.reshape(
@@ -376,32 +255,9 @@ def angleCalibrationEDD(
         ),
     )  ## save uncertainty on the parameters of the fit of VD
 
-    with h5py.File(
-        pathFileDetectorCalibration, "r"
-    ) as h5pFDC:  ## Read the h5 file of the energy calibration of the two detectors
-        calibCoeffsHD = h5pFDC[
-            f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs/calibCoeffsHD"
-        ][
-            ()
-        ]  ## import the energy calibration coefficients of the horizontal detector
-        calibCoeffsVD = h5pFDC[
-            f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs/calibCoeffsVD"
-        ][
-            ()
-        ]  ## import the energy calibration coefficients of the vertical detector
-        uncertaintyCalibCoeffsHD = h5pFDC[
-            f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs/uncertaintyCalibCoeffsHD"
-        ][
-            ()
-        ]  ## import the uncertainty of the energy calibration coefficients of the horizontal detector
-        uncertaintyCalibCoeffsVD = h5pFDC[
-            f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs/uncertaintyCalibCoeffsVD"
-        ][
-            ()
-        ]  ## import the uncertainty of the energy calibration coefficients of the vertical detector
-    calibrantSample = np.loadtxt(
+    calibrantSample = calibrantLines(
         sampleCalibrantFile
-    )  ## open source calibration text file
+    )  ## lines of the calibration text file (cached)
     conversionChannelEnergyHD = np.polyval(
         calibCoeffsHD, fitLevel1_2["fitParams/fitParamsHD"][:, 1]
     )  ## conversion of the channel to energy for the horizontal detector
@@ -410,13 +266,19 @@ def angleCalibrationEDD(
     )  ## conversion of the channel to energy for the vertical detector
     curveAngleCalibrationHD[:, 0] = 1 / calibrantSample[: np.sum(nbPeaksInBoxes)]
     curveAngleCalibrationHD[:, 1] = conversionChannelEnergyHD
-    fitLevel1_2["curveAngleCalibration"].create_dataset(
-        "curveAngleCalibrationHD", dtype="float64", data=curveAngleCalibrationHD
+    policy.create_dataset(
+        fitLevel1_2["curveAngleCalibration"],
+        "curveAngleCalibrationHD",
+        dtype="float64",
+        data=curveAngleCalibrationHD,
     )  ## save curve energy VS 1/d for horizontal detector (d = hkl interriticular distance of the calibrant sample)
     curveAngleCalibrationVD[:, 0] = 1 / calibrantSample[: np.sum(nbPeaksInBoxes)]
     curveAngleCalibrationVD[:, 1] = conversionChannelEnergyVD
-    fitLevel1_2["curveAngleCalibration"].create_dataset(
-        "curveAngleCalibrationVD", dtype="float64", data=curveAngleCalibrationVD
+    policy.create_dataset(
+        fitLevel1_2["curveAngleCalibration"],
+        "curveAngleCalibrationVD",
+        dtype="float64",
+        data=curveAngleCalibrationVD,
     )  ## save curve energy VS 1/d for vertical detector (d = hkl interriticular distance of the calibrant sample)
 
     calibratedAngleHD, covCalibratedAngleHD = scipy.optimize.curve_fit(
@@ -457,31 +319,36 @@ def angleCalibrationEDD(
     )  ## calculation of 12.398/2*sin(theta) of the diffraction angle of the vertical detector
     # print(calibratedAngleHD)
     # print(calibratedAngleVD)
-    fitLevel1_2["calibratedAngle"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["calibratedAngle"],
         "calibratedAngleHD",
         dtype="float64",
         data=np.rad2deg(
             2 * np.arcsin((pCstInkeVS * speedLightInAPerS) / (2 * calibratedAngleHD))
         ),
     )  ## save the calibrated diffraction angle in degree of the horizontal detector
-    fitLevel1_2["calibratedAngle"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["calibratedAngle"],
         "calibratedAngleVD",
         dtype="float64",
         data=np.rad2deg(
             2 * np.arcsin((pCstInkeVS * speedLightInAPerS) / (2 * calibratedAngleVD))
         ),
     )  ## save the calibrated diffraction angle in degree of the vertical detector
-    fitLevel1_2["calibratedAngle"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["calibratedAngle"],
         "uncertaintyCalibratedAngleHD",
         dtype="float64",
         data=np.sqrt(np.diag(covCalibratedAngleHD)),
     )  ## save the uncertainty of the calibrated diffraction angle in degree of the horizontal detector
-    fitLevel1_2["calibratedAngle"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["calibratedAngle"],
         "uncertaintyCalibratedAngleVD",
         dtype="float64",
         data=np.sqrt(np.diag(covCalibratedAngleVD)),
     )  ## save the uncertainty of the calibrated diffraction angle in degree of the vertical detector
-    fitLevel1_2["curveAngleCalibration"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["curveAngleCalibration"],
         "fitCurveAngleCalibrationHD",
         dtype="float64",
         data=np.transpose(
@@ -491,7 +358,8 @@ def angleCalibrationEDD(
             )
         ),
     )  ## save curve energy VS 1/d for horizontal detector calculated using the fitted value 12.398/2*sin(theta)
-    fitLevel1_2["curveAngleCalibration"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["curveAngleCalibration"],
         "fitCurveAngleCalibrationVD",
         dtype="float64",
         data=np.transpose(
@@ -501,7 +369,8 @@ def angleCalibrationEDD(
             )
         ),
     )  ## save curve energy VS 1/d for vertical detector calculated using the fitted value 12.398/2*sin(theta)
-    fitLevel1_2["curveAngleCalibration"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["curveAngleCalibration"],
         "errorCurveAngleCalibrationHD",
         dtype="float64",
         data=np.transpose(
@@ -514,7 +383,8 @@ def angleCalibrationEDD(
             )
         ),
     )  ## error between the fitted (calculated using the fitted value 12.398/2*sin(theta)) and experimental curve of energy VS 1/d for horizontal detector
-    fitLevel1_2["curveAngleCalibration"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["curveAngleCalibration"],
         "errorCurveAngleCalibrationVD",
         dtype="float64",
         data=np.transpose(
@@ -531,12 +401,12 @@ def angleCalibrationEDD(
     infoGroup.create_dataset(
         "pathDetectorCalibrationParams",
         dtype=h5py.string_dtype(encoding="utf-8"),
-        data=pathFileDetectorCalibration
+        data=fileName(pathFileDetectorCalibration)
         + "/"
         + f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs",
     )  ## save of the path of the file containing the energy calibration coefficient for the two detectors used for the conversion of channels ====> energy in the info group
 
-    h5Save.close()
+    closeFile(h5Save, fileSave)
     return
 
 
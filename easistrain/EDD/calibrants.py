@@ -0,0 +1,130 @@
+from functools import lru_cache
+import os
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from easistrain.EDD.constants import pCstInkeVS, speedLightInAPerS
+from easistrain.func_tthdspacing import cubicdspacing, hexdspacing
+
+CALIBRANTS_DIRECTORY = (
+    Path(__file__).resolve().parent / "Calibrants"
+)  ## the calibrant files installed with easistrain (package data)
+
+ANGSTROM_IN_MICRON = 1e-4
+
+
+def _readOnly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=64)
+def _parseCalibrant(calibrantFile: str, mtime: int, size: int) -> dict:
+    """Parses a calibrant file (cached, mtime and size make the cache follow the modifications of the file)"""
+    lines, hkl = [], []
+    with open(calibrantFile, "r") as file:
+        for line in file:
+            value, _, label = line.partition("#")
+            if not value.strip():
+                continue
+            lines.append(float(value.split()[0]))
+            hkl.append(label.strip())
+    return {
+        "name": Path(calibrantFile).name,
+        "kind": "d" if calibrantFile.endswith(".d") else "energy",
+        "lines": _readOnly(np.array(lines, dtype=float)),
+        "hkl": tuple(hkl),
+    }
+
+
+def readCalibrant(calibrantFile: Union[str, Path]) -> dict:
+    """Calibrant table of a file of Calibrants/: one line per row, an optional label (e.g. hkl) after a #.
+
+    Returns a dict with the name of the file, the kind of lines ("d": d-spacings in Angstrom for the .d files,
+    "energy": energies in keV otherwise), the lines (read-only array) and the labels of the lines ("" if none).
+    The tables are cached by path and modification time: a file is only parsed again when it changes.
+    """
+    calibrantFile = os.path.abspath(calibrantFile)
+    stat = os.stat(calibrantFile)
+    return _parseCalibrant(calibrantFile, stat.st_mtime_ns, stat.st_size)
+
+
+def calibrantLines(calibrantFile: Union[str, Path]) -> np.ndarray:
+    """Lines (read-only) of a calibrant file, as np.loadtxt(calibrantFile) but cached (see readCalibrant)"""
+    return readCalibrant(calibrantFile)["lines"]
+
+
+def calibrantEnergies(calibrant: dict, twoTheta: Optional[float] = None) -> np.ndarray:
+    """Energies (keV) of the lines of a calibrant table (see readCalibrant and phaseCalibrant).
+
+    The d-spacings are converted to the energies diffracted at twoTheta (deg).
+    """
+    if calibrant["kind"] == "energy":
+        return calibrant["lines"]
+    if twoTheta is None:
+        raise ValueError(
+            f"twoTheta is needed to convert the d-spacings of {calibrant['name']} to energies"
+        )
+    return (pCstInkeVS * speedLightInAPerS) / (
+        2 * calibrant["lines"] * np.sin(np.radians(0.5 * twoTheta))
+    )
+
+
+def calibrantRegistry(
+    directory: Union[str, Path] = CALIBRANTS_DIRECTORY
+) -> Dict[str, dict]:
+    """Calibrant tables (see readCalibrant) of all the files of a directory, by file name"""
+    return {
+        path.name: readCalibrant(path)
+        for path in sorted(Path(directory).iterdir())
+        if path.is_file() and not path.name.startswith(".")
+    }
+
+
+def phaseCalibrant(
+    name: str,
+    a: float,
+    hkl: Sequence[Tuple[int, int, int]],
+    structure: str = "cubic",
+    c: Optional[float] = None,
+) -> dict:
+    """Calibrant table (see readCalibrant) of the reflections hkl of a cubic or hexagonal phase.
+
+    a and c are the lattice parameters in Angstrom. The lines are the d-spacings (Angstrom) sorted
+    from the largest, the reflections with the same d-spacing are merged in one line (labels joined by /).
+    """
+    if structure not in ("cubic", "hexagonal"):
+        raise ValueError(f"Unknown structure {structure}: cubic or hexagonal expected")
+    if structure == "hexagonal" and c is None:
+        raise ValueError("The lattice parameter c is needed for a hexagonal structure")
+    indices = np.array(hkl, dtype=float).reshape(-1, 3).T  ## h, k, l
+    with np.errstate(invalid="ignore"):  ## only the d-spacings are used, not the angles
+        if structure == "hexagonal":
+            d, _ = hexdspacing(
+                1, a * ANGSTROM_IN_MICRON, c * ANGSTROM_IN_MICRON, *indices
+            )
+        else:
+            d, _ = cubicdspacing(1, a * ANGSTROM_IN_MICRON, *indices)
+    d = np.round(d / ANGSTROM_IN_MICRON, 6)
+    lines, labels = [], []
+    for index in np.argsort(-d, kind="stable"):
+        label = "".join(str(i) for i in hkl[index])
+        if lines and lines[-1] == d[index]:
+            labels[-1] += "/" + label
+        else:
+            lines.append(d[index])
+            labels.append(label)
+    return {
+        "name": name,
+        "kind": "d",
+        "lines": _readOnly(np.array(lines)),
+        "hkl": tuple(labels),
+    }
+
+
+def saveCalibrant(calibrant: dict, calibrantFile: Union[str, Path]):
+    """Writes a calibrant table (see phaseCalibrant) in the format of the files of Calibrants/"""
+    with open(calibrantFile, "w") as file:
+        for line, label in zip(calibrant["lines"], calibrant["hkl"]):
+            file.write(f"{line:.6f} # {label}\n" if label else f"{line:.6f}\n")
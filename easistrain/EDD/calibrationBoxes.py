@@ -0,0 +1,131 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import silx.math.fit.peaks
+
+from easistrain.EDD.calibrants import calibrantEnergies, readCalibrant
+
+
+def calibrantLineEnergies(
+    calibrantFile: str, twoTheta: Optional[float] = None
+) -> np.ndarray:
+    """Energies (keV) of the lines of a calibrant file of Calibrants/.
+
+    The file contains energies (keV, e.g. BaSource) or d-spacings (Angstrom, .d files, e.g. TiC.d)
+    which are converted to the energies diffracted at twoTheta (deg).
+    """
+    return calibrantEnergies(readCalibrant(calibrantFile), twoTheta)
+
+
+def linearEnergyAxis(nbChannels: int, roughCalibration: Sequence[float]) -> np.ndarray:
+    """Energies of the channels from a rough linear calibration (gain in keV/channel, offset in keV)"""
+    gain, offset = roughCalibration
+    return gain * np.arange(nbChannels) + offset
+
+
+def matchLines(
+    peaks: np.ndarray,
+    relevance: np.ndarray,
+    peakEnergies: np.ndarray,
+    lines: Sequence[float],
+    tolerance: float,
+) -> List[float]:
+    """Peaks (channels) matched to the first lines (keV, sorted by increasing energy) found in a pattern.
+
+    Each line is matched to a different peak within the tolerance and the matched peaks increase with
+    the lines, so that two close lines are never matched to the same peak. Among these assignments
+    of the longest series of first lines, the one with the most relevant peaks is chosen.
+    """
+    order = np.argsort(peaks)
+    peaks, relevance, peakEnergies = peaks[order], relevance[order], peakEnergies[order]
+    # For each line, total relevance of the best assignment of the lines up to it ending on each
+    # peak, and the peak then matched to the previous line
+    scores = []
+    previous = []
+    for line in lines:
+        score = np.full(len(peaks), -np.inf)
+        before = np.full(len(peaks), -1)
+        for k in np.flatnonzero(np.abs(peakEnergies - line) <= tolerance * line):
+            if not scores:
+                score[k] = relevance[k]
+                continue
+            lastScore = scores[-1][:k]  ## the previous line is matched to a lower peak
+            if len(lastScore) and np.isfinite(np.max(lastScore)):
+                before[k] = np.argmax(lastScore)
+                score[k] = lastScore[before[k]] + relevance[k]
+        if not np.any(np.isfinite(score)):
+            break
+        scores.append(score)
+        previous.append(before)
+    if not scores:
+        return []
+    matched = [int(np.argmax(scores[-1]))]
+    for before in previous[:0:-1]:
+        matched.append(before[matched[-1]])
+    return [peaks[k] for k in matched[::-1]]
+
+
+def findCalibrationBoxes(
+    patterns: Sequence[np.ndarray],
+    energyAxes: Sequence[np.ndarray],
+    lineEnergies: Sequence[np.ndarray],
+    tolerance: float = 0.02,
+    windowFactor: float = 8,
+    sensitivity: float = 2,
+) -> Tuple[List[List[int]], List[int]]:
+    """Proposes the fit boxes/windows of the calibration of several detectors (calibEdd and angleCalibrationEDD).
+
+    patterns: the calibration pattern of each detector
+    energyAxes: the rough energy (keV) of each channel of each pattern
+    lineEnergies: the expected energies (keV) of the calibrant lines for each pattern, in the order of the calibrant file
+    tolerance: relative tolerance on the energy of a line to match a peak found in a pattern
+    windowFactor: half width of the window around a peak in number of FWHM
+    sensitivity: sensitivity of the peak search (silx.math.fit.peaks.peak_search)
+
+    One peak search over each whole pattern is done. Each line is matched to a different peak found
+    within the tolerance, in the order of the lines (see matchLines, the lines of the calibrant files
+    are sorted by increasing energy), stopping at the first line which is not found in all the patterns
+    (the stages use the first lines of the calibrant file). Lines whose windows overlap in any pattern
+    are fitted in the same box.
+    Returns the fit ranges (2 limits per box) of each pattern and the number of peaks in each box.
+    """
+    halfWidths = []
+    matchedPeaks = []
+    for pattern, energy, lines in zip(patterns, energyAxes, lineEnergies):
+        pattern = np.asarray(pattern, dtype=float)
+        fwhm = silx.math.fit.peaks.guess_fwhm(pattern)
+        peaks, relevance = np.reshape(
+            silx.math.fit.peaks.peak_search(
+                pattern, fwhm, sensitivity=sensitivity, relevance_info=True
+            ),
+            (-1, 2),
+        ).T
+        peakEnergies = np.interp(peaks, np.arange(len(energy)), energy)
+        halfWidths.append(windowFactor * fwhm)
+        matchedPeaks.append(
+            matchLines(peaks, relevance, peakEnergies, lines, tolerance)
+        )
+    nbLines = min(len(matched) for matched in matchedPeaks)
+    if nbLines == 0:
+        raise ValueError("The first calibrant line was not found in the patterns")
+
+    # Lines in the same box when their windows overlap in one of the patterns
+    boxes = [[0]]
+    for n in range(1, nbLines):
+        if any(
+            matched[n] - matched[boxes[-1][-1]] < 2 * halfWidth
+            for matched, halfWidth in zip(matchedPeaks, halfWidths)
+        ):
+            boxes[-1].append(n)
+        else:
+            boxes.append([n])
+
+    rangeFits = []
+    for pattern, matched, halfWidth in zip(patterns, matchedPeaks, halfWidths):
+        rangeFit = []
+        for box in boxes:
+            rangeFit += [
+                max(0, int(matched[box[0]] - halfWidth)),
+                min(len(pattern), int(np.ceil(matched[box[-1]] + halfWidth))),
+            ]
+        rangeFits.append(rangeFit)
+    return rangeFits, [len(box) for box in boxes]
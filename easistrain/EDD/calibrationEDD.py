@@ -1,59 +1,134 @@
 import h5py
 import numpy as np
-import silx.math.fit
-import silx.math.fit.peaks
-import scipy.optimize
-from typing import Sequence, Union
+from typing import Optional, Sequence, Union
 
-from easistrain.EDD.utils import (
-    calcBackground,
-    guessParameters,
-    run_from_cli,
-    splitPseudoVoigt,
+from easistrain.EDD.calibrants import calibrantLines
+from easistrain.EDD.calibrationBoxes import (
+    calibrantLineEnergies,
+    findCalibrationBoxes,
+    linearEnergyAxis,
 )
+from easistrain.EDD.io import (
+    H5File,
+    WritePolicy,
+    accumulatedSpectrum,
+    closeFile,
+    fileName,
+    openFile,
+    openedFile,
+    scanStartTime,
+)
+from easistrain.EDD.utils import calibrationFits, run_from_cli
+
+
+def scanList(scanNumber: Union[str, int, Sequence[Union[str, int]]]) -> list:
+    """The scan numbers of one scan or of a list of scans"""
+    return list(scanNumber) if isinstance(scanNumber, (list, tuple)) else [scanNumber]
+
+
+def scanLabel(scanNumber: Union[str, int, Sequence[Union[str, int]]]) -> str:
+    """Name of one scan or of a list of scans in the names of the groups (scans joined with +)"""
+    return "+".join(str(scan) for scan in scanList(scanNumber))
 
 
 def calibEdd(
-    fileRead: str,
-    fileSave: str,
+    fileRead: H5File,
+    fileSave: H5File,
     sample: str,
     dataset: Union[str, int],
-    scanNumberHorizontalDetector: Union[str, int],
-    scanNumberVerticalDetector: Union[str, int],
+    scanNumberHorizontalDetector: Union[str, int, Sequence[Union[str, int]]],
+    scanNumberVerticalDetector: Union[str, int, Sequence[Union[str, int]]],
     nameHorizontalDetector: str,
     nameVerticalDetector: str,
-    numberOfBoxes: int,
-    nbPeaksInBoxes: Sequence[int],
-    rangeFit: Sequence[int],
+    numberOfBoxes: Optional[int],
+    nbPeaksInBoxes: Optional[Sequence[int]],
+    rangeFit: Optional[Sequence[int]],
     sourceCalibrantFile: str,
+    writePolicy: Optional[dict] = None,
+    spectraAccumulation: Optional[str] = None,
+    deadTimeCounters: Optional[Sequence[str]] = None,
+    framesPerRead: int = 100,
+    roughCalibration: Optional[Sequence] = None,
+    boxSearch: Optional[dict] = None,
 ):
-    """Main function."""
+    """Main function.
+
+    By default, the first frame of the calibration scan of each detector is used.
+    With spectraAccumulation "sum" or "average", all the frames of the calibration scans
+    (one scan or a list of scans per detector) are summed or averaged (see accumulatedSpectrum),
+    framesPerRead frames at a time. deadTimeCounters are the names of the dead time fraction
+    counters of the horizontal and vertical detectors used to weight the average.
 
-    with h5py.File(fileRead, "r") as h5Read:  ## Read the h5 file of raw data
-        patternHorizontalDetector = h5Read[
-            sample
-            + "_"
-            + str(dataset)
-            + "_"
-            + str(scanNumberHorizontalDetector)
-            + ".1/measurement/"
-            + nameHorizontalDetector
-        ][
-            0
-        ]  ## calibration pattern of horizontal detector
-        patternVerticalDetector = h5Read[
-            sample
-            + "_"
-            + str(dataset)
-            + "_"
-            + str(scanNumberVerticalDetector)
-            + ".1/measurement/"
-            + nameVerticalDetector
-        ][
-            0
-        ]  ## calibration pattern of vertical detector
+    When rangeFit is None, the boxes and the number of peaks in the boxes are found in the patterns
+    from the lines of sourceCalibrantFile (see findCalibrationBoxes, boxSearch are its options)
+    and roughCalibration: gain (keV/channel) and offset (keV) of both detectors or of each detector.
+    """
+    policy = WritePolicy.from_config(writePolicy)
 
-    h5Save = h5py.File(fileSave, "a")  ## create h5 file to save in
+    with openedFile(fileRead) as h5Read:  ## Read the h5 file of raw data
+        startTime = scanStartTime(
+            h5Read,
+            f"{sample}_{dataset}_{scanList(scanNumberHorizontalDetector)[0]}.1",
+        )  ## start time of the (first) calibration scan of the horizontal detector
+        patterns = []
+        for detector, (scanNumber, name) in enumerate(
+            (
+                (scanNumberHorizontalDetector, nameHorizontalDetector),
+                (scanNumberVerticalDetector, nameVerticalDetector),
+            )
+        ):
+            measurements = [
+                f"{sample}_{dataset}_{scan}.1/measurement/"
+                for scan in scanList(scanNumber)
+            ]
+            if spectraAccumulation is None:
+                if len(measurements) > 1:
+                    raise ValueError(
+                        "spectraAccumulation (sum or average) is needed to use several calibration scans"
+                    )
+                patterns.append(h5Read[measurements[0] + name][0])
+            else:
+                patterns.append(
+                    accumulatedSpectrum(
+                        h5Read,
+                        [measurement + name for measurement in measurements],
+                        spectraAccumulation,
+                        None
+                        if deadTimeCounters is None
+                        else [
+                            measurement + deadTimeCounters[detector]
+                            for measurement in measurements
+                        ],
+                        framesPerRead,
+                    )
+                )
+        (
+            patternHorizontalDetector,
+            patternVerticalDetector,
+        ) = patterns  ## calibration patterns of horizontal and vertical detectors
+
+    if rangeFit is None:
+        if roughCalibration is None:
+            raise ValueError("roughCalibration is needed to find the fit boxes")
+        roughCalibrations = np.broadcast_to(
+            np.asarray(roughCalibration, dtype=float), (2, 2)
+        )  ## gain and offset of each detector
+        lineEnergies = calibrantLineEnergies(sourceCalibrantFile)
+        rangeFits, nbPeaksInBoxes = findCalibrationBoxes(
+            patterns,
+            [
+                linearEnergyAxis(len(pattern), calibration)
+                for pattern, calibration in zip(patterns, roughCalibrations)
+            ],
+            [lineEnergies, lineEnergies],
+            **(boxSearch or {}),
+        )  ## boxes of the horizontal and vertical detectors
+        numberOfBoxes = len(nbPeaksInBoxes)
+        print(f"Boxes found: rangeFit {rangeFits}, nbPeaksInBoxes {nbPeaksInBoxes}")
+    else:
+        rangeFits = [rangeFit, rangeFit]
+
+    h5Save = openFile(fileSave, "a")  ## create h5 file to save in
     if "detectorCalibration" not in h5Save.keys():
         calibrationLevel1 = h5Save.create_group(
             "detectorCalibration"
@@ -66,18 +141,18 @@ def calibEdd(
         + "_"
         + str(dataset)
         + "_"
-        + str(scanNumberHorizontalDetector)
+        + scanLabel(scanNumberHorizontalDetector)
         + "_"
-        + str(scanNumberVerticalDetector)
+        + scanLabel(scanNumberVerticalDetector)
     )  ## rawData subgroup in calibration group
     fitLevel1_2 = calibrationLevel1.create_group(
         "fit"
         + "_"
         + str(dataset)
         + "_"
-        + str(scanNumberHorizontalDetector)
+        + scanLabel(scanNumberHorizontalDetector)
         + "_"
-        + str(scanNumberVerticalDetector)
+        + scanLabel(scanNumberVerticalDetector)
     )  ## fit subgroup in calibration group
     fitLevel1_2.create_group("fitParams")  ## fit results group for the two detector
     fitLevel1_2.create_group(
@@ -89,10 +164,10 @@ def calibEdd(
 
     infoGroup = fitLevel1_2.create_group("infos")  ## infos group creation
     infoGroup.create_dataset(
-        "fileRead", dtype=h5py.string_dtype(encoding="utf-8"), data=fileRead
+        "fileRead", dtype=h5py.string_dtype(encoding="utf-8"), data=fileName(fileRead)
     )  ## save path of raw data file in infos group
     infoGroup.create_dataset(
-        "fileSave", dtype=h5py.string_dtype(encoding="utf-8"), data=fileSave
+        "fileSave", dtype=h5py.string_dtype(encoding="utf-8"), data=fileName(fileSave)
     )  ## save path of the file in which results will be saved in info group
     infoGroup.create_dataset(
         "sample", dtype=h5py.string_dtype(encoding="utf-8"), data=sample
@@ -103,12 +178,12 @@ def calibEdd(
     infoGroup.create_dataset(
         "scanNumberHorizontalDetector",
         dtype=h5py.string_dtype(encoding="utf-8"),
-        data=str(scanNumberHorizontalDetector),
+        data=scanLabel(scanNumberHorizontalDetector),
     )  ## save of the number of the scan containing the calibration pattern of the horizontal detector in infos group
     infoGroup.create_dataset(
         "scanNumberVerticalDetector",
         dtype=h5py.string_dtype(encoding="utf-8"),
-        data=str(scanNumberVerticalDetector),
+        data=scanLabel(scanNumberVerticalDetector),
     )  ## save of the number of the scan containing the calibration pattern of the vertical detector in info group
     infoGroup.create_dataset(
         "nameHorizontalDetector",
@@ -126,9 +201,17 @@ def calibEdd(
     infoGroup.create_dataset(
         "nbPeaksInBoxes", dtype="int", data=nbPeaksInBoxes
     )  ## save of the number of peaks per box/window in infos group
-    infoGroup.create_dataset(
-        "rangeFit", dtype="int", data=rangeFit
-    )  ## save of the range of the fit of each box/window in infos group
+    if rangeFit is None:
+        infoGroup.create_dataset(
+            "rangeFitHD", dtype="int", data=rangeFits[0]
+        )  ## save of the range of the fit of each box/window found for the horizontal detector in infos group
+        infoGroup.create_dataset(
+            "rangeFitVD", dtype="int", data=rangeFits[1]
+        )  ## save of the range of the fit of each box/window found for the vertical detector in infos group
+    else:
+        infoGroup.create_dataset(
+            "rangeFit", dtype="int", data=rangeFit
+        )  ## save of the range of the fit of each box/window in infos group
     infoGroup.create_dataset(
         "sourceCalibrantFile",
         dtype=h5py.string_dtype(encoding="utf-8"),
@@ -139,286 +222,109 @@ def calibEdd(
         dtype=h5py.string_dtype(encoding="utf-8"),
         data="asymmetric Pseudo-Voigt",
     )  ## save of the type of function used in the fitting of the peaks
+    infoGroup.create_dataset(
+        "spectraAccumulation",
+        dtype=h5py.string_dtype(encoding="utf-8"),
+        data=spectraAccumulation or "first frame",
+    )  ## save how the calibration spectra were obtained from the frames of the scans
+    if startTime is not None:
+        infoGroup.create_dataset(
+            "startTime", dtype=h5py.string_dtype(encoding="utf-8"), data=startTime
+        )  ## save of the start time of the calibration in infos group (see calibrationStore)
 
-    fitParamsHD = np.array(())
-    fitParamsVD = np.array(())
-    uncertaintyFitParamsHD = np.array(())
-    uncertaintyFitParamsVD = np.array(())
-    curveCalibrationHD = np.zeros((np.sum(nbPeaksInBoxes), 2), float)
-    curveCalibrationVD = np.zeros((np.sum(nbPeaksInBoxes), 2), float)
+    boxesFits = calibrationFits(
+        {
+            "HorizontalDetector": patternHorizontalDetector,
+            "VerticalDetector": patternVerticalDetector,
+        },
+        {"HorizontalDetector": rangeFits[0], "VerticalDetector": rangeFits[1]},
+        nbPeaksInBoxes,
+        stripIterations=5000,
+    )  ## fit of all the boxes of the two detectors
     for i in range(numberOfBoxes):
-        peakHorizontalDetector = np.transpose(
-            (
-                np.arange(rangeFit[2 * i], rangeFit[(2 * i) + 1]),
-                patternHorizontalDetector[rangeFit[2 * i] : rangeFit[(2 * i) + 1]],
-            )
-        )  ## peak of the horizontal detector
-        peakVerticalDetector = np.transpose(
-            (
-                np.arange(rangeFit[2 * i], rangeFit[(2 * i) + 1]),
-                patternVerticalDetector[rangeFit[2 * i] : rangeFit[(2 * i) + 1]],
-            )
-        )  ## peak of the vertical detector
-        backgroundHorizontalDetector = silx.math.fit.strip(
-            data=peakHorizontalDetector[:, 1],
-            w=5,
-            niterations=5000,
-            factor=1,
-            anchors=None,
-        )  ## stripped background of the horizontal detector (obtained by stripping the yData)
-        backgroundVerticalDetector = silx.math.fit.strip(
-            data=peakVerticalDetector[:, 1],
-            w=5,
-            niterations=5000,
-            factor=1,
-            anchors=None,
-        )  ## stripped background of the vertical detector (obtained by stripping the yData)
-        # print(backgroundHorizontalDetector)
-        # print(backgroundVerticalDetector)
-        fitLevel1_2.create_group(
+        fitLine = fitLevel1_2.create_group(
             f"fitLine_{str(i)}"
         )  ## create group for each calibration peak
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "rawHorizontalDetector", dtype="float64", data=peakHorizontalDetector
-        )  ## create dataset for raw data of each calibration peak
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "rawVerticalDetector", dtype="float64", data=peakVerticalDetector
-        )  ## create dataset for raw data of each calibration peak
-
-        peaksGuessHD, peaksIndexHD = guessParameters(
-            peakHorizontalDetector[:, 0],
-            peakHorizontalDetector[:, 1] - backgroundHorizontalDetector,
-            nbPeaksInBoxes[i],
-            withBounds=False,
-        )  ## guess fit parameters for HD
-        # print(peaksIndexHD)
-        peaksGuessVD, peaksIndexVD = guessParameters(
-            peakVerticalDetector[:, 0],
-            peakVerticalDetector[:, 1] - backgroundVerticalDetector,
-            nbPeaksInBoxes[i],
-            withBounds=False,
-        )  ## guess fit parameters for VD
-        # print(peaksIndexVD)
-        yCalculatedBackgroundHD = calcBackground(
-            peakHorizontalDetector[:, 0],
-            peakHorizontalDetector[:, 1],
-            peaksGuessHD[-1],
-            peaksGuessHD[2],
-            peaksIndexHD,
-        )  ## calculated ybackground of the horizontal detector
-        yCalculatedBackgroundVD = calcBackground(
-            peakVerticalDetector[:, 0],
-            peakVerticalDetector[:, 1],
-            peaksGuessVD[-1],
-            peaksGuessVD[2],
-            peaksIndexVD,
-        )  ## calculated ybackground of the vertical detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "backgroundHorizontalDetector",
-            dtype="float64",
-            data=np.transpose((peakHorizontalDetector[:, 0], yCalculatedBackgroundHD)),
-        )  ## create dataset for background of each calibration peak for HD
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "backgroundVerticalDetector",
-            dtype="float64",
-            data=np.transpose((peakVerticalDetector[:, 0], yCalculatedBackgroundVD)),
-        )  ## create dataset for background of each calibration peak for VD
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "bgdSubsDataHorizontalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakHorizontalDetector[:, 0],
-                    peakHorizontalDetector[:, 1] - yCalculatedBackgroundHD,
-                )
-            ),
-        )  ## create dataset for HD raw data after subst of background
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "bgdSubsDataVerticalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakVerticalDetector[:, 0],
-                    peakVerticalDetector[:, 1] - yCalculatedBackgroundVD,
-                )
-            ),
-        )  ## create dataset for VD raw data after subst of background
-        # print(peaksGuessHD)
-        # print(peaksGuessVD)
-        initialGuessHD = np.zeros(5 * nbPeaksInBoxes[i])
-        initialGuessVD = np.zeros(5 * nbPeaksInBoxes[i])
-        for n in range(nbPeaksInBoxes[i]):
-            initialGuessHD[5 * n] = peaksGuessHD[3 * n]
-            initialGuessHD[5 * n + 1] = peaksGuessHD[3 * n + 1]
-            initialGuessHD[5 * n + 2] = peaksGuessHD[3 * n + 2]
-            initialGuessHD[5 * n + 3] = peaksGuessHD[3 * n + 2]
-            initialGuessHD[5 * n + 4] = 0.5
-            initialGuessVD[5 * n] = peaksGuessVD[3 * n]
-            initialGuessVD[5 * n + 1] = peaksGuessVD[3 * n + 1]
-            initialGuessVD[5 * n + 2] = peaksGuessVD[3 * n + 2]
-            initialGuessVD[5 * n + 3] = peaksGuessVD[3 * n + 2]
-            initialGuessVD[5 * n + 4] = 0.5
-        optimal_parametersHD, covarianceHD = scipy.optimize.curve_fit(
-            f=splitPseudoVoigt,
-            xdata=peakHorizontalDetector[:, 0],
-            ydata=peakHorizontalDetector[:, 1] - yCalculatedBackgroundHD,
-            p0=initialGuessHD,
-            sigma=None,
-        )  ## fit of the peak of the Horizontal detector
-        optimal_parametersVD, covarianceVD = scipy.optimize.curve_fit(
-            f=splitPseudoVoigt,
-            xdata=peakVerticalDetector[:, 0],
-            ydata=peakVerticalDetector[:, 1] - yCalculatedBackgroundVD,
-            p0=initialGuessVD,
-            sigma=None,
-        )  ## fit of the peak of the Vertical detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "fitHorizontalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakHorizontalDetector[:, 0],
-                    splitPseudoVoigt(peakHorizontalDetector[:, 0], optimal_parametersHD)
-                    + yCalculatedBackgroundHD,
-                )
-            ),
-        )  ## fitted data of the horizontal detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "fitVerticalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakVerticalDetector[:, 0],
-                    splitPseudoVoigt(peakVerticalDetector[:, 0], optimal_parametersVD)
-                    + yCalculatedBackgroundVD,
-                )
-            ),
-        )  ## fitted data of the vertical detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "errorHorizontalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakHorizontalDetector[:, 0],
-                    np.absolute(
-                        splitPseudoVoigt(
-                            peakHorizontalDetector[:, 0], optimal_parametersHD
-                        )
-                        + yCalculatedBackgroundHD
-                        - peakHorizontalDetector[:, 1]
-                    ),
-                )
-            ),
-        )  ## error of the horizontal detector
-        fitLevel1_2[f"fitLine_{str(i)}"].create_dataset(
-            "errorVerticalDetector",
-            dtype="float64",
-            data=np.transpose(
-                (
-                    peakVerticalDetector[:, 0],
-                    np.absolute(
-                        splitPseudoVoigt(
-                            peakVerticalDetector[:, 0], optimal_parametersVD
-                        )
-                        + yCalculatedBackgroundVD
-                        - peakVerticalDetector[:, 1]
-                    ),
-                )
-            ),
-        )  ## error of the vertical detector
-        # print(f'optimal_parametersHD = {optimal_parametersHD}')
-        # print(f'uncertauntyHD = {np.sqrt(np.diag(covarianceHD))}')
-        # print(f'optimal_parametersVD = {optimal_parametersVD}')
-        # print(f'uncertauntyVD = {np.sqrt(np.diag(covarianceVD))}')
-        for n in range(nbPeaksInBoxes[i]):
-            fitParamsHD = np.append(
-                fitParamsHD,
-                np.append(
-                    optimal_parametersHD[5 * n : 5 * n + 5],
-                    100
-                    * np.sum(
-                        np.absolute(
-                            splitPseudoVoigt(
-                                peakHorizontalDetector[:, 0], optimal_parametersHD
-                            )
-                            + backgroundHorizontalDetector
-                            - peakHorizontalDetector[:, 1]
-                        )
-                    )
-                    / np.sum(peakHorizontalDetector[:, 1]),
-                ),
-                axis=0,
-            )  ##
-            fitParamsVD = np.append(
-                fitParamsVD,
-                np.append(
-                    optimal_parametersVD[5 * n : 5 * n + 5],
-                    100
-                    * np.sum(
-                        np.absolute(
-                            splitPseudoVoigt(
-                                peakVerticalDetector[:, 0], optimal_parametersVD
-                            )
-                            + backgroundVerticalDetector
-                            - peakVerticalDetector[:, 1]
-                        )
-                    )
-                    / np.sum(peakVerticalDetector[:, 1]),
-                ),
-                axis=0,
-            )  ##
-            uncertaintyFitParamsHD = np.append(
-                uncertaintyFitParamsHD,
-                np.sqrt(np.diag(covarianceHD))[5 * n : 5 * n + 5],
-                axis=0,
-            )  ##
-            uncertaintyFitParamsVD = np.append(
-                uncertaintyFitParamsVD,
-                np.sqrt(np.diag(covarianceVD))[5 * n : 5 * n + 5],
-                axis=0,
-            )  ##
-    rawDataLevel1_1.create_dataset(
-        "horizontalDetector", dtype="float64", data=patternHorizontalDetector
+        for detector, boxFits in boxesFits.items():
+            for curve in ("raw", "background", "bgdSubsData", "fit", "error"):
+                policy.create_dataset(
+                    fitLine,
+                    curve + detector,
+                    dtype="float64",
+                    data=boxFits[i][curve],
+                    curve=True,
+                )  ## raw data, background, data without background, fitted data and error of each calibration peak
+    fitParamsHD, fitParamsVD, uncertaintyFitParamsHD, uncertaintyFitParamsVD = (
+        np.concatenate([boxFit[params] for boxFit in boxesFits[detector]])
+        for params, detector in (
+            ("fitParams", "HorizontalDetector"),
+            ("fitParams", "VerticalDetector"),
+            ("uncertaintyFitParams", "HorizontalDetector"),
+            ("uncertaintyFitParams", "VerticalDetector"),
+        )
+    )
+    curveCalibrationHD = np.zeros((np.sum(nbPeaksInBoxes), 2), float)
+    curveCalibrationVD = np.zeros((np.sum(nbPeaksInBoxes), 2), float)
+    policy.create_dataset(
+        rawDataLevel1_1,
+        "horizontalDetector",
+        dtype="float64",
+        data=patternHorizontalDetector,
+        curve=True,
     )  ## save raw data of the horizontal detector
-    rawDataLevel1_1.create_dataset(
-        "verticalDetector", dtype="float64", data=patternVerticalDetector
+    policy.create_dataset(
+        rawDataLevel1_1,
+        "verticalDetector",
+        dtype="float64",
+        data=patternVerticalDetector,
+        curve=True,
     )  ## save raw data of the vertical detector
-    fitLevel1_2["fitParams"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["fitParams"],
         "fitParamsHD",
         dtype="float64",
         data=np.reshape(fitParamsHD, (int(np.size(fitParamsHD) / 6), 6)),
     )  ## save parameters of the fit of HD
-    fitLevel1_2["fitParams"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["fitParams"],
         "fitParamsVD",
         dtype="float64",
         data=np.reshape(fitParamsVD, (int(np.size(fitParamsVD) / 6), 6)),
     )  ## save parameters of the fit of VD
-    fitLevel1_2["fitParams"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["fitParams"],
         "uncertaintyFitParamsHD",
         dtype="float64",
         data=np.reshape(
             uncertaintyFitParamsHD, (int(np.size(uncertaintyFitParamsHD) / 5), 5)
         ),
     )  ## save uncertainty on the parameters of the fit of HD
-    fitLevel1_2["fitParams"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["fitParams"],
         "uncertaintyFitParamsVD",
         dtype="float64",
         data=np.reshape(
             uncertaintyFitParamsVD, (int(np.size(uncertaintyFitParamsVD) / 5), 5)
         ),
     )  ## save uncertainty on the parameters of the fit of VD
-    calibrantSource = np.loadtxt(
+    calibrantSource = calibrantLines(
         sourceCalibrantFile
-    )  ## open source calibration text file
+    )  ## lines of the calibration text file (cached)
     curveCalibrationHD[:, 0] = fitLevel1_2["fitParams/fitParamsHD"][:, 1]
     curveCalibrationHD[:, 1] = calibrantSource[: np.sum(nbPeaksInBoxes)]
-    fitLevel1_2["curveCalibration"].create_dataset(
-        "curveCalibrationHD", dtype="float64", data=curveCalibrationHD
+    policy.create_dataset(
+        fitLevel1_2["curveCalibration"],
+        "curveCalibrationHD",
+        dtype="float64",
+        data=curveCalibrationHD,
     )  ## curve energy VS channels for horizontal detector
     curveCalibrationVD[:, 0] = fitLevel1_2["fitParams/fitParamsVD"][:, 1]
     curveCalibrationVD[:, 1] = calibrantSource[: np.sum(nbPeaksInBoxes)]
-    fitLevel1_2["curveCalibration"].create_dataset(
-        "curveCalibrationVD", dtype="float64", data=curveCalibrationVD
+    policy.create_dataset(
+        fitLevel1_2["curveCalibration"],
+        "curveCalibrationVD",
+        dtype="float64",
+        data=curveCalibrationVD,
     )  ## curve energy VS channels for vertical detector
     calibCoeffsHD, covCalibCoeffsHD = np.polyfit(
         x=curveCalibrationHD[:, 0],
@@ -434,7 +340,8 @@ def calibEdd(
         full=False,
         cov=True,
     )  ## calibration coefficients of the vertical detector
-    fitLevel1_2["curveCalibration"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["curveCalibration"],
         "fitCurveCalibrationHD",
         dtype="float64",
         data=np.transpose(
@@ -444,7 +351,8 @@ def calibEdd(
             )
         ),
     )  ## fitted curve energy VS channels for horizontal detector
-    fitLevel1_2["curveCalibration"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["curveCalibration"],
         "fitCurveCalibrationVD",
         dtype="float64",
         data=np.transpose(
@@ -454,7 +362,8 @@ def calibEdd(
             )
         ),
     )  ## fitted curve energy VS channels for vertical detector
-    fitLevel1_2["curveCalibration"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["curveCalibration"],
         "errorCurveCalibrationHD",
         dtype="float64",
         data=np.transpose(
@@ -467,7 +376,8 @@ def calibEdd(
             )
         ),
     )  ## error between fitted and raw curve energy VS channels for horizontal detector
-    fitLevel1_2["curveCalibration"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["curveCalibration"],
         "errorCurveCalibrationVD",
         dtype="float64",
         data=np.transpose(
@@ -482,24 +392,26 @@ def calibEdd(
     )  ## error between fitted and raw curve energy VS channels for vertical detector
     # print(f'uncertauntyCalibCoeffsHD = {np.sqrt(np.diag(covCalibCoeffsHD))}')
     # print(f'uncertauntyCalibCoeffsVD = {np.sqrt(np.diag(covCalibCoeffsVD))}')
-    fitLevel1_2["calibCoeffs"].create_dataset(
-        "calibCoeffsHD", dtype="float64", data=calibCoeffsHD
+    policy.create_dataset(
+        fitLevel1_2["calibCoeffs"], "calibCoeffsHD", dtype="float64", data=calibCoeffsHD
     )  ## save calibration coefficients of the horizontal detector
-    fitLevel1_2["calibCoeffs"].create_dataset(
-        "calibCoeffsVD", dtype="float64", data=calibCoeffsVD
+    policy.create_dataset(
+        fitLevel1_2["calibCoeffs"], "calibCoeffsVD", dtype="float64", data=calibCoeffsVD
     )  ## save calibration coefficients of the Vertical detector
-    fitLevel1_2["calibCoeffs"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["calibCoeffs"],
         "uncertaintyCalibCoeffsHD",
         dtype="float64",
         data=np.sqrt(np.diag(covCalibCoeffsHD)),
     )  ## save uncertainty on calibration coefficients of the horizontal detector
-    fitLevel1_2["calibCoeffs"].create_dataset(
+    policy.create_dataset(
+        fitLevel1_2["calibCoeffs"],
         "uncertaintyCalibCoeffsVD",
         dtype="float64",
         data=np.sqrt(np.diag(covCalibCoeffsVD)),
     )  ## save uncertainty on calibration coefficients of the vertical detector
 
-    h5Save.close()
+    closeFile(h5Save, fileSave)
     return
 
 
@@ -0,0 +1,201 @@
+from datetime import datetime
+from functools import lru_cache
+import os
+from typing import Dict, Optional, Tuple, Union
+import h5py
+import numpy as np
+
+CALIBRATION_VALUES = {
+    "detectorCalibration": "calibCoeffs",
+    "angleCalibration": "calibratedAngle",
+}  ## group of the results of each kind of calibration
+
+
+def timestamp(time: Union[str, bytes, float, datetime]) -> float:
+    """POSIX timestamp of an ISO 8601 date (e.g. the start_time of a scan) or of a timestamp"""
+    if isinstance(time, bytes):
+        time = time.decode()
+    if isinstance(time, str):
+        time = datetime.fromisoformat(time)
+    if isinstance(time, datetime):
+        return time.timestamp()
+    return float(time)
+
+
+def _infoNumber(infos: Optional[h5py.Group], names: Tuple[str, ...]) -> float:
+    """First scan number found in infos (scans joined by + keep the first one), NaN if none"""
+    for name in names:
+        if infos is not None and name in infos:
+            value = infos[name][()]
+            if isinstance(value, bytes):
+                value = value.decode().split("+")[0]
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    return np.nan
+
+
+def scanSource(infos: Optional[h5py.Group]) -> Tuple[float, float]:
+    """Scan number and start time (POSIX timestamp) saved in the infos group of a scan, NaN if unknown"""
+    return (
+        _infoNumber(infos, ("scanNumber",)),
+        timestamp(infos["startTime"][()])
+        if infos is not None and "startTime" in infos
+        else np.nan,
+    )
+
+
+def _readResults(group: h5py.Group) -> Dict[str, np.ndarray]:
+    """Datasets of a group of calibration results as read-only arrays"""
+    results = {}
+    for dataset, value in group.items():
+        results[dataset] = np.array(value[()])
+        results[dataset].setflags(write=False)
+    return results
+
+
+def _calibration(h5Read: h5py.File, kind: str, name: str) -> Dict[str, np.ndarray]:
+    """Reads the results of one calibration"""
+    path = f"{kind}/{name}/{CALIBRATION_VALUES[kind]}"
+    if path not in h5Read:
+        raise KeyError(f"No {kind} {name} in {h5Read.filename}")
+    return _readResults(h5Read[path])
+
+
+@lru_cache(maxsize=128)
+def _readCalibration(
+    fileName: str, kind: str, name: str, mtime: int, size: int
+) -> Dict[str, np.ndarray]:
+    """Reads the results of one calibration (cached, see calibrationResults)"""
+    with h5py.File(fileName, "r") as h5Read:
+        return _calibration(h5Read, kind, name)
+
+
+def _store(h5Read: h5py.File, kind: str) -> dict:
+    """Reads all the calibrations of a kind of a results file"""
+    names, times, scans, values = [], [], [], []
+    for name, group in h5Read.get(kind, {}).items():
+        if CALIBRATION_VALUES[kind] not in group:
+            continue
+        infos = group.get("infos")
+        names.append(name)
+        times.append(
+            timestamp(infos["startTime"][()])
+            if infos is not None and "startTime" in infos
+            else np.nan
+        )
+        scans.append(
+            _infoNumber(
+                infos,
+                ("scanNumber", "scanNumberHorizontalDetector"),
+            )
+        )
+        values.append(_readResults(group[CALIBRATION_VALUES[kind]]))
+    return {
+        "names": tuple(names),
+        "times": np.array(times, dtype=float),
+        "scans": np.array(scans, dtype=float),
+        "values": tuple(values),
+    }
+
+
+@lru_cache(maxsize=16)
+def _readStore(fileName: str, kind: str, mtime: int, size: int) -> dict:
+    """Reads all the calibrations of a kind of a results file (cached, see calibrationStore)"""
+    with h5py.File(fileName, "r") as h5Read:
+        return _store(h5Read, kind)
+
+
+def _checkKind(kind: str):
+    if kind not in CALIBRATION_VALUES:
+        raise ValueError(
+            f"Unknown calibration {kind}: {' or '.join(CALIBRATION_VALUES)} expected"
+        )
+
+
+def calibrationResults(
+    fileName: Union[str, h5py.File], kind: str, name: str
+) -> Dict[str, np.ndarray]:
+    """Results of the calibration name (kind: detectorCalibration or angleCalibration) of a results file.
+
+    Returns the datasets of the calibCoeffs or calibratedAngle group as read-only arrays
+    (e.g. calibCoeffsHD, uncertaintyCalibCoeffsHD, ...). The results are cached by file, calibration
+    and modification time of the file (LRU cache): a batch of stages using the same calibration reads it once.
+    An opened (e.g. in-memory) file is read without cache.
+    """
+    _checkKind(kind)
+    if isinstance(fileName, h5py.File):
+        return _calibration(fileName, kind, name)
+    fileName = os.path.abspath(fileName)
+    stat = os.stat(fileName)
+    return _readCalibration(fileName, kind, name, stat.st_mtime_ns, stat.st_size)
+
+
+def calibrationStore(
+    fileName: Union[str, h5py.File], kind: str = "detectorCalibration"
+) -> dict:
+    """All the calibrations (kind: detectorCalibration or angleCalibration) saved in a results file.
+
+    Returns a dict with the names of the calibration groups, their time (POSIX timestamp of the
+    start of the calibration scan, NaN if unknown), their scan number (NaN if unknown) and
+    their results (dict of read-only arrays: calibCoeffs or calibratedAngle group).
+    The store is cached by path and modification time: the file is only read again when it changes
+    (an opened file is read without cache).
+    """
+    _checkKind(kind)
+    if isinstance(fileName, h5py.File):
+        return _store(fileName, kind)
+    fileName = os.path.abspath(fileName)
+    stat = os.stat(fileName)
+    return _readStore(fileName, kind, stat.st_mtime_ns, stat.st_size)
+
+
+def calibrationLookup(
+    fileName: Union[str, h5py.File],
+    kind: str = "detectorCalibration",
+    name: Optional[str] = None,
+    time: Optional[Union[str, float, datetime]] = None,
+    scan: Optional[float] = None,
+    interpolate: bool = False,
+) -> Tuple[str, Dict[str, np.ndarray]]:
+    """Results of a calibration of a results file (see calibrationStore).
+
+    The calibration is given by its group name, or it is the calibration nearest in time (ISO 8601 date
+    or timestamp) or in scan number to the measurement. The time is used when given, unless no
+    calibration has a start time: the scan numbers are used then. With interpolate, the results are linearly
+    interpolated between the calibrations before and after the measurement (the nearest outside).
+    Returns the name of the calibration (the two names joined by + when interpolated) and its results.
+    """
+    if name is not None:
+        return name, calibrationResults(fileName, kind, name)
+    store = calibrationStore(fileName, kind)
+    candidates = (
+        []
+    )  ## keys of the calibrations and position of the measurement, by order of preference
+    if time is not None:
+        candidates.append((store["times"], timestamp(time)))
+    if scan is not None:
+        candidates.append((store["scans"], float(scan)))
+    if not candidates:
+        raise ValueError("The name, the time or the scan of the calibration is needed")
+    keys, position = next(
+        ((keys, position) for keys, position in candidates if np.isfinite(keys).any()),
+        candidates[0],
+    )  ## scan numbers when no calibration has a start time (e.g. saved before it was recorded)
+    (known,) = np.nonzero(np.isfinite(keys))
+    if known.size == 0:
+        raise ValueError(f"No {kind} of {fileName} has a time or a scan number")
+    known = known[np.argsort(keys[known], kind="stable")]
+    after = np.searchsorted(keys[known], position)
+    if not interpolate or after == 0 or after == known.size:
+        nearest = known[np.argmin(np.abs(keys[known] - position))]
+        return store["names"][nearest], store["values"][nearest]
+    before, after = known[after - 1], known[after]
+    weight = (position - keys[before]) / (keys[after] - keys[before])
+    valuesBefore, valuesAfter = store["values"][before], store["values"][after]
+    return f"{store['names'][before]}+{store['names'][after]}", {
+        dataset: (1 - weight) * valuesBefore[dataset] + weight * valuesAfter[dataset]
+        for dataset in valuesBefore
+        if dataset in valuesAfter
+    }
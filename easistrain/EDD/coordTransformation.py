@@ -1,50 +1,45 @@
-from typing import Sequence
-import h5py
+from typing import Optional, Sequence
 import numpy as np
 
+from easistrain.EDD.calibrationStore import scanSource
+from easistrain.EDD.io import H5File, WritePolicy, closeFile, openFile, openedFile
 from easistrain.EDD.utils import run_from_cli
+from easistrain.geometry import apply_transformation, transformation_matrix
 
 
 def transformationMatrix(
     rx: float, ry: float, rz: float, tx: float, ty: float, tz: float
 ):
-    rx = np.deg2rad(rx)
-    ry = np.deg2rad(ry)
-    rz = np.deg2rad(rz)
-    transfMat = np.zeros((4, 4), "float64")
-    rotx = np.array(
-        [[1, 0, 0], [0, np.cos(rx), -np.sin(rx)], [0, np.sin(rx), np.cos(rx)]]
-    )  ### Rotation matrix around x, x is in the direction of the beam ###
-    roty = np.array(
-        [[np.cos(ry), 0, np.sin(ry)], [0, 1, 0], [-np.sin(ry), 0, np.cos(ry)]]
-    )  ### Rotation matrix around y, y is perpendicular to the beam and in its plane ###
-    rotz = np.array(
-        [[np.cos(rz), -np.sin(rz), 0], [np.sin(rz), np.cos(rz), 0], [0, 0, 1]]
-    )  ### Rotation matrix around z, z iz perpendicular to the beam and out of the beam plane ###
-    rotxyz = np.dot(
-        rotz, np.dot(roty, rotx)
-    )  ### Rotation matrix for 3 rotations: first around x, second around y and third around z  ###
-    transfMat[0:3, 0:3] = rotxyz[0:3, 0:3]
-    transfMat[3, 0:3] = 0
-    transfMat[0, 3] = tx
-    transfMat[1, 3] = ty
-    transfMat[2, 3] = tz
-    transfMat[3, 3] = 1
+    transfMat = np.array(
+        transformation_matrix(rx, ry, rz, tx, ty, tz)
+    )  ### Rotation matrix for 3 rotations (first around x, second around y and third around z) and translation ###
     return transfMat
 
 
 def coordTransformation(
-    fileRead: str, fileSave: str, numberOfPeaks: int, gonioToSample: Sequence[float]
+    fileRead: H5File,
+    fileSave: H5File,
+    numberOfPeaks: int,
+    gonioToSample: Sequence[float],
+    writePolicy: Optional[dict] = None,
 ):
+    policy = WritePolicy.from_config(writePolicy)
 
-    with h5py.File(fileRead, "r") as h5Read:  ## Read the h5 file of raw data
+    with openedFile(fileRead) as h5Read:  ## Read the h5 file of raw data
         scanList = list(h5Read.keys())  ## list of the scans
         lengthCounter = 0
+        sourceScan = np.zeros((0, 2), "float64")
         for scan in scanList:
             shapeDsetPeak = h5Read[f"{scan}/tthPositionsGroup/peak_0000"].shape[0]
             lengthCounter = (
                 lengthCounter + shapeDsetPeak
             )  ## shape of the matrix on which all the points for one peak will be saved
+            sourceScan = np.vstack(
+                (
+                    sourceScan,
+                    np.tile(scanSource(h5Read[scan].get("infos")), (shapeDsetPeak, 1)),
+                )
+            )  ## scan number and start time of the scan of each point (same rows as the peaks)
     transfMat = transformationMatrix(
         gonioToSample[0],
         gonioToSample[1],
@@ -53,35 +48,45 @@ def coordTransformation(
         gonioToSample[4],
         gonioToSample[5],
     )
-    h5Save = h5py.File(fileSave, "a")  ## create/append h5 file to save in
+    h5Save = openFile(fileSave, "a")  ## create/append h5 file to save in
     globalGroup = h5Save.create_group(
         "global",
     )  ## Creation of the global group in which all peaks positions of all the points will be put
+    policy.create_dataset(
+        globalGroup,
+        "sourceScan",
+        dtype="float64",
+        data=sourceScan,
+    )  ## scan number and start time (timestamp) of the scan of each point, NaN if unknown (see calibrationLookup)
 
     for peakNumber in range(numberOfPeaks):
-        globalPeak = globalGroup.create_dataset(
+        globalPeak = policy.create_dataset(
+            globalGroup,
             f"peak_{str(peakNumber).zfill(4)}",
             dtype="float64",
             data=np.zeros((lengthCounter, 13), "float64"),
         )  ## creation of the dataset of peak info (coordinate in gonio, center, ...) for each peak
-        globalPeakInSample = globalGroup.create_dataset(
+        globalPeakInSample = policy.create_dataset(
+            globalGroup,
             f"inSample_peak_{str(peakNumber).zfill(4)}",
             dtype="float64",
             data=np.zeros((lengthCounter, 13), "float64"),
         )  ## creation of the dataset of peak info (coordinate in sample, center, ...) for each peak
-        uncertaintyGlobalPeak = globalGroup.create_dataset(
+        uncertaintyGlobalPeak = policy.create_dataset(
+            globalGroup,
             f"uncertaintyPeak_{str(peakNumber).zfill(4)}",
             dtype="float64",
             data=np.zeros((lengthCounter, 13), "float64"),
         )  ## creation of the dataset of uncertainty for each peak (gonio coordinates)
-        uncertaintyGlobalPeakInSample = globalGroup.create_dataset(
+        uncertaintyGlobalPeakInSample = policy.create_dataset(
+            globalGroup,
             f"inSample_uncertaintyPeak_{str(peakNumber).zfill(4)}",
             dtype="float64",
             data=np.zeros((lengthCounter, 13), "float64"),
         )  ## creation of the dataset of uncertainty for each peak (sample coordinates)
         rowsCounter = 0
         for scan in scanList:
-            with h5py.File(fileRead, "r") as h5Read:  ## Read the h5 file of raw data
+            with openedFile(fileRead) as h5Read:  ## Read the h5 file of raw data
                 shapeDsetPeak = h5Read[f"{scan}/tthPositionsGroup/peak_0000"].shape[0]
                 globalPeak[rowsCounter : rowsCounter + shapeDsetPeak, :] = h5Read[
                     f"{scan}/tthPositionsGroup/peak_{str(peakNumber).zfill(4)}"
@@ -108,21 +113,11 @@ def coordTransformation(
                     ()
                 ]  ## same as above, then belwo convert the coordinate from gonio to sample
                 rowsCounter = rowsCounter + shapeDsetPeak
-        for icount in range(len(globalPeakInSample)):
-            coordInSample = np.dot(
-                transfMat,
-                [
-                    -globalPeakInSample[icount, 0],
-                    -globalPeakInSample[icount, 1],
-                    -globalPeakInSample[icount, 2],
-                    1,
-                ],
-            )
-            globalPeakInSample[icount, 0] = coordInSample[0]
-            globalPeakInSample[icount, 1] = coordInSample[1]
-            globalPeakInSample[icount, 2] = coordInSample[2]
+        globalPeakInSample[:, 0:3] = apply_transformation(
+            transfMat, -globalPeakInSample[:, 0:3]
+        )  ## convert the coordinates of all the points from gonio to sample
         uncertaintyGlobalPeakInSample[:, 0:3] = globalPeakInSample[:, 0:3]
-    h5Save.close()
+    closeFile(h5Save, fileSave)
     return
 
 
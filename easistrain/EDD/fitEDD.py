@@ -1,17 +1,23 @@
-from typing import Sequence
+from typing import Optional, Sequence
 import numpy as np
 import h5py
 from easistrain.EDD.io import (
+    H5File,
+    WritePolicy,
+    closeFile,
     create_info_group,
+    openFile,
+    openedFile,
     peak_dataset_data,
     save_fit_data,
+    scanStartTime,
 )
 from easistrain.EDD.utils import fit_detector_data, run_from_cli
 
 
 def fitEDD(
-    fileRead: str,
-    fileSave: str,
+    fileRead: H5File,
+    fileSave: H5File,
     sample: str,
     dataset: str,
     scanNumber: int,
@@ -22,10 +28,12 @@ def fitEDD(
     nbPeaksInBoxes: Sequence[int],
     rangeFitHD: Sequence[int],
     rangeFitVD: Sequence[int],
+    writePolicy: Optional[dict] = None,
 ):
+    policy = WritePolicy.from_config(writePolicy)
     print(f"Fitting scan n.{scanNumber}")
 
-    with h5py.File(fileRead, "r") as h5Read:  ## Read the h5 file of raw data
+    with openedFile(fileRead) as h5Read:  ## Read the h5 file of raw data
         scan_meas = h5Read.get(
             f"{sample}_{dataset}_{scanNumber}.1/measurement",
             default=None,
@@ -38,8 +46,11 @@ def fitEDD(
         ):
             print("No pattern was saved in this scan")
             return
+        startTime = scanStartTime(
+            h5Read, f"{sample}_{dataset}_{scanNumber}.1"
+        )  ## start time of the scan, used to pick the calibrations of its points
 
-        h5Save = h5py.File(fileSave, "a")  ## create/append h5 file to save in
+        h5Save = openFile(fileSave, "a")  ## create/append h5 file to save in
         scanGroup = h5Save.create_group(
             f"{sample}_{dataset}_{scanNumber}.1"
         )  ## create the group of the scan wich will contatin all the results of a scan
@@ -67,7 +78,8 @@ def fitEDD(
             pos_data = h5Read[
                 f"{sample}_{dataset}_{scanNumber}.1/instrument/positioners/{positioner}"
             ][()]
-            positionersGroup.create_dataset(
+            policy.create_dataset(
+                positionersGroup,
                 positioner,
                 dtype="float64",
                 data=pos_data,
@@ -84,11 +96,19 @@ def fitEDD(
     tthPositionsGroup = scanGroup.create_group(
         "tthPositionsGroup"
     )  ## two theta positions subgroup in scan group
-    rawDataLevel1_1.create_dataset(
-        "horizontalDetector", dtype="float64", data=patternHorizontalDetector
+    policy.create_dataset(
+        rawDataLevel1_1,
+        "horizontalDetector",
+        dtype="float64",
+        data=patternHorizontalDetector,
+        curve=True,
     )  ## save raw data of the horizontal detector
-    rawDataLevel1_1.create_dataset(
-        "verticalDetector", dtype="float64", data=patternVerticalDetector
+    policy.create_dataset(
+        rawDataLevel1_1,
+        "verticalDetector",
+        dtype="float64",
+        data=patternVerticalDetector,
+        curve=True,
     )  ## save raw data of the vertical detector
 
     for k in range(nDetectorPoints):
@@ -138,7 +158,13 @@ def fitEDD(
                 )
 
                 save_fit_data(
-                    fitLine, detector, channels, raw_data, background, fitted_data
+                    fitLine,
+                    detector,
+                    channels,
+                    raw_data,
+                    background,
+                    fitted_data,
+                    policy,
                 )
 
                 # Accumulate fit parameters of this box
@@ -151,7 +177,8 @@ def fitEDD(
         savedFitParamsHD = np.reshape(
             fitParams["horizontal"], (int(np.size(fitParams["horizontal"]) / 6), 6)
         )
-        fitParamsGroup.create_dataset(
+        policy.create_dataset(
+            fitParamsGroup,
             "fitParamsHD",
             dtype="float64",
             data=savedFitParamsHD,
@@ -160,7 +187,8 @@ def fitEDD(
             uncertaintyFitParams["horizontal"],
             (int(np.size(uncertaintyFitParams["horizontal"]) / 5), 5),
         )
-        fitParamsGroup.create_dataset(
+        policy.create_dataset(
+            fitParamsGroup,
             "uncertaintyFitParamsHD",
             dtype="float64",
             data=savedUncertaintyFitParamsHD,
@@ -169,7 +197,8 @@ def fitEDD(
         savedFitParamsVD = np.reshape(
             fitParams["vertical"], (int(np.size(fitParams["vertical"]) / 6), 6)
         )
-        fitParamsGroup.create_dataset(
+        policy.create_dataset(
+            fitParamsGroup,
             "fitParamsVD",
             dtype="float64",
             data=savedFitParamsVD,
@@ -178,19 +207,22 @@ def fitEDD(
             uncertaintyFitParams["vertical"],
             (int(np.size(uncertaintyFitParams["vertical"]) / 5), 5),
         )
-        fitParamsGroup.create_dataset(
+        policy.create_dataset(
+            fitParamsGroup,
             "uncertaintyFitParamsVD",
             dtype="float64",
             data=savedUncertaintyFitParamsVD,
         )  ## save uncertainty on the parameters of the fit of VD
         for peakNumber in range(np.sum(nbPeaksInBoxes)):
             if f"peak_{str(peakNumber).zfill(4)}" not in tthPositionsGroup.keys():
-                peakDataset = tthPositionsGroup.create_dataset(
+                peakDataset = policy.create_dataset(
+                    tthPositionsGroup,
                     f"peak_{str(peakNumber).zfill(4)}",
                     dtype="float64",
                     data=np.zeros((2, 13), "float64"),
                 )  ## create a dataset for each peak in tthPositionGroup
-                uncertaintyPeakDataset = tthPositionsGroup.create_dataset(
+                uncertaintyPeakDataset = policy.create_dataset(
+                    tthPositionsGroup,
                     f"uncertaintyPeak_{str(peakNumber).zfill(4)}",
                     dtype="float64",
                     data=np.zeros((2, 13), "float64"),
@@ -235,9 +267,10 @@ def fitEDD(
         rangeFitHD,
         rangeFitVD,
         positioners,
+        startTime=startTime,
     )
 
-    h5Save.close()
+    closeFile(h5Save, fileSave)
 
     return
 
@@ -1,9 +1,241 @@
-from typing import Sequence, Union
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Union
+from uuid import uuid4
 import h5py
+import hdf5plugin
 import numpy as np
 
 nxchar = h5py.special_dtype(vlen=str)
 
+H5File = Union[
+    str, Path, h5py.File
+]  ## path of an HDF5 file or opened (in-memory) HDF5 file
+
+
+def _compressionFilters(compression: Optional[str], level: Optional[int]) -> dict:
+    """Keyword arguments of create_dataset for a compression name"""
+    if compression is None:
+        return {}
+    if compression == "blosc-lz4":
+        return dict(
+            hdf5plugin.Blosc(
+                cname="lz4",
+                clevel=5 if level is None else level,
+                shuffle=hdf5plugin.Blosc.BITSHUFFLE,
+            )
+        )
+    if compression == "bitshuffle":
+        return dict(hdf5plugin.Bitshuffle(cname="lz4"))
+    if compression == "gzip":
+        return {"compression": "gzip", "compression_opts": level}
+    if compression == "lzf":
+        return {"compression": "lzf"}
+    raise ValueError(
+        f"Unknown compression {compression}: blosc-lz4, bitshuffle, gzip, lzf or None expected"
+    )
+
+
+class WritePolicy:
+    """How the numerical datasets of the EDD results are written.
+
+    Arrays of at least minimumSize bytes are chunked and compressed, smaller ones
+    (and strings) are written as given. By default the arrays are not compressed, and then
+    contiguous unless chunks are given (chunks without filter only slow the reads down): blosc-lz4
+    and bitshuffle are faster and smaller but the files then need hdf5plugin to be read. Curve data (patterns, backgrounds, fits)
+    can be downcast to curveDtype (e.g. float32); parameters and results keep their dtype.
+
+    It is configured with the writePolicy entry of the config files of the EDD stages:
+
+        writePolicy:
+          compression: blosc-lz4  # blosc-lz4, bitshuffle, gzip, lzf or null
+          compressionLevel: 5
+          chunks: true  # null (automatic chunk shapes if compressed), true, false or a chunk shape
+          curveDtype: float32
+    """
+
+    def __init__(
+        self,
+        compression: Optional[str] = None,
+        compressionLevel: Optional[int] = None,
+        chunks: Union[None, bool, Sequence[int]] = None,
+        curveDtype: Optional[str] = None,
+        minimumSize: int = 4096,
+    ):
+        self.filters = _compressionFilters(compression, compressionLevel)
+        if chunks is None:
+            chunks = bool(self.filters)
+        self.chunks = chunks if isinstance(chunks, bool) else tuple(chunks)
+        if self.chunks is False and self.filters:
+            raise ValueError(f"Compression {compression} needs chunks")
+        self.curveDtype = None if curveDtype is None else np.dtype(curveDtype)
+        self.minimumSize = minimumSize
+
+    @classmethod
+    def from_config(cls, config: Union[None, dict, "WritePolicy"]) -> "WritePolicy":
+        if isinstance(config, WritePolicy):
+            return config
+        return cls(**(config or {}))
+
+    def create_dataset(
+        self,
+        group: h5py.Group,
+        name: str,
+        shape=None,
+        dtype=None,
+        data=None,
+        curve: bool = False,
+        **kwargs,
+    ) -> h5py.Dataset:
+        """Same as h5py.Group.create_dataset, with the chunks, compression and dtype of the policy"""
+        if dtype is None:
+            dtype = "f4" if data is None else np.asarray(data).dtype  # default of h5py
+        if np.dtype(dtype).kind not in "iuf":
+            return group.create_dataset(name, shape, dtype, data, **kwargs)
+        dtype = np.dtype(dtype)
+        if data is not None:
+            data = np.asarray(data)
+            shape = data.shape
+        if curve and self.curveDtype is not None and dtype.kind == "f":
+            dtype = self.curveDtype
+        if (
+            self.chunks is not False
+            and shape
+            and np.prod(shape) * dtype.itemsize >= self.minimumSize
+        ):
+            if self.chunks is True or len(self.chunks) == len(shape):
+                kwargs.setdefault("chunks", self.chunks)
+            else:
+                kwargs.setdefault("chunks", True)
+            for key, value in self.filters.items():
+                kwargs.setdefault(key, value)
+        return group.create_dataset(name, shape=shape, dtype=dtype, data=data, **kwargs)
+
+
+def inMemoryFile(name: str = "results") -> h5py.File:
+    """HDF5 file kept in memory (never written on disk), in which a stage saves results passed to the next ones"""
+    return h5py.File(
+        f"{name}_{uuid4().hex}.h5", "w", driver="core", backing_store=False
+    )
+
+
+def resultsToDict(group: h5py.Group) -> dict:
+    """Content of an HDF5 group as a nested dict of NumPy arrays (e.g. the results of a stage kept in memory).
+
+    Subgroups are dicts, the attributes of a group are saved with the keys "@name" and the ones of
+    a dataset with the keys "dataset@name" (same convention as silx.io.dictdump).
+    """
+    results = {f"@{name}": value for name, value in group.attrs.items()}
+    for name, item in group.items():
+        if isinstance(item, h5py.Group):
+            results[name] = resultsToDict(item)
+            continue
+        results[name] = (
+            item.asstr()[()] if h5py.check_string_dtype(item.dtype) else item[()]
+        )
+        for attribute, value in item.attrs.items():
+            results[f"{name}@{attribute}"] = value
+    return results
+
+
+def _saveResults(group: h5py.Group, results: dict):
+    """Saves a nested dict of results (see resultsToDict) in an HDF5 group"""
+    attributes = {}
+    for name, value in results.items():
+        if "@" in name:
+            attributes[name] = value
+        elif isinstance(value, dict):
+            _saveResults(group.create_group(name), value)
+        elif isinstance(value, str) or np.asarray(value).dtype.kind in "OU":
+            group.create_dataset(
+                name, data=np.asarray(value, dtype=object), dtype=nxchar
+            )
+        else:
+            group.create_dataset(name, data=value)
+    for name, value in attributes.items():
+        item, attribute = name.split("@", 1)
+        if isinstance(value, str) or np.asarray(value).dtype.kind in "OU":
+            value = as_nxchar(value)
+        (group[item] if item else group).attrs[attribute] = value
+
+
+def resultsFile(results: dict, name: str = "results") -> h5py.File:
+    """In-memory HDF5 file (see inMemoryFile) with the results of a stage given as a nested dict (see resultsToDict)"""
+    h5File = inMemoryFile(name)
+    _saveResults(h5File, results)
+    return h5File
+
+
+def fileName(file: H5File) -> str:
+    """Path of an HDF5 file (name of the file for an opened file) saved in the infos of the results"""
+    return file.filename if isinstance(file, h5py.File) else str(file)
+
+
+def openFile(file: H5File, mode: str = "r") -> h5py.File:
+    """Opens an HDF5 file from its path, an opened file is used as it is (see closeFile)"""
+    return file if isinstance(file, h5py.File) else h5py.File(file, mode)
+
+
+def closeFile(h5File: h5py.File, file: H5File):
+    """Closes a file opened by openFile from a path, the opened files given to openFile stay open"""
+    if not isinstance(file, h5py.File):
+        h5File.close()
+
+
+@contextmanager
+def openedFile(file: H5File, mode: str = "r") -> Iterator[h5py.File]:
+    """Context manager of openFile and closeFile"""
+    h5File = openFile(file, mode)
+    try:
+        yield h5File
+    finally:
+        closeFile(h5File, file)
+
+
+def accumulatedSpectrum(
+    h5Read: h5py.Group,
+    spectraPaths: Sequence[str],
+    mode: str = "sum",
+    deadTimePaths: Optional[Sequence[str]] = None,
+    framesPerRead: int = 100,
+) -> np.ndarray:
+    """Accumulates all the frames of one or several datasets of spectra, framesPerRead frames at a time.
+
+    mode "sum" gives the sum of the frames, mode "average" the average of the frames weighted by their live time
+    when deadTimePaths (dead time fraction of each frame, one dataset per spectra dataset) are given:
+    sum(counts) / sum(1 - deadTime), i.e. the mean of the dead time corrected spectra weighted by the live time.
+    """
+    if mode not in ("sum", "average"):
+        raise ValueError(f"Unknown mode {mode}: sum or average expected")
+    if deadTimePaths is not None and len(deadTimePaths) != len(spectraPaths):
+        raise ValueError("One dead time dataset is expected for each spectra dataset")
+    spectrum = None
+    weight = 0.0
+    for n, path in enumerate(spectraPaths):
+        spectra = h5Read[path]
+        frames = spectra[()][np.newaxis] if spectra.ndim == 1 else spectra
+        if deadTimePaths is None:
+            weight += len(frames)
+        else:
+            deadTime = np.atleast_1d(h5Read[deadTimePaths[n]][()])
+            weight += np.sum(1 - deadTime[: len(frames)])
+        for start in range(0, len(frames), framesPerRead):
+            block = frames[start : start + framesPerRead]  ## only this block is read
+            if spectrum is None:
+                spectrum = np.zeros(block.shape[1:], dtype=float)
+            spectrum += np.sum(block, axis=0, dtype=float)
+    if spectrum is None:
+        raise ValueError("No spectrum to accumulate")
+    return spectrum if mode == "sum" else spectrum / weight
+
+
+def scanStartTime(h5Read: h5py.Group, scan: str) -> Optional[str]:
+    """Start time (ISO 8601) of a scan of a raw data file, None if it is not recorded"""
+    if scan not in h5Read or "start_time" not in h5Read[scan]:
+        return None
+    startTime = h5Read[scan]["start_time"][()]
+    return startTime.decode() if isinstance(startTime, bytes) else str(startTime)
+
 
 def as_nxchar(s: Union[str, Sequence[str]]) -> np.ndarray:
     return np.array(s, dtype=nxchar)
@@ -11,8 +243,8 @@ def as_nxchar(s: Union[str, Sequence[str]]) -> np.ndarray:
 
 def create_info_group(
     root: h5py.Group,
-    fileRead: str,
-    fileSave: str,
+    fileRead: H5File,
+    fileSave: H5File,
     sample: str,
     dataset: str,
     scanNumber: int,
@@ -23,13 +255,14 @@ def create_info_group(
     rangeFitHD: Sequence[int],
     rangeFitVD: Sequence[int],
     positioners: Sequence[str],
+    startTime: Optional[str] = None,
 ):
     infoGroup = root.create_group("infos")  ## infos group creation
     infoGroup.create_dataset(
-        "fileRead", dtype=h5py.string_dtype(encoding="utf-8"), data=fileRead
+        "fileRead", dtype=h5py.string_dtype(encoding="utf-8"), data=fileName(fileRead)
     )  ## save path of raw data file in infos group
     infoGroup.create_dataset(
-        "fileSave", dtype=h5py.string_dtype(encoding="utf-8"), data=fileSave
+        "fileSave", dtype=h5py.string_dtype(encoding="utf-8"), data=fileName(fileSave)
     )  ## save path of the file in which results will be saved in info group
     infoGroup.create_dataset(
         "sample", dtype=h5py.string_dtype(encoding="utf-8"), data=sample
@@ -65,6 +298,10 @@ def create_info_group(
     infoGroup.create_dataset(
         "positioners", dtype=h5py.string_dtype(encoding="utf-8"), data=str(positioners)
     )  ## save of the range of the fit of each box/window of the vertical detector in infos group
+    if startTime is not None:
+        infoGroup.create_dataset(
+            "startTime", dtype=h5py.string_dtype(encoding="utf-8"), data=startTime
+        )  ## save of the start time of the scan in infos group (see calibrationStore)
 
 
 def peak_dataset_data(
@@ -96,37 +333,51 @@ def save_fit_data(
     raw_data: np.ndarray,
     background: np.ndarray,
     fitted_data: np.ndarray,
+    policy: Optional[WritePolicy] = None,
 ):
+    policy = WritePolicy.from_config(policy)
     detectorGroup = fitLine.create_group(detectorName)
-    detectorGroup.create_dataset(
+    policy.create_dataset(
+        detectorGroup,
         "channels",
         dtype="float64",
         data=channels,
+        curve=True,
     )
-    detectorGroup.create_dataset(
+    policy.create_dataset(
+        detectorGroup,
         "raw_data",
         dtype="float64",
         data=raw_data,
+        curve=True,
     )
-    detectorGroup.create_dataset(
+    policy.create_dataset(
+        detectorGroup,
         "background",
         dtype="float64",
         data=background,
+        curve=True,
     )
-    detectorGroup.create_dataset(
+    policy.create_dataset(
+        detectorGroup,
         "data - background",
         dtype="float64",
         data=raw_data - background,
+        curve=True,
     )
-    detectorGroup.create_dataset(
+    policy.create_dataset(
+        detectorGroup,
         "fitted_data",
         dtype="float64",
         data=fitted_data,
+        curve=True,
     )
-    detectorGroup.create_dataset(
+    policy.create_dataset(
+        detectorGroup,
         "residual",
         dtype="float64",
         data=np.absolute(fitted_data - raw_data),
+        curve=True,
     )
 
     # NeXus
@@ -0,0 +1,334 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import h5py
+import numpy as np
+
+from easistrain.EDD.calibrants import calibrantLines
+from easistrain.EDD.calibrationEDD import scanLabel
+from easistrain.EDD.constants import pCstInkeVS, speedLightInAPerS
+from easistrain.EDD.io import (
+    H5File,
+    WritePolicy,
+    closeFile,
+    fileName,
+    openFile,
+    openedFile,
+    scanStartTime,
+)
+from easistrain.EDD.utils import calibrationFits, jointCalibrationFit, run_from_cli
+
+DETECTORS = {"HD": "HorizontalDetector", "VD": "VerticalDetector"}
+
+
+def _saveBoxesFits(
+    rawDataGroup: h5py.Group,
+    fitGroup: h5py.Group,
+    patterns: Dict[str, np.ndarray],
+    boxesFits: Dict[str, List[Dict[str, np.ndarray]]],
+    policy: WritePolicy,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Saves the patterns, the curves and the parameters of the fit of the boxes as calibEdd and angleCalibrationEDD.
+
+    Returns the position (channel) and its uncertainty of all the peaks of each detector
+    """
+    fitGroup.create_group("fitParams")  ## fit results group for the two detector
+    for name in DETECTORS.values():
+        policy.create_dataset(
+            rawDataGroup,
+            name[0].lower() + name[1:],
+            dtype="float64",
+            data=patterns[name],
+            curve=True,
+        )  ## save raw data of the detector
+    for i in range(len(boxesFits[DETECTORS["HD"]])):
+        fitLine = fitGroup.create_group(
+            f"fitLine_{str(i)}"
+        )  ## create group for each calibration peak
+        for name, boxFits in boxesFits.items():
+            for curve in ("raw", "background", "bgdSubsData", "fit", "error"):
+                policy.create_dataset(
+                    fitLine,
+                    curve + name,
+                    dtype="float64",
+                    data=boxFits[i][curve],
+                    curve=True,
+                )  ## raw data, background, data without background, fitted data and error of each calibration peak
+    positions = {}
+    for detector, name in DETECTORS.items():
+        fitParams = np.concatenate([boxFit["fitParams"] for boxFit in boxesFits[name]])
+        uncertaintyFitParams = np.concatenate(
+            [boxFit["uncertaintyFitParams"] for boxFit in boxesFits[name]]
+        )
+        policy.create_dataset(
+            fitGroup["fitParams"],
+            "fitParams" + detector,
+            dtype="float64",
+            data=fitParams,
+        )  ## save parameters of the fit of the detector
+        policy.create_dataset(
+            fitGroup["fitParams"],
+            "uncertaintyFitParams" + detector,
+            dtype="float64",
+            data=uncertaintyFitParams,
+        )  ## save uncertainty on the parameters of the fit of the detector
+        positions[detector] = (fitParams[:, 1], uncertaintyFitParams[:, 1])
+    return positions
+
+
+def jointCalibrationEDD(
+    fileRead: H5File,
+    fileSave: H5File,
+    sample: str,
+    dataset: Union[str, int],
+    scanNumberHorizontalDetector: Union[str, int],
+    scanNumberVerticalDetector: Union[str, int],
+    scanNumber: Union[str, int],
+    nameHorizontalDetector: str,
+    nameVerticalDetector: str,
+    nbPeaksInBoxes: Sequence[int],
+    rangeFit: Sequence[int],
+    sampleNbPeaksInBoxes: Sequence[int],
+    rangeFitHD: Sequence[int],
+    rangeFitVD: Sequence[int],
+    sourceCalibrantFile: str,
+    sampleCalibrantFile: str,
+    writePolicy: Optional[dict] = None,
+):
+    """Calibrates the channel to energy conversion and the diffraction angle of the two detectors in one step.
+
+    The peaks of the source (scanNumberHorizontalDetector and scanNumberVerticalDetector, boxes nbPeaksInBoxes
+    and rangeFit as calibEdd) and of the calibrant sample (scanNumber, boxes sampleNbPeaksInBoxes, rangeFitHD
+    and rangeFitVD as angleCalibrationEDD) are fitted together (see jointCalibrationFit).
+    The results are saved in fileSave in the groups of calibEdd (detectorCalibration) and of
+    angleCalibrationEDD (angleCalibration), so fileSave can be used as the detector and the angle
+    calibration files of the next stages. The covariance (4, 4) of a, b, c and h*c/(2*sin(theta))
+    is saved in both groups (jointCovarianceHD and jointCovarianceVD).
+    """
+    policy = WritePolicy.from_config(writePolicy)
+
+    with openedFile(fileRead) as h5Read:  ## Read the h5 file of raw data
+        startTimes = (
+            scanStartTime(
+                h5Read, f"{sample}_{dataset}_{scanNumberHorizontalDetector}.1"
+            ),
+            scanStartTime(h5Read, f"{sample}_{dataset}_{scanNumber}.1"),
+        )  ## start time of the calibration scans of the source and of the calibrant sample
+        sourcePatterns = {
+            DETECTORS["HD"]: h5Read[
+                f"{sample}_{dataset}_{scanNumberHorizontalDetector}.1/measurement/{nameHorizontalDetector}"
+            ][0],
+            DETECTORS["VD"]: h5Read[
+                f"{sample}_{dataset}_{scanNumberVerticalDetector}.1/measurement/{nameVerticalDetector}"
+            ][0],
+        }  ## calibration patterns of the source
+        samplePatterns = {
+            DETECTORS["HD"]: h5Read[
+                f"{sample}_{dataset}_{scanNumber}.1/measurement/{nameHorizontalDetector}"
+            ][0],
+            DETECTORS["VD"]: h5Read[
+                f"{sample}_{dataset}_{scanNumber}.1/measurement/{nameVerticalDetector}"
+            ][0],
+        }  ## calibration patterns of the calibrant sample
+
+    sourceFits = calibrationFits(
+        sourcePatterns,
+        {name: rangeFit for name in DETECTORS.values()},
+        nbPeaksInBoxes,
+        stripIterations=5000,
+    )  ## fit of all the boxes of the source
+    sampleFits = calibrationFits(
+        samplePatterns,
+        {DETECTORS["HD"]: rangeFitHD, DETECTORS["VD"]: rangeFitVD},
+        sampleNbPeaksInBoxes,
+        stripIterations=4000,
+    )  ## fit of all the boxes of the calibrant sample
+    sourceEnergies = calibrantLines(sourceCalibrantFile)[: np.sum(nbPeaksInBoxes)]
+    sampleDSpacings = calibrantLines(sampleCalibrantFile)[
+        : np.sum(sampleNbPeaksInBoxes)
+    ]
+
+    h5Save = openFile(fileSave, "a")  ## create/append h5 file to save in
+    detectorCalibrationName = (
+        f"fit_{dataset}_{scanLabel(scanNumberHorizontalDetector)}"
+        f"_{scanLabel(scanNumberVerticalDetector)}"
+    )
+    calibrationLevel1 = h5Save.require_group(
+        "detectorCalibration"
+    )  ## calibration group
+    calibrationFit = calibrationLevel1.create_group(
+        detectorCalibrationName
+    )  ## fit subgroup in calibration group
+    angleCalibrationLevel1 = h5Save.require_group(
+        "angleCalibration"
+    )  ## angleCalibration group
+    angleFit = angleCalibrationLevel1.create_group(
+        f"fit_{dataset}_{scanNumber}"
+    )  ## fit subgroup in angleCalibration group
+    sourcePositions = _saveBoxesFits(
+        calibrationLevel1.create_group(
+            f"rawData_{dataset}_{scanLabel(scanNumberHorizontalDetector)}"
+            f"_{scanLabel(scanNumberVerticalDetector)}"
+        ),
+        calibrationFit,
+        sourcePatterns,
+        sourceFits,
+        policy,
+    )
+    samplePositions = _saveBoxesFits(
+        angleCalibrationLevel1.create_group(f"rawData_{dataset}_{scanNumber}"),
+        angleFit,
+        samplePatterns,
+        sampleFits,
+        policy,
+    )
+
+    for group, scans, calibrantFile, boxes, startTime in (
+        (
+            calibrationFit,
+            {
+                "scanNumberHorizontalDetector": scanLabel(scanNumberHorizontalDetector),
+                "scanNumberVerticalDetector": scanLabel(scanNumberVerticalDetector),
+            },
+            ("sourceCalibrantFile", sourceCalibrantFile),
+            {"nbPeaksInBoxes": nbPeaksInBoxes, "rangeFit": rangeFit},
+            startTimes[0],
+        ),
+        (
+            angleFit,
+            {"scanNumber": str(scanNumber)},
+            ("sampleCalibrantFile", sampleCalibrantFile),
+            {
+                "nbPeaksInBoxes": sampleNbPeaksInBoxes,
+                "rangeFitHD": rangeFitHD,
+                "rangeFitVD": rangeFitVD,
+            },
+            startTimes[1],
+        ),
+    ):
+        infoGroup = group.create_group("infos")  ## infos group creation
+        for name, value in {
+            "fileRead": fileName(fileRead),
+            "fileSave": fileName(fileSave),
+            "sample": sample,
+            "dataset": str(dataset),
+            **scans,
+            "nameHorizontalDetector": nameHorizontalDetector,
+            "nameVerticalDetector": nameVerticalDetector,
+            calibrantFile[0]: calibrantFile[1],
+            "fittingFunction": "asymmetric Pseudo-Voigt",
+            "calibration": "joint energy and angle calibration",
+            **({} if startTime is None else {"startTime": startTime}),
+        }.items():
+            infoGroup.create_dataset(
+                name, dtype=h5py.string_dtype(encoding="utf-8"), data=value
+            )  ## save the parameters of the calibration in infos group
+        infoGroup.create_dataset(
+            "numberOfBoxes", dtype="int", data=len(boxes["nbPeaksInBoxes"])
+        )  ## save of the number of the boxes/widows extracted from the raw data in infos group
+        for name, value in boxes.items():
+            infoGroup.create_dataset(
+                name, dtype="int", data=value
+            )  ## save of the number of peaks per box and of the ranges of the fit in infos group
+    angleFit["infos"].create_dataset(
+        "pathDetectorCalibrationParams",
+        dtype=h5py.string_dtype(encoding="utf-8"),
+        data=f"{fileName(fileSave)}/detectorCalibration/{detectorCalibrationName}/calibCoeffs",
+    )  ## save of the path of the energy calibration coefficients of the two detectors in the info group
+
+    for groupName in ("curveCalibration", "calibCoeffs"):
+        calibrationFit.create_group(groupName)
+    for groupName in ("curveAngleCalibration", "calibratedAngle"):
+        angleFit.create_group(groupName)
+    for detector in DETECTORS:
+        sourceChannels, uSourceChannels = sourcePositions[detector]
+        sampleChannels, uSampleChannels = samplePositions[detector]
+        params, covariance = jointCalibrationFit(
+            sourceChannels,
+            sourceEnergies,
+            sampleChannels,
+            sampleDSpacings,
+            uSourceChannels,
+            uSampleChannels,
+        )  ## joint fit of the energy calibration coefficients and of 12.398/2*sin(theta)
+        calibCoeffs, calibratedAngle = params[:3], params[3]
+        uncertainties = np.sqrt(np.diag(covariance))
+
+        curveCalibration = np.transpose((sourceChannels, sourceEnergies))
+        fitCurveCalibration = np.polyval(calibCoeffs, sourceChannels)
+        for name, data in (
+            ("curveCalibration", curveCalibration),
+            (
+                "fitCurveCalibration",
+                np.transpose((sourceChannels, fitCurveCalibration)),
+            ),
+            (
+                "errorCurveCalibration",
+                np.transpose(
+                    (sourceChannels, np.abs(fitCurveCalibration - sourceEnergies))
+                ),
+            ),
+        ):
+            policy.create_dataset(
+                calibrationFit["curveCalibration"],
+                name + detector,
+                dtype="float64",
+                data=data,
+            )  ## curve energy VS channels, fitted curve and error between fitted and raw curve
+        for name, data in (
+            ("calibCoeffs", calibCoeffs),
+            ("uncertaintyCalibCoeffs", uncertainties[:3]),
+            ("jointCovariance", covariance),
+        ):
+            policy.create_dataset(
+                calibrationFit["calibCoeffs"],
+                name + detector,
+                dtype="float64",
+                data=data,
+            )  ## save calibration coefficients of the detector, their uncertainty and the covariance of the joint fit
+
+        inverseDSpacings = 1 / sampleDSpacings
+        sampleEnergies = np.polyval(calibCoeffs, sampleChannels)
+        for name, data in (
+            (
+                "curveAngleCalibration",
+                np.transpose((inverseDSpacings, sampleEnergies)),
+            ),
+            (
+                "fitCurveAngleCalibration",
+                np.transpose((inverseDSpacings, calibratedAngle * inverseDSpacings)),
+            ),
+            (
+                "errorCurveAngleCalibration",
+                np.transpose(
+                    (
+                        inverseDSpacings,
+                        np.abs(sampleEnergies - calibratedAngle * inverseDSpacings),
+                    )
+                ),
+            ),
+        ):
+            policy.create_dataset(
+                angleFit["curveAngleCalibration"],
+                name + detector,
+                dtype="float64",
+                data=data,
+            )  ## curve energy VS 1/d, fitted curve and error between fitted and experimental curve
+        for name, data in (
+            (
+                "calibratedAngle",
+                np.rad2deg(
+                    2 * np.arcsin((pCstInkeVS * speedLightInAPerS) / (2 * params[3:]))
+                ),
+            ),
+            ("uncertaintyCalibratedAngle", uncertainties[3:]),
+            ("jointCovariance", covariance),
+        ):
+            policy.create_dataset(
+                angleFit["calibratedAngle"], name + detector, dtype="float64", data=data
+            )  ## save the calibrated diffraction angle in degree, the uncertainty of 12.398/2*sin(theta) and the covariance of the joint fit
+
+    closeFile(h5Save, fileSave)
+    return
+
+
+if __name__ == "__main__":
+    run_from_cli(jointCalibrationEDD)
@@ -36,3 +36,25 @@ def compute_qs(angles: np.ndarray):
         + (cos_chi * sin_theta * sin_omega)
     )
     return q1, q2, q3
+
+
+def qs_design_matrix(q1, q2, q3) -> np.ndarray:
+    """Coefficients (nAngles, 6) of e11, e22, e33, e23, e13, e12 in the strain along the directions q (see compute_qs)"""
+    return np.stack(
+        (q1**2, q2**2, q3**2, 2 * q2 * q3, 2 * q1 * q3, 2 * q1 * q2), axis=-1
+    )
+
+
+def strain_design_matrix(angles: np.ndarray) -> np.ndarray:
+    """Coefficients (nAngles, 6) of e11, e22, e33, e23, e13, e12 in the strain along the measurement direction"""
+    return qs_design_matrix(*compute_qs(angles))
+
+
+def strains_in_meas_direction(angles: np.ndarray, tensors: np.ndarray) -> np.ndarray:
+    """Strain along the measurement direction for a batch of angles and a batch of strain tensors
+
+    angles: phi, chi, omega, delta, 2*theta as columns (nAngles, 5)
+    tensors: e11, e22, e33, e23, e13, e12 as columns (nTensors, 6) or one tensor (6,)
+    Returns the strains (nTensors, nAngles) or (nAngles,) for one tensor
+    """
+    return np.matmul(np.asarray(tensors), strain_design_matrix(angles).T)
@@ -0,0 +1,119 @@
+from typing import Optional, Sequence
+import numpy as np
+from easistrain.EDD.math import strain_design_matrix
+from easistrain.EDD.preStraind0cstEDD import ustrain
+from easistrain.EDD.utils import uChEConversion
+
+
+def planAngles(orientations: np.ndarray, detectorAngles: np.ndarray) -> np.ndarray:
+    """Measurement angles of plans of sample orientations measured with several detectors
+
+    orientations: phi, chi, omega as columns (..., nOrientations, 3) in degrees
+    detectorAngles: delta, 2*theta of each detector (nDetectors, 2) in degrees
+    Returns phi, chi, omega, delta, 2*theta as columns (..., nOrientations * nDetectors, 5)
+    """
+    orientations = np.asarray(orientations, dtype=float)
+    detectorAngles = np.atleast_2d(np.asarray(detectorAngles, dtype=float))
+    shape = orientations.shape[:-1] + (len(detectorAngles),)
+    angles = np.concatenate(
+        (
+            np.broadcast_to(orientations[..., None, :], shape + (3,)),
+            np.broadcast_to(detectorAngles, shape + (2,)),
+        ),
+        axis=-1,
+    )
+    return angles.reshape(orientations.shape[:-2] + (-1, 5))
+
+
+def predictedStrainUncertainty(
+    channel,
+    calibCoefficients: Sequence[float],
+    uCalibCoefficients: Sequence[float],
+    uChannel,
+    energy0,
+    uEnergy0,
+):
+    """Expected uncertainty of a measured strain from the uncertainty of the peak position (channel),
+    of the channel to energy calibration (a, b, c) and of the strain-free energy"""
+    a, b, c = calibCoefficients
+    ua, ub, uc = uCalibCoefficients
+    energy = a * channel**2 + b * channel + c
+    uEnergy = uChEConversion(a, b, c, channel, ua, ub, uc, uChannel)
+    return ustrain(energy0, energy, uEnergy0, uEnergy)
+
+
+def designMatrices(angles: np.ndarray) -> np.ndarray:
+    """Design matrices (..., nMeasurements, 6) of the strain tensor fit for plans of angles (..., nMeasurements, 5)"""
+    angles = np.asarray(angles, dtype=float)
+    return strain_design_matrix(angles.reshape(-1, 5)).reshape(angles.shape[:-1] + (6,))
+
+
+def simulatePlans(angles: np.ndarray, uStrain) -> dict:
+    """Predicted conditioning and uncertainties of the strain tensor fit (see strainStressTensor) of measurement plans
+
+    angles: phi, chi, omega, delta, 2*theta of the measurements of each plan (nPlans, nMeasurements, 5)
+    or of one plan (nMeasurements, 5), see planAngles
+    uStrain: uncertainty of the measured strains, broadcastable to (nPlans, nMeasurements)
+    Returns a dictionary with for each plan:
+    conditionNumber: condition number of the weighted design matrix (inf if the tensor can not be determined)
+    covariance: covariance of e11, e22, e33, e23, e13, e12 (6, 6), inf if the tensor can not be determined
+    tensorUncertainty: uncertainty of e11, e22, e33, e23, e13, e12 (6,)
+    """
+    design = designMatrices(angles)
+    weightedDesign = design / np.asarray(uStrain, dtype=float)[..., None]
+    singularValues = np.linalg.svd(weightedDesign, compute_uv=False)
+    with np.errstate(divide="ignore"):
+        conditionNumber = singularValues[..., 0] / singularValues[..., -1]
+    conditionNumber = np.where(
+        singularValues[..., -1] > singularValues[..., 0] * 1e-12,
+        conditionNumber,
+        np.inf,
+    )
+    determined = np.isfinite(conditionNumber)
+    normalMatrix = np.matmul(np.swapaxes(weightedDesign, -1, -2), weightedDesign)
+    covariance = np.full(normalMatrix.shape, np.inf)
+    covariance[determined] = np.linalg.inv(normalMatrix[determined])
+    return {
+        "conditionNumber": conditionNumber,
+        "covariance": covariance,
+        "tensorUncertainty": np.sqrt(np.diagonal(covariance, axis1=-2, axis2=-1)),
+    }
+
+
+def selectOrientations(
+    orientations: np.ndarray,
+    detectorAngles: np.ndarray,
+    uStrain,
+    numberOfOrientations: int,
+    selected: Optional[Sequence[int]] = None,
+) -> list:
+    """Greedy selection of the candidate orientations which improve the most the strain tensor fit
+
+    orientations: phi, chi, omega of the candidate orientations (nOrientations, 3) in degrees
+    detectorAngles: delta, 2*theta of each detector (nDetectors, 2) in degrees
+    uStrain: uncertainty of the measured strains, broadcastable to (nOrientations, nDetectors)
+    numberOfOrientations: number of orientations of the plan
+    selected: indices of orientations which are measured anyway
+    At each step, the orientation which maximizes the determinant of the information matrix is added
+    (D-optimal design). Returns the indices of the orientations of the plan in the order of selection.
+    """
+    orientations = np.asarray(orientations, dtype=float)
+    detectorAngles = np.atleast_2d(np.asarray(detectorAngles, dtype=float))
+    design = designMatrices(planAngles(orientations, detectorAngles)).reshape(
+        len(orientations), len(detectorAngles), 6
+    )
+    weights = np.broadcast_to(
+        1 / np.asarray(uStrain, dtype=float) ** 2, design.shape[:2]
+    )
+    information = np.einsum("odi,od,odj->oij", design, weights, design)
+    selected = [] if selected is None else list(selected)
+    planInformation = np.sum(information[selected], axis=0)
+    # small regularization so that the first orientations can be compared before the tensor is determined
+    regularization = 1e-9 * np.amax(np.trace(information, axis1=1, axis2=2)) * np.eye(6)
+    while len(selected) < min(numberOfOrientations, len(orientations)):
+        _, logDet = np.linalg.slogdet(planInformation + information + regularization)
+        logDet[selected] = -np.inf
+        best = int(np.argmax(logDet))
+        selected.append(best)
+        planInformation = planInformation + information[best]
+    return selected
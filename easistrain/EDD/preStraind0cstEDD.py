@@ -1,8 +1,10 @@
-from typing import Sequence
-import numpy as np
+from typing import Optional, Sequence, Tuple, Union
 import h5py
+import numpy as np
 
+from easistrain.EDD.calibrationStore import calibrationLookup
 from easistrain.EDD.constants import pCstInkeVS, speedLightInAPerS
+from easistrain.EDD.io import H5File, WritePolicy, closeFile, openFile, openedFile
 from easistrain.EDD.math import compute_qs
 from easistrain.EDD.utils import run_from_cli, uChEConversion
 
@@ -41,68 +43,77 @@ def ustrain(energy0, energystrained, uenergy0, uenergystrained):
     )
 
 
+def measurementKey(
+    measurementTime: Optional[Union[str, float]],
+    measurementScan: Optional[int],
+    sourceScan: Sequence[float],
+) -> Tuple[Optional[Union[str, float]], Optional[float]]:
+    """Time and scan number used to pick the calibrations of a measurement (see calibrationLookup).
+
+    They are measurementTime or measurementScan when given, else the start time and the number
+    of the scan of the measurement (sourceScan: scan number and timestamp, NaN if unknown).
+    """
+    if measurementTime is not None or measurementScan is not None:
+        return measurementTime, measurementScan
+    scanNumber, startTime = sourceScan
+    return (
+        float(startTime) if np.isfinite(startTime) else None,
+        float(scanNumber) if np.isfinite(scanNumber) else None,
+    )
+
+
 def preStraind0cstEDD(
-    fileRead: str,
-    fileSave: str,
-    pathFileDetectorCalibration: str,
-    scanDetectorCalibration: str,
-    pathFileAngleCalibration: str,
-    scanAngleCalibration: str,
+    fileRead: H5File,
+    fileSave: H5File,
+    pathFileDetectorCalibration: H5File,
+    scanDetectorCalibration: Optional[str],
+    pathFileAngleCalibration: H5File,
+    scanAngleCalibration: Optional[str],
     numberOfPeaks: int,
     d0: Sequence[float],
+    writePolicy: Optional[dict] = None,
+    measurementTime: Optional[Union[str, float]] = None,
+    measurementScan: Optional[int] = None,
+    interpolateCalibration: bool = False,
 ):
+    """Main function.
+
+    scanDetectorCalibration and scanAngleCalibration are the names of the calibration groups.
+    When they are None, the calibrations of each measurement are the nearest to its time or scan
+    number, or are interpolated between the calibrations before and after with interpolateCalibration
+    (see calibrationLookup): the start time (or the number) of the scan of the measurement saved by
+    fitEDD, coordTransformation and regroupPoints, unless measurementTime (ISO 8601 date or timestamp)
+    or measurementScan is given for all the measurements.
+    The names of the calibrations used are saved in the infos group (per measurement in pointCalibrations).
+    """
+    policy = WritePolicy.from_config(writePolicy)
 
-    h5Save = h5py.File(fileSave, "a")  ## create/append h5 file to save in
+    h5Save = openFile(fileSave, "a")  ## create/append h5 file to save in
     strainGroupWithd0 = h5Save.create_group(
         "STRAIN_with_d0"
     )  ## creation of the strain group for results with d0
     # strainGroupWithoutd0 = h5Save.create_group('STRAIN_without_d0') ## creation of the strain group for results without d0
 
-    with h5py.File(
-        pathFileDetectorCalibration, "r"
-    ) as h5CalibRead:  ## Read the h5 file of the energy calibration of the detectors
-        calibCoeffsHD = h5CalibRead[
-            f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs/calibCoeffsHD"
-        ][
-            ()
-        ]  ## import the energy calibration coefficients of the horizontal detector
-        calibCoeffsVD = h5CalibRead[
-            f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs/calibCoeffsVD"
-        ][
-            ()
-        ]  ## import the energy calibration coefficients of the vertical detector
-        uncertaintyCalibCoeffsHD = h5CalibRead[
-            f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs/uncertaintyCalibCoeffsHD"
-        ][
-            ()
-        ]  ## import the uncertainty of the energy calibration coefficients of the horizontal detector
-        uncertaintyCalibCoeffsVD = h5CalibRead[
-            f"detectorCalibration/{scanDetectorCalibration}/calibCoeffs/uncertaintyCalibCoeffsVD"
-        ][
-            ()
-        ]  ## import the uncertainty of the energy calibration coefficients of the vertical detector
+    calibrations = (
+        {}
+    )  ## detector and angle calibrations per time/scan of the measurements
+    pointCalibrationsGroup = h5Save.create_group(
+        "infos/pointCalibrations"
+    )  ## names of the detector and angle calibrations used for each measurement of each point
 
-    with h5py.File(
-        pathFileAngleCalibration, "r"
-    ) as h5AngleRead:  ## Read the h5 file of the angle calibration of the detectors
-        AngleHD = h5AngleRead[
-            f"angleCalibration/{scanAngleCalibration}/calibratedAngle/calibratedAngleHD"
-        ][
-            ()
-        ]  ## import the calibrated angle of the horizontal detector
-        AngleVD = h5AngleRead[
-            f"angleCalibration/{scanAngleCalibration}/calibratedAngle/calibratedAngleVD"
-        ][
-            ()
-        ]  ## import the calibrated angle of the vertical detector
-
-    with h5py.File(fileRead, "r") as h5Read:  ## Read the h5 file of raw data
+    with openedFile(fileRead) as h5Read:  ## Read the h5 file of raw data
         for peakNumber in range(numberOfPeaks):
             strainPerPeakWithd0 = strainGroupWithd0.create_group(
                 f"peak_{str(peakNumber).zfill(4)}"
             )  ## create group for each peak in the strain group
+            pointCalibrationsPerPeak = pointCalibrationsGroup.create_group(
+                f"peak_{str(peakNumber).zfill(4)}"
+            )  ## create group for each peak in the calibrations infos group
             for i in range(
-                int(len(list(h5Read[f"pointsPerPeak_{str(peakNumber).zfill(4)}"])) / 2)
+                sum(
+                    name.startswith("point_")
+                    for name in h5Read[f"pointsPerPeak_{str(peakNumber).zfill(4)}"]
+                )
             ):
                 allPtsInPeak = h5Read[
                     f"pointsPerPeak_{str(peakNumber).zfill(4)}/point_{str(i).zfill(5)}"
@@ -119,12 +130,21 @@ def preStraind0cstEDD(
                 ][
                     ()
                 ]  ##
-                pts = strainPerPeakWithd0.create_dataset(
+                sourceScanPts = h5Read[f"pointsPerPeak_{str(peakNumber).zfill(4)}"].get(
+                    f"sourceScanPoint_{str(i).zfill(5)}",
+                    np.full((shapeallPtsInPeak, 2), np.nan),
+                )[
+                    ()
+                ]  ## scan number and start time of the scan of each measurement of the point (see regroupPoints)
+                calibrationNames = []
+                pts = policy.create_dataset(
+                    strainPerPeakWithd0,
                     f"point_{str(i).zfill(5)}",
                     dtype="float64",
                     data=np.zeros((shapeallPtsInPeak, 12), "float64"),
                 )  ## dataset for each point
-                uncertaintyPts = strainPerPeakWithd0.create_dataset(
+                uncertaintyPts = policy.create_dataset(
+                    strainPerPeakWithd0,
                     f"uncertainty_point_{str(i).zfill(5)}",
                     dtype="float64",
                     data=np.zeros((shapeallPtsInPeak, 12), "float64"),
@@ -136,6 +156,53 @@ def preStraind0cstEDD(
                     :, 0:8
                 ]  ## Coordinates of the point, goniometrtic angles and beam direction
                 for j in range(shapeallPtsInPeak):
+                    measurement = measurementKey(
+                        measurementTime, measurementScan, sourceScanPts[j]
+                    )  ## time and scan used to pick the calibrations of the measurement
+                    if measurement not in calibrations:
+                        calibrations[measurement] = (
+                            calibrationLookup(
+                                pathFileDetectorCalibration,
+                                "detectorCalibration",
+                                name=scanDetectorCalibration,
+                                time=measurement[0],
+                                scan=measurement[1],
+                                interpolate=interpolateCalibration,
+                            ),
+                            calibrationLookup(
+                                pathFileAngleCalibration,
+                                "angleCalibration",
+                                name=scanAngleCalibration,
+                                time=measurement[0],
+                                scan=measurement[1],
+                                interpolate=interpolateCalibration,
+                            ),
+                        )  ## energy and angle calibrations of the detectors (cached)
+                    (
+                        (detectorCalibrationName, detectorCalibration),
+                        (angleCalibrationName, angleCalibration),
+                    ) = calibrations[measurement]
+                    calibrationNames.append(
+                        [detectorCalibrationName, angleCalibrationName]
+                    )
+                    calibCoeffsHD = detectorCalibration[
+                        "calibCoeffsHD"
+                    ]  ## the energy calibration coefficients of the horizontal detector
+                    calibCoeffsVD = detectorCalibration[
+                        "calibCoeffsVD"
+                    ]  ## the energy calibration coefficients of the vertical detector
+                    uncertaintyCalibCoeffsHD = detectorCalibration[
+                        "uncertaintyCalibCoeffsHD"
+                    ]  ## the uncertainty of the energy calibration coefficients of the horizontal detector
+                    uncertaintyCalibCoeffsVD = detectorCalibration[
+                        "uncertaintyCalibCoeffsVD"
+                    ]  ## the uncertainty of the energy calibration coefficients of the vertical detector
+                    AngleHD = angleCalibration[
+                        "calibratedAngleHD"
+                    ]  ## the calibrated angle of the horizontal detector
+                    AngleVD = angleCalibration[
+                        "calibratedAngleVD"
+                    ]  ## the calibrated angle of the vertical detector
                     if (
                         allPtsInPeak[j, 6] == -90
                         and np.polyval(calibCoeffsHD, allPtsInPeak[j, 8]) > 0
@@ -248,8 +315,23 @@ def preStraind0cstEDD(
                     uncertaintyPts[
                         j, 11
                     ] = qq3  ## component of the scattering vector in the z direction
+                pointCalibrationsPerPeak.create_dataset(
+                    f"point_{str(i).zfill(5)}",
+                    dtype=h5py.string_dtype(encoding="utf-8"),
+                    data=np.reshape(calibrationNames, (-1, 2)).astype(object),
+                )  ## names of the detector and angle calibrations of each measurement of the point
 
-    h5Save.close()
+    infoGroup = h5Save["infos"]
+    for kind, column in (("detectorCalibration", 0), ("angleCalibration", 1)):
+        infoGroup.create_dataset(
+            kind,
+            dtype=h5py.string_dtype(encoding="utf-8"),
+            data=np.array(
+                sorted({pair[column][0] for pair in calibrations.values()}),
+                dtype=object,
+            ),
+        )  ## names of all the calibrations used (see pointCalibrations for each measurement)
+    closeFile(h5Save, fileSave)
 
 
 if __name__ == "__main__":
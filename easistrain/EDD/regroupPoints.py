@@ -1,22 +1,38 @@
-from typing import Sequence
+from typing import Optional, Sequence
 import numpy as np
-import h5py
+from easistrain.EDD.io import H5File, WritePolicy, closeFile, openFile, openedFile
 from easistrain.EDD.utils import run_from_cli
 
 
-def regroupPoints(fileRead: Sequence[str], fileSave: str, numberOfPeaks: int):
-    h5Save = h5py.File(fileSave, "a")  ## create/append h5 file to save in
+def regroupPoints(
+    fileRead: Sequence[H5File],
+    fileSave: H5File,
+    numberOfPeaks: int,
+    writePolicy: Optional[dict] = None,
+):
+    policy = WritePolicy.from_config(writePolicy)
+    h5Save = openFile(fileSave, "a")  ## create/append h5 file to save in
     rowsInAll = 0
+    sourceScan = np.zeros((0, 2), "float64")
     for fileR in fileRead:
-        with h5py.File(fileR, "r") as h5Read:  ## Read the h5 file of raw data
+        with openedFile(fileR) as h5Read:  ## Read the h5 file of raw data
             countRows = h5Read["global/inSample_peak_0000"].shape[0]  ## shape of
             # prvrowsInAll = rowsInAll
             rowsInAll = rowsInAll + countRows
+            sourceScan = np.vstack(
+                (
+                    sourceScan,
+                    h5Read["global/sourceScan"][()]
+                    if "global/sourceScan" in h5Read
+                    else np.full((countRows, 2), np.nan),
+                )
+            )  ## scan number and start time of the scan of each point (see coordTransformation)
     countFiller = 0
     for fileR in fileRead:
         for peakNumber in range(numberOfPeaks):
             if f"coordInSample_Peak_{str(peakNumber).zfill(4)}" not in h5Save.keys():
-                pointsInPeakGlobal = h5Save.create_dataset(
+                pointsInPeakGlobal = policy.create_dataset(
+                    h5Save,
                     f"coordInSample_Peak_{str(peakNumber).zfill(4)}",
                     dtype="float64",
                     data=np.zeros((rowsInAll, 13), "float64"),
@@ -29,7 +45,8 @@ def regroupPoints(fileRead: Sequence[str], fileSave: str, numberOfPeaks: int):
                 f"coordInSample_uncertainty_Peak_{str(peakNumber).zfill(4)}"
                 not in h5Save.keys()
             ):
-                upointsInPeakGlobal = h5Save.create_dataset(
+                upointsInPeakGlobal = policy.create_dataset(
+                    h5Save,
                     f"coordInSample_uncertainty_Peak_{str(peakNumber).zfill(4)}",
                     dtype="float64",
                     data=np.zeros((rowsInAll, 13), "float64"),
@@ -38,7 +55,7 @@ def regroupPoints(fileRead: Sequence[str], fileSave: str, numberOfPeaks: int):
                 upointsInPeakGlobal = h5Save[
                     f"coordInSample_uncertainty_Peak_{str(peakNumber).zfill(4)}"
                 ]
-            with h5py.File(fileR, "r") as h5Read:  ## Read the h5 file of raw data
+            with openedFile(fileR) as h5Read:  ## Read the h5 file of raw data
                 shapeScanPoints = h5Read[
                     f"global/inSample_peak_{str(peakNumber).zfill(4)}"
                 ].shape[
@@ -91,18 +108,31 @@ def regroupPoints(fileRead: Sequence[str], fileSave: str, numberOfPeaks: int):
             umatThirdFilter = umatSecFilter[
                 np.round(umatSecFilter[:, 2], 4) == np.round(umatToFilter[i, 2], 4), :
             ]  ## filtering of uncertainty based on z coordinate of the measurement point
+            sourceThirdFilter = sourceScan[
+                (np.round(matToFilter[:, 0], 4) == np.round(matToFilter[i, 0], 4))
+                & (np.round(matToFilter[:, 1], 4) == np.round(matToFilter[i, 1], 4))
+                & (np.round(matToFilter[:, 2], 4) == np.round(matToFilter[i, 2], 4))
+            ]  ## scan number and start time of the scans of the measurement point
             # print(matThirdFilter)
             if pointsCounter == 0:
-                peakGroup.create_dataset(
+                policy.create_dataset(
+                    peakGroup,
                     f"point_{str(pointsCounter).zfill(5)}",
                     dtype="float64",
                     data=matThirdFilter,
                 )  ## save of peak info after separation based on point coordinates (! just for the first scan)
-                peakGroup.create_dataset(
+                policy.create_dataset(
+                    peakGroup,
                     f"uncertaintyPoint_{str(pointsCounter).zfill(5)}",
                     dtype="float64",
                     data=umatThirdFilter,
                 )  ## save of uncertainty after separation based on point coordinates (! just for the first scan)
+                policy.create_dataset(
+                    peakGroup,
+                    f"sourceScanPoint_{str(pointsCounter).zfill(5)}",
+                    dtype="float64",
+                    data=sourceThirdFilter,
+                )  ## save of the scan number and start time of the scans of the point (see preStraind0cstEDD)
                 matCheck = np.append(matCheck, matThirdFilter[0, :3])
                 matCheck = np.reshape(matCheck, (int(len(matCheck) / 3), 3))
                 umatCheck = np.append(umatCheck, umatThirdFilter[0, :3])
@@ -115,16 +145,24 @@ def regroupPoints(fileRead: Sequence[str], fileSave: str, numberOfPeaks: int):
                         check, np.sum(matThirdFilter[0, :3] == matCheck[kk, :3])
                     )
                 if np.sum(check[:] == 3) == 0:
-                    peakGroup.create_dataset(
+                    policy.create_dataset(
+                        peakGroup,
                         f"point_{str(pointsCounter).zfill(5)}",
                         dtype="float64",
                         data=matThirdFilter,
                     )  ## save of peak info after separation based on point coordinates (! for the rest of the scans)
-                    peakGroup.create_dataset(
+                    policy.create_dataset(
+                        peakGroup,
                         f"uncertaintyPoint_{str(pointsCounter).zfill(5)}",
                         dtype="float64",
                         data=umatThirdFilter,
                     )  ## save of uncertainty after separation based on point coordinates (! for the rest of the scans)
+                    policy.create_dataset(
+                        peakGroup,
+                        f"sourceScanPoint_{str(pointsCounter).zfill(5)}",
+                        dtype="float64",
+                        data=sourceThirdFilter,
+                    )  ## save of the scan number and start time of the scans of the point (see preStraind0cstEDD)
                     pointsCounter = pointsCounter + 1
                     matCheck = np.append(matCheck, matThirdFilter[0, :3])
                     matCheck = np.reshape(matCheck, (int(len(matCheck) / 3), 3))
@@ -132,7 +170,7 @@ def regroupPoints(fileRead: Sequence[str], fileSave: str, numberOfPeaks: int):
                     umatCheck = np.reshape(umatCheck, (int(len(umatCheck) / 3), 3))
                 else:
                     pointsCounter = pointsCounter
-    h5Save.close()
+    closeFile(h5Save, fileSave)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
-from typing import Sequence, Tuple
+from typing import Optional, Sequence, Tuple
 import numpy as np
 import h5py
 import scipy.optimize
-from easistrain.EDD.math import compute_qs
+from easistrain.EDD.io import H5File, WritePolicy, closeFile, openFile, openedFile
+from easistrain.EDD.math import compute_qs, strains_in_meas_direction
 from easistrain.EDD.utils import run_from_cli
 
 
@@ -95,15 +96,7 @@ def guess_stress(
 
 
 def strain_in_meas_direction(angles, e11, e22, e33, e23, e13, e12):
-    q1, q2, q3 = compute_qs(angles)
-    return (
-        (e11 * q1**2)
-        + (e22 * q2**2)
-        + (e33 * q3**2)
-        + (2 * e12 * q1 * q2)
-        + (2 * e13 * q1 * q3)
-        + (2 * e23 * q2 * q3)
-    )
+    return strains_in_meas_direction(angles, [e11, e22, e33, e23, e13, e12])
 
 
 def stress_in_meas_direction(anglesAndXEC, s11, s22, s33, s23, s13, s12):
@@ -125,17 +118,22 @@ def stress_in_meas_direction(anglesAndXEC, s11, s22, s33, s23, s13, s12):
 
 
 def strainStressTensor(
-    fileRead: str, fileSave: str, numberOfPeaks: int, XEC: Sequence[float]
+    fileRead: H5File,
+    fileSave: H5File,
+    numberOfPeaks: int,
+    XEC: Sequence[float],
+    writePolicy: Optional[dict] = None,
 ):
+    policy = WritePolicy.from_config(writePolicy)
 
     if len(XEC) < numberOfPeaks * 2:
         raise ValueError(
             f"XEC must have a length of numberOfPeaks*2 ({numberOfPeaks*2})"
         )
 
-    h5Save = h5py.File(fileSave, "a")  ## create/append h5 file to save in
+    h5Save = openFile(fileSave, "a")  ## create/append h5 file to save in
 
-    with h5py.File(fileRead, "r") as h5Read:
+    with openedFile(fileRead) as h5Read:
         for peakNumber in range(numberOfPeaks):
             peak_group = h5Save.create_group(
                 f"peak_{str(peakNumber).zfill(4)}"
@@ -190,16 +188,19 @@ def strainStressTensor(
 
                 point_name = f"point_{str(i).zfill(5)}"
                 point_in_peak_group = peak_group.create_group(point_name)
-                point_in_peak_group.create_dataset(
-                    "position", data=input_point_data[0, 0:3]
+                policy.create_dataset(
+                    point_in_peak_group, "position", data=input_point_data[0, 0:3]
                 )
-                point_in_peak_group.create_dataset(
-                    "position_errors", data=input_point_errors[0, 0:3]
+                policy.create_dataset(
+                    point_in_peak_group,
+                    "position_errors",
+                    data=input_point_errors[0, 0:3],
                 )
-                point_in_peak_group.create_dataset(
-                    "strain_tensor_fit", data=strain_tensor_fit
+                policy.create_dataset(
+                    point_in_peak_group, "strain_tensor_fit", data=strain_tensor_fit
                 )
-                strain_errors = point_in_peak_group.create_dataset(
+                strain_errors = policy.create_dataset(
+                    point_in_peak_group,
                     "strain_tensor_errors",
                     (6,),
                 )
@@ -209,11 +210,11 @@ def strainStressTensor(
                     else np.mean(input_point_errors[:, 8])
                 )
 
-                point_in_peak_group.create_dataset(
-                    "stress_tensor_fit", data=stress_tensor_fit
+                policy.create_dataset(
+                    point_in_peak_group, "stress_tensor_fit", data=stress_tensor_fit
                 )
-                stress_errors = point_in_peak_group.create_dataset(
-                    "stress_tensor_errors", (6,)
+                stress_errors = policy.create_dataset(
+                    point_in_peak_group, "stress_tensor_errors", (6,)
                 )
                 stress_errors[:] = (
                     np.sqrt(np.diag(covarStress))
@@ -222,7 +223,7 @@ def strainStressTensor(
                     * np.mean(input_point_errors[:, 8])
                 )
 
-    h5Save.close()
+    closeFile(h5Save, fileSave)
     return
 
 
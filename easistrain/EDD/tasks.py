@@ -0,0 +1,133 @@
+"""Ewoks tasks of the EDD stages.
+
+The inputs of a task are the arguments of its stage. Its output results is passed to the next tasks
+(e.g. linked to their fileRead or pathFileDetectorCalibration input). Without a fileSave input, the
+stage saves its results in an HDF5 file kept in memory and results is its content, a nested dict of
+NumPy arrays (see resultsToDict): nothing is written on disk and the arrays can be pickled to other
+processes or persisted by ewoks with the nexus scheme (varinfo {"root_uri": ..., "scheme": "nexus"}).
+With fileSave, the results are saved in this file and results is its path.
+"""
+import inspect
+from typing import Callable, List, Optional, Sequence
+import h5py
+from ewokscore import Task
+
+from easistrain.EDD.angleCalibEDD import angleCalibrationEDD
+from easistrain.EDD.calibrationEDD import calibEdd
+from easistrain.EDD.coordTransformation import coordTransformation
+from easistrain.EDD.fitEDD import fitEDD, fitEDD_with_scan_number_parse
+from easistrain.EDD.io import (
+    H5File,
+    fileName,
+    inMemoryFile,
+    resultsFile,
+    resultsToDict,
+)
+from easistrain.EDD.jointCalibEDD import jointCalibrationEDD
+from easistrain.EDD.preStraind0cstEDD import preStraind0cstEDD
+from easistrain.EDD.regroupPoints import regroupPoints
+from easistrain.EDD.strainStressd0cstEDD import strainStressTensor
+
+
+def stageInputNames(stage: Callable) -> dict:
+    """Required (no default value) and optional input names of the task of a stage, fileSave is optional"""
+    parameters = inspect.signature(stage).parameters.values()
+    required = [
+        parameter.name
+        for parameter in parameters
+        if parameter.default is parameter.empty and parameter.name != "fileSave"
+    ]
+    return {
+        "input_names": required,
+        "optional_input_names": [
+            parameter.name for parameter in parameters if parameter.name not in required
+        ],
+        "output_names": ["results"],
+    }
+
+
+def fileInputNames(stage: Callable) -> List[str]:
+    """Inputs of a stage which are HDF5 files (or sequences of files), given as results of other tasks"""
+    return [
+        parameter.name
+        for parameter in inspect.signature(stage).parameters.values()
+        if parameter.annotation in (H5File, Sequence[H5File])
+        and parameter.name != "fileSave"
+    ]
+
+
+class _StageTask(Task, register=False):
+    """Task running the function STAGE with the inputs given to the task (arguments of SIGNATURE, default STAGE)"""
+
+    STAGE: Callable
+    SIGNATURE: Optional[Callable] = None
+
+    def run(self):
+        stage = type(self).STAGE
+        inputs = {
+            name: value
+            for name, value in self.input_values.items()
+            if value is not self.MISSING_DATA
+        }
+        openedFiles = []
+        for name in fileInputNames(type(self).SIGNATURE or stage):
+            if isinstance(inputs.get(name), dict):
+                inputs[name] = resultsFile(inputs[name], name)
+                openedFiles.append(inputs[name])
+            elif isinstance(inputs.get(name), (list, tuple)):
+                inputs[name] = [
+                    resultsFile(file, name) if isinstance(file, dict) else file
+                    for file in inputs[name]
+                ]
+                openedFiles.extend(
+                    file for file in inputs[name] if isinstance(file, h5py.File)
+                )
+        inMemory = inputs.get("fileSave") is None
+        if inMemory:
+            inputs["fileSave"] = inMemoryFile(stage.__name__)
+            openedFiles.append(inputs["fileSave"])
+        try:
+            stage(**inputs)
+            self.outputs.results = (
+                resultsToDict(inputs["fileSave"])
+                if inMemory
+                else fileName(inputs["fileSave"])
+            )
+        finally:
+            for h5File in openedFiles:
+                h5File.close()
+
+
+class CalibEdd(_StageTask, **stageInputNames(calibEdd)):
+    STAGE = calibEdd
+
+
+class AngleCalibrationEDD(_StageTask, **stageInputNames(angleCalibrationEDD)):
+    STAGE = angleCalibrationEDD
+
+
+class JointCalibrationEDD(_StageTask, **stageInputNames(jointCalibrationEDD)):
+    STAGE = jointCalibrationEDD
+
+
+class FitEDD(_StageTask, **stageInputNames(fitEDD)):
+    """scanNumber can be a list of scans or a range "first:last" (see fitEDD_with_scan_number_parse)"""
+
+    STAGE = fitEDD_with_scan_number_parse
+    SIGNATURE = fitEDD
+
+
+class CoordTransformation(_StageTask, **stageInputNames(coordTransformation)):
+    STAGE = coordTransformation
+
+
+class RegroupPoints(_StageTask, **stageInputNames(regroupPoints)):
+    STAGE = regroupPoints
+
+
+class PreStraind0cstEDD(_StageTask, **stageInputNames(preStraind0cstEDD)):
+    STAGE = preStraind0cstEDD
+
+
+class StrainStressTensor(_StageTask, **stageInputNames(strainStressTensor)):
+    STAGE = strainStressTensor
@@ -1,10 +1,14 @@
 import argparse
-from typing import Callable, List, Sequence, Tuple, Union
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
 import yaml
 import numpy as np
 import scipy.optimize
 import silx.math.fit
+from easistrain.func_fitting_functions import (
+    func_split_pseudo_voigt,
+    jac_split_pseudo_voigt,
+)
 
 
 def read_config_file(path: Union[str, Path]) -> dict:
@@ -26,8 +30,22 @@ def linefunc(a, xData):
     return a * xData
 
 
+def _splitPseudoVoigtParams(params) -> np.ndarray:
+    """Parameters of each peak as a (5, nb_peaks, 1) array: height, position, fwhm1, fwhm2, eta"""
+    return np.asarray(params, dtype=float).reshape(-1, 5).T[:, :, np.newaxis]
+
+
 def splitPseudoVoigt(xData, *params):
-    return silx.math.fit.sum_splitpvoigt(xData, *params)  # type: ignore
+    """Sum of split pseudo-Voigt peaks (same parameters as silx.math.fit.sum_splitpvoigt)"""
+    return np.sum(
+        func_split_pseudo_voigt(_splitPseudoVoigtParams(params), xData), axis=0
+    )
+
+
+def splitPseudoVoigtJacobian(xData, *params):
+    """Derivatives of splitPseudoVoigt with respect to params, shape (len(xData), len(params))"""
+    jac = jac_split_pseudo_voigt(_splitPseudoVoigtParams(params), xData)
+    return np.transpose(jac, (2, 1, 0)).reshape(len(xData), -1)
 
 
 def gaussEstimation(xData, *params):
@@ -159,6 +177,164 @@ def uChEConversion(a, b, c, ch, ua, ub, uc, uch):
     )
 
 
+def jointCalibrationFit(
+    sourceChannels: np.ndarray,
+    sourceEnergies: np.ndarray,
+    sampleChannels: np.ndarray,
+    sampleDSpacings: np.ndarray,
+    uSourceChannels: Optional[np.ndarray] = None,
+    uSampleChannels: Optional[np.ndarray] = None,
+    iterations: int = 3,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fits the energy calibration and the diffraction angle of a detector at once.
+
+    The parameters are the coefficients a, b, c of the channel to energy conversion a*ch**2 + b*ch + c
+    (calibEdd) and k = h*c/(2*sin(theta)) of the energy of the calibrant sample lines k/d (angleCalibrationEDD).
+    The peaks of the source lines (known energies) and of the sample lines (known d-spacings) give one
+    linear weighted least squares problem, the uncertainty of each peak position being converted
+    to energy with the slope of the calibration (the weights are refined iterations times).
+    Returns the parameters (a, b, c, k) and their covariance matrix (4, 4), scaled by the reduced chi-square
+    as np.polyfit(cov=True) and scipy.optimize.curve_fit.
+    """
+    channels = np.concatenate((sourceChannels, sampleChannels)).astype(float)
+    design = np.zeros((len(channels), 4))
+    design[:, 0] = channels**2
+    design[:, 1] = channels
+    design[:, 2] = 1
+    design[len(sourceChannels) :, 3] = -1 / np.asarray(sampleDSpacings, dtype=float)
+    observations = np.concatenate(
+        (np.asarray(sourceEnergies, dtype=float), np.zeros(len(sampleChannels)))
+    )
+    if len(channels) < 4:
+        raise ValueError("At least 4 peaks are needed for the joint calibration")
+    uChannels = np.ones_like(channels)
+    if uSourceChannels is not None and uSampleChannels is not None:
+        uChannels = np.concatenate((uSourceChannels, uSampleChannels))
+        uChannels = np.where(
+            np.isfinite(uChannels) & (uChannels > 0), uChannels, np.nanmax(uChannels)
+        )  ## peaks without uncertainty are given the largest one
+    slope = 1
+    for _ in range(max(1, iterations)):
+        weights = 1 / (uChannels * np.abs(slope))
+        params = np.linalg.lstsq(
+            design * weights[:, np.newaxis], observations * weights, rcond=None
+        )[0]
+        slope = 2 * params[0] * channels + params[1]
+    weightedDesign = design * weights[:, np.newaxis]
+    covariance = np.linalg.inv(weightedDesign.T @ weightedDesign)
+    dof = len(channels) - 4
+    if dof > 0:
+        chi2 = np.sum(((design @ params - observations) * weights) ** 2)
+        covariance *= chi2 / dof
+    return params, covariance
+
+
+def calibrationBoxFit(
+    pattern: np.ndarray, fitRange: Sequence[int], nbPeaks: int, stripIterations: int
+) -> Dict[str, np.ndarray]:
+    """
+    Fit of the peaks of one box/window of a calibration pattern (calibEdd and angleCalibrationEDD):
+      - Strip the background to guess the peak parameters
+      - Calculate the background from the guessed peaks
+      - Fit the data without background with split pseudo-Voigt functions
+
+    Returns the curves (raw, background, bgdSubsData, fit, error) as (channel, value) columns,
+    the fit parameters of each peak (nbPeaks, 6) with the goodness factor as last column
+    and their uncertainties (nbPeaks, 5)
+    """
+    peak = np.transpose(
+        (
+            np.arange(fitRange[0], fitRange[1]),
+            pattern[fitRange[0] : fitRange[1]],
+        )
+    )  ## peak of the detector
+    strippedBackground = silx.math.fit.strip(
+        data=peak[:, 1],
+        w=5,
+        niterations=stripIterations,
+        factor=1,
+        anchors=None,
+    )  ## stripped background (obtained by stripping the yData)
+    peaksGuess, peaksIndex = guessParameters(
+        peak[:, 0],
+        peak[:, 1] - strippedBackground,
+        nbPeaks,
+        withBounds=False,
+    )  ## guess fit parameters
+    yCalculatedBackground = calcBackground(
+        peak[:, 0],
+        peak[:, 1],
+        peaksGuess[-1],
+        peaksGuess[2],
+        peaksIndex,
+    )  ## calculated ybackground
+    initialGuess = np.zeros(5 * nbPeaks)
+    for n in range(nbPeaks):
+        initialGuess[5 * n] = peaksGuess[3 * n]
+        initialGuess[5 * n + 1] = peaksGuess[3 * n + 1]
+        initialGuess[5 * n + 2] = peaksGuess[3 * n + 2]
+        initialGuess[5 * n + 3] = peaksGuess[3 * n + 2]
+        initialGuess[5 * n + 4] = 0.5
+    optimalParameters, covariance = scipy.optimize.curve_fit(
+        f=splitPseudoVoigt,
+        xdata=peak[:, 0],
+        ydata=peak[:, 1] - yCalculatedBackground,
+        p0=initialGuess,
+        sigma=None,
+        jac=splitPseudoVoigtJacobian,
+    )  ## fit of the peak
+    fittedPeaks = splitPseudoVoigt(peak[:, 0], optimalParameters)
+    goodnessFactor = (
+        100
+        * np.sum(np.absolute(fittedPeaks + strippedBackground - peak[:, 1]))
+        / np.sum(peak[:, 1])
+    )
+    fitParams = np.empty((nbPeaks, 6))
+    fitParams[:, :5] = np.reshape(optimalParameters, (nbPeaks, 5))
+    fitParams[:, 5] = goodnessFactor
+    return {
+        "raw": peak,
+        "background": np.transpose((peak[:, 0], yCalculatedBackground)),
+        "bgdSubsData": np.transpose((peak[:, 0], peak[:, 1] - yCalculatedBackground)),
+        "fit": np.transpose((peak[:, 0], fittedPeaks + yCalculatedBackground)),
+        "error": np.transpose(
+            (
+                peak[:, 0],
+                np.absolute(fittedPeaks + yCalculatedBackground - peak[:, 1]),
+            )
+        ),
+        "fitParams": fitParams,
+        "uncertaintyFitParams": np.reshape(np.sqrt(np.diag(covariance)), (nbPeaks, 5)),
+    }
+
+
+def calibrationFits(
+    patterns: Dict[str, np.ndarray],
+    rangeFit: Dict[str, Sequence[int]],
+    nbPeaksInBoxes: Sequence[int],
+    stripIterations: int,
+) -> Dict[str, List[Dict[str, np.ndarray]]]:
+    """
+    Fits all the boxes of the calibration patterns of several detectors (see calibrationBoxFit).
+
+    patterns and rangeFit (2 limits per box) are given by detector name.
+    Returns the list of the box fits of each detector
+    """
+    return {
+        detector: [
+            calibrationBoxFit(
+                pattern,
+                rangeFit[detector][2 * i : 2 * i + 2],
+                nbPeaks,
+                stripIterations,
+            )
+            for i, nbPeaks in enumerate(nbPeaksInBoxes)
+        ]
+        for detector, pattern in patterns.items()
+    }
+
+
 def fit_detector_data(
     channels: np.ndarray,
     raw_data: np.ndarray,
@@ -227,6 +403,7 @@ def fit_detector_data(
             xdata=channels,
             ydata=raw_data - calculated_background,
             p0=initial_fit_guess,
+            jac=splitPseudoVoigtJacobian,
             bounds=(fit_min_bounds, fit_max_bounds),
             maxfev=10000,
         )
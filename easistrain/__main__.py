@@ -22,9 +22,16 @@ def main():
         help="Parameters for the workflow",
     )
 
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help="Directory where the results of the tasks are cached (not executed again with the same inputs)",
+    )
+
     args, unknown = parser.parse_known_args()
     if not os.path.isfile(args.workflow):
         create_workflow(args.workflow)
     if not os.path.isfile(args.parameters):
         raise RuntimeError(f"Parameters file '{args.parameters}' does not exist")
-    execute_graph1(args.workflow, args.parameters)
+    execute_graph1(args.workflow, args.parameters, cache_dir=args.cache)
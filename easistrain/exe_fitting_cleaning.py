@@ -10,26 +10,10 @@ if len(sys.argv) != 11 or sys.argv[1] == "help":
         "#### Arguments to be given: 1)root // 2)h5file // 3) scan // 4)tth_min // 5)tth_max // 6)bgd_left // 7)bgd_right // 8)fitting function:PVII, gauss, Lorentz or Ps // 9)hkl // 10)Rp:godness of fit"
     )
 else:
-    print("\n\n#*#*#*#*#*#*#*#*#* Fitting procedure started #*#*#*#*#*#*#*#*#*#*#*\n\n")
-    fit(
-        sys.argv[1],
-        sys.argv[2],
-        sys.argv[3],
-        sys.argv[4],
-        sys.argv[5],
-        sys.argv[6],
-        sys.argv[7],
-        sys.argv[8],
-        sys.argv[9],
-        sys.argv[10],
-    )
-    print(
-        "\n\n#*#*#*#*#*#*#*#*#* Fitting procedure completed #*#*#*#*#*#*#*#*#*#*#*\n\n"
-    )
     print(
-        "\n\n#*#*#*#*#*#*#*#*#* Cleaning procedure started #*#*#*#*#*#*#*#*#*#*#*\n\n"
+        "\n\n#*#*#*#*#*#*#*#*#* Fitting and cleaning procedure started #*#*#*#*#*#*#*#*#*#*#*\n\n"
     )
-    clean_fit(
+    fit_and_clean(
         sys.argv[1],
         sys.argv[2],
         sys.argv[3],
@@ -42,7 +26,7 @@ else:
         sys.argv[10],
     )
     print(
-        "\n\n#*#*#*#*#*#*#*#*#* Cleaning procedure completed #*#*#*#*#*#*#*#*#*#*#*\n\n"
+        "\n\n#*#*#*#*#*#*#*#*#* Fitting and cleaning procedure completed #*#*#*#*#*#*#*#*#*#*#*\n\n"
     )
 
 
@@ -122,6 +122,13 @@ if config.get("arguments", "phiGon3") == "None":
 else:
     phiGon3 = config.get("arguments", "phiGon3")
 
+# Follow mode (optional): integrate the frames of the scan (full name, e.g. CeO2_0001_1.1) while it is acquired
+follow = config.get("arguments", "follow", fallback="False") == "True"
+poll_interval = float(config.get("arguments", "pollInterval", fallback="1"))
+timeout = float(config.get("arguments", "timeout", fallback="60"))
+npoints = config.get("arguments", "npoints", fallback="None")
+npoints = None if npoints == "None" else int(npoints)
+
 print(azim_range, rad_range)
 print(type(azim_range), type(rad_range))
 
@@ -152,31 +159,63 @@ falog.write("gon3 = " + str(gon3) + "\n")
 falog.write("chiGon1 = " + str(chiGon1) + "\n")
 falog.write("omegaGon2 = " + str(omegaGon2) + "\n")
 falog.write("phiGon3 = " + str(phiGon3) + "\n")
+falog.write("follow = " + str(follow) + "\n")
+if follow:
+    falog.write("pollInterval = " + str(poll_interval) + "\n")
+    falog.write("timeout = " + str(timeout) + "\n")
+    falog.write("npoints = " + str(npoints) + "\n")
 falog.write("************____________________________________**************\n")
 
-integration_2D(
-    root_data,
-    h5file,
-    scan,
-    numScan,
-    detector_name,
-    poni_file,
-    npt_rad,
-    npt_azim,
-    x_unit,
-    im_dark,
-    im_mask,
-    rad_range,
-    azim_range,
-    errorModel,
-    imFlat,
-    gon1,
-    gon2,
-    gon3,
-    chiGon1,
-    omegaGon2,
-    phiGon3,
-)
+if follow:
+    integration_2D_follow(
+        root_data,
+        h5file,
+        scan,
+        detector_name,
+        poni_file,
+        npt_rad,
+        npt_azim,
+        x_unit,
+        im_dark,
+        im_mask,
+        rad_range,
+        azim_range,
+        errorModel,
+        imFlat,
+        gon1,
+        gon2,
+        gon3,
+        chiGon1,
+        omegaGon2,
+        phiGon3,
+        poll_interval,
+        timeout,
+        npoints,
+    )
+else:
+    integration_2D(
+        root_data,
+        h5file,
+        scan,
+        numScan,
+        detector_name,
+        poni_file,
+        npt_rad,
+        npt_azim,
+        x_unit,
+        im_dark,
+        im_mask,
+        rad_range,
+        azim_range,
+        errorModel,
+        imFlat,
+        gon1,
+        gon2,
+        gon3,
+        chiGon1,
+        omegaGon2,
+        phiGon3,
+    )
 time1 = time.time()
 print("total time: " + str(time1 - time0) + " seconds")
 falog.write("total time: " + str(time1 - time0) + " seconds\n")
@@ -5,17 +5,22 @@ import time
 
 time0 = time.time()
 
-if len(sys.argv) != 7 or sys.argv[1] == "help":
+if len(sys.argv) not in (7, 8) or sys.argv[1] == "help":
     print(
-        "#### Arguments to be given: 1)root // 2)h5file // 3)path of poni file // 4)h // 5)k // 6)l"
+        "#### Arguments to be given: 1)root // 2)h5file // 3)path of poni file // 4)h // 5)k // 6)l // 7)optional: summary (one table per scan)"
     )
 else:
     print(
         "\n\n#*#*#*#*#*#*#*#*#* Calculation of lattice and d-spacing parameters procedure started #*#*#*#*#*#*#*#*#*#*#*\n\n"
     )
-    lattice_param(
-        sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5], sys.argv[6]
-    )
+    if len(sys.argv) == 8 and sys.argv[7] == "summary":
+        lattice_param_summary(
+            sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5], sys.argv[6]
+        )
+    else:
+        lattice_param(
+            sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5], sys.argv[6]
+        )
     print(
         "\n\n#*#*#*#*#*#*#*#*#* Calculation of lattice and d-spacing parameters procedure finished #*#*#*#*#*#*#*#*#*#*#*\n\n"
     )
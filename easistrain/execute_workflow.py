@@ -1,9 +1,83 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from ewokscore import load_graph
+import h5py
 import json
+import os
 from easistrain.log_parameters import log_parameters
 
 
-def execute_graph1(workflow_filename, param_filename):
+# Parameters of the integration which can be the path of a file read by the integration
+INPUT_FILE_PARAMETERS = ("poni_file", "im_mask", "im_dark", "imFlat")
+
+
+def _file_stat(filename):
+    stat = os.stat(filename)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def cache_parameters(parameters):
+    """Parameters with the modification time and size of the raw data file (root_data/h5file)
+    and of the other files read by the integration (INPUT_FILE_PARAMETERS given as paths).
+
+    With a cache directory (varinfo root_uri), ewoks stores the outputs of the tasks by hash of
+    their inputs and does not execute again a task with the same inputs: adding the state of the
+    files to the inputs makes the integration run again only when one of them changes.
+    """
+    return {
+        **parameters,
+        "raw_data_stat": _file_stat(
+            os.path.join(parameters["root_data"], parameters["h5file"])
+        ),
+        "input_files_stat": {
+            name: _file_stat(parameters[name])
+            for name in INPUT_FILE_PARAMETERS
+            if isinstance(parameters.get(name), str)
+            and os.path.isfile(parameters[name])
+        },
+    }
+
+
+def _results_file(parameters):
+    return os.path.join(parameters["root_data"], "Results" + "_" + parameters["h5file"])
+
+
+def results_exist(parameters, results_file):
+    """Whether results_file contains the groups the integration writes for the scans of the parameters.
+
+    The cached outputs of the integration only tell that it was done: when its results were
+    removed since, the integration has to run again instead of using the cache.
+    """
+    if not os.path.exists(results_file):
+        return False
+    scan, numScan = parameters["scan"], parameters.get("numScan")
+    with h5py.File(
+        os.path.join(parameters["root_data"], parameters["h5file"]), "r"
+    ) as r_h5file, h5py.File(results_file, "r") as results:
+        if numScan is None:
+            names = list(r_h5file)
+        else:
+            names = [scan + str(i) + ".1" for i in range(numScan[0], numScan[1] + 1)]
+        for name in names:
+            if (
+                name in r_h5file
+                and parameters["detector_name"] in r_h5file[name].get("measurement", {})
+                and name not in results
+            ):
+                return False
+    return True
+
+
+def execute_tasks(graph, varinfo=None, force_rerun=False):
+    """Same as graph.execute, with force_rerun: the tasks run again even if their outputs are
+    cached (varinfo root_uri), e.g. because their results were removed since (see results_exist)"""
+    tasks = dict()
+    for node in graph.topological_sort():
+        task = graph.instantiate_task_static(node, tasks=tasks, varinfo=varinfo)
+        task.execute(force_rerun=force_rerun)
+    return tasks
+
+
+def execute_graph1(workflow_filename, param_filename, cache_dir=None):
     # Load parameters
     with open(param_filename, "r") as f:
         parameters = json.load(f)
@@ -14,33 +88,155 @@ def execute_graph1(workflow_filename, param_filename):
     graph = load_graph(workflow_filename)
 
     # Loop inside Integrate2D
-    graph.graph.nodes["Integrate2D"]["inputs"] = parameters
+    if cache_dir:
+        parameters = cache_parameters(parameters)
+    graph.graph.nodes["Integrate2D"]["default_inputs"] = [
+        {"name": name, "value": value} for name, value in parameters.items()
+    ]
 
-    varinfo = {"root_uri": None}  # optional
-    tasks = graph.execute(varinfo=varinfo)
+    varinfo = {"root_uri": cache_dir}  # outputs of the tasks cached in cache_dir
+    tasks = execute_tasks(
+        graph,
+        varinfo,
+        force_rerun=bool(cache_dir)
+        and not results_exist(parameters, _results_file(parameters)),
+    )
     for name, task in tasks.items():
         print(name, task.output_values)
 
 
-def execute_graph2(workflow_filename, param_filename):
+def _scan_graph(graph, node, parameters):
+    """Instance of the graph with the parameters as inputs of the node"""
+    scan_graph = load_graph(graph.graph.copy())
+    scan_graph.graph.nodes[node]["default_inputs"] = [
+        {"name": name, "value": value} for name, value in parameters.items()
+    ]
+    return scan_graph
+
+
+def _scan_results_file(results_file, numscan):
+    """Results file of one scan, merged into results_file when the scan is done"""
+    root, ext = os.path.splitext(results_file)
+    return f"{root}_scan{numscan}{ext}"
+
+
+def merge_results(scan_results_file, results_file):
+    """Moves the groups of the results file of a scan into results_file (replacing the groups of the same name)"""
+    if not os.path.exists(scan_results_file):
+        return  # nothing written, e.g. outputs of the scan cached (varinfo root_uri)
+    with h5py.File(scan_results_file, "r") as source, h5py.File(
+        results_file, "a"
+    ) as destination:
+        for name in source:
+            if name in destination:
+                del destination[name]
+            source.copy(source[name], destination, name)
+    os.remove(scan_results_file)
+
+
+def _execute_scan(scan_graph, varinfo, force_rerun=False):
+    """Executes an instance of the graph (in a worker) and returns the outputs of its tasks"""
+    tasks = execute_tasks(scan_graph, varinfo, force_rerun)
+    return {name: task.output_values for name, task in tasks.items()}
+
+
+def execute_scans(
+    graph,
+    parameters,
+    node="Integrate2D",
+    max_workers=None,
+    executor=None,
+    varinfo=None,
+    results_file=None,
+    cached=None,
+):
+    """Executes the graph (anything load_graph accepts) for each scan of parameters["numScan"]
+    ([first, last]) in parallel.
+
+    The graph is built once and instantiated for each scan, with numScan = [scan, scan + 1]
+    in the parameters of the node. The instances are executed in a pool of max_workers processes,
+    or submitted to executor (a concurrent.futures executor). A failed scan does not stop the others.
+    With results_file (the HDF5 file written by the node, e.g. root_data/Results_<h5file>), each
+    instance writes its own file (results_file input of the node) and this process merges it into
+    results_file when the scan is done, so only one process writes in results_file at a time.
+    cached(scan parameters) tells whether the cached outputs of a scan (varinfo root_uri) can be
+    used (default: always), else the tasks of the scan run again (e.g. see results_exist).
+    Returns the outputs of the tasks by scan and the errors of the failed scans by scan.
+    """
+    graph = load_graph(graph)
+    numscanstart, numscanend = parameters["numScan"]
+    scans = range(numscanstart, numscanend + 1)
+    scan_parameters = {
+        numscan: {**parameters, "numScan": [numscan, numscan + 1]} for numscan in scans
+    }
+    if results_file:
+        for numscan, scan_parameter in scan_parameters.items():
+            scan_parameter["results_file"] = _scan_results_file(results_file, numscan)
+    force_rerun = {
+        numscan: bool(varinfo and varinfo.get("root_uri"))
+        and cached is not None
+        and not cached(scan_parameter)
+        for numscan, scan_parameter in scan_parameters.items()
+    }
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(
+                _execute_scan,
+                _scan_graph(graph, node, scan_parameter),
+                varinfo,
+                force_rerun[numscan],
+            ): numscan
+            for numscan, scan_parameter in scan_parameters.items()
+        }
+        results, failures = {}, {}
+        for done, future in enumerate(as_completed(futures), 1):
+            numscan = futures[future]
+            scan_results_file = scan_parameters[numscan].get("results_file")
+            try:
+                results[numscan] = future.result()
+                if scan_results_file:
+                    merge_results(scan_results_file, results_file)
+                print(f"Scan {numscan} done ({done}/{len(scans)})")
+            except Exception as error:
+                results.pop(numscan, None)
+                failures[numscan] = error
+                if scan_results_file and os.path.exists(scan_results_file):
+                    os.remove(scan_results_file)  # partial results of the failed scan
+                print(f"Scan {numscan} failed ({done}/{len(scans)}): {error!r}")
+    finally:
+        if own_executor:
+            executor.shutdown()
+    if failures:
+        print(f"{len(failures)} of {len(scans)} scans failed: {sorted(failures)}")
+    return dict(sorted(results.items())), dict(sorted(failures.items()))
+
+
+def execute_graph2(
+    workflow_filename, param_filename, max_workers=None, executor=None, cache_dir=None
+):
     # Load parameters
     with open(param_filename, "r") as f:
         parameters = json.load(f)
 
     log_parameters("exe_integration.log", parameters, "2d integration")
 
-    # Load graph
-    graph = load_graph(workflow_filename)
-
-    # Loop outside Integrate2D
-    numscanstart, numscanend = parameters.pop("numScan")
-
-    # Execute graph for each scan
-    for numscan in range(numscanstart, numscanend + 1):
-        parameters["numScan"] = [numscan, numscan + 1]
-        graph.graph.nodes["Integrate2D"]["inputs"] = parameters
-
-        varinfo = {"root_uri": None}  # optional
-        tasks = graph.execute(varinfo=varinfo)
-        for name, task in tasks.items():
-            print(name, task.output_values)
+    # Loop outside Integrate2D: execute graph for each scan in parallel
+    if cache_dir:
+        parameters = cache_parameters(parameters)
+    results_file = _results_file(parameters)
+    results, failures = execute_scans(
+        workflow_filename,
+        parameters,
+        max_workers=max_workers,
+        executor=executor,
+        varinfo={"root_uri": cache_dir},  # outputs of the tasks cached in cache_dir
+        results_file=results_file,  # one results file per scan, merged in Results_<h5file>
+        cached=lambda scan_parameters: results_exist(scan_parameters, results_file),
+    )
+    for numscan, tasks in results.items():
+        for name, output_values in tasks.items():
+            print(numscan, name, output_values)
+    return results, failures
@@ -6,39 +6,31 @@ Created on Fri Jun 11 18:45:26 2021
 """
 
 import numpy as np
+from easistrain.geometry import rotation_x, rotation_xyz, rotation_y, rotation_z
 
 ### definition of the normalized x, y and z vectors ###
 vx = np.array([1, 0, 0])
 vy = np.array([0, 1, 0])
 vz = np.array([0, 0, 1])
 ### Rotation matrix around x, x is in the direction of the beam ###
+### (rx can be an array of angles, see easistrain.geometry) ###
 def matrotx(rx):
-    rotx = np.array(
-        [[1, 0, 0], [0, np.cos(rx), -np.sin(rx)], [0, np.sin(rx), np.cos(rx)]]
-    )
-    return rotx
+    return rotation_x(rx)
 
 
 ### Rotation matrix around y, y is perpendicular to the beam and in its plane ###
 def matroty(ry):
-    roty = np.array(
-        [[np.cos(ry), 0, np.sin(ry)], [0, 1, 0], [-np.sin(ry), 0, np.cos(ry)]]
-    )
-    return roty
+    return rotation_y(ry)
 
 
 ### Rotation matrix around z, z iz perpendicular to the beam and out of the beam plane ###
 def matrotz(rz):
-    rotz = np.array(
-        [[np.cos(rz), -np.sin(rz), 0], [np.sin(rz), np.cos(rz), 0], [0, 0, 1]]
-    )
-    return rotz
+    return rotation_z(rz)
 
 
 ### Rotation matrix for 3 rotations: first around x, second around y and third around z  ###
 def matrotxyz(rx, ry, rz):
-    rotxyz = np.dot(matrotz(rz), np.dot(matroty(ry), matrotx(rx)))
-    return rotxyz
+    return rotation_xyz(rx, ry, rz)
 
 
 ### Norm of a vector ###
@@ -47,21 +39,28 @@ def normvec(cx, cy, cz):
     return normv
 
 
-### angle de diffraction theta ###
-def tth(cx, cy, cz, rx, ry, rz):
+### Coordinates of points after the 3 rotations (see matrotxyz) ###
+### coords: the coordinates of the points (N, 3) or of one point (3) ###
+def rotcoords(coords, rx, ry, rz):
+    return np.dot(np.asarray(coords, dtype=float), np.transpose(matrotxyz(rx, ry, rz)))
+
+
+### angle de diffraction theta and azimuth of points (N, 3), the rotation matrix is calculated once ###
+def tthazim(coords, rx, ry, rz):
+    rotated = rotcoords(coords, rx, ry, rz)
     theta = 0.5 * np.arctan2(
-        np.sqrt(
-            pow(np.dot(np.dot(matrotxyz(rx, ry, rz), np.array([cx, cy, cz])), vy), 2)
-            + pow(np.dot(np.dot(matrotxyz(rx, ry, rz), np.array([cx, cy, cz])), vz), 2)
-        ),
-        np.dot(np.dot(matrotxyz(rx, ry, rz), np.array([cx, cy, cz])), vx),
+        np.sqrt(pow(rotated[..., 1], 2) + pow(rotated[..., 2], 2)), rotated[..., 0]
     )
+    azimuth = np.arctan2(rotated[..., 2], rotated[..., 1])
+    return theta, azimuth
+
+
+### angle de diffraction theta ###
+def tth(cx, cy, cz, rx, ry, rz):
+    theta, azimuth = tthazim(np.array([cx, cy, cz]), rx, ry, rz)
     return theta
 
 
 def azim(cx, cy, cz, rx, ry, rz):
-    azimuth = np.arctan2(
-        np.dot(np.dot(matrotxyz(rx, ry, rz), np.array([cx, cy, cz])), vz),
-        np.dot(np.dot(matrotxyz(rx, ry, rz), np.array([cx, cy, cz])), vy),
-    )
+    theta, azimuth = tthazim(np.array([cx, cy, cz]), rx, ry, rz)
     return azimuth
@@ -0,0 +1,223 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from easistrain.func_conicalslit import lengthgv, slitradius
+from easistrain.func_tthdspacing import cubicdspacing, hexdspacing
+
+# Units of the different quantities
+### energy = keV
+### distance = micron
+### angle =rad
+###
+
+# The reflections used for the design of the slits of the BCC and FCC structures
+BCC_HKL = [
+    (1, 1, 0),
+    (2, 0, 0),
+    (2, 1, 1),
+    (2, 2, 0),
+    (3, 1, 0),
+    (2, 2, 2),
+    (3, 2, 1),
+    (4, 0, 0),
+]
+FCC_HKL = [
+    (1, 1, 1),
+    (2, 0, 0),
+    (2, 2, 0),
+    (3, 1, 1),
+    (2, 2, 2),
+    (4, 0, 0),
+    (3, 3, 1),
+    (4, 2, 0),
+    (4, 2, 2),
+]
+
+
+# This function defines a phase for the design of the slits
+# name is the name of the phase (used in the labels of the reflections)
+# a is the lattice parameter (in micron), c the second lattice parameter of the hexagonal structures
+# hkl is the list of the miller indices of the reflections to consider
+# structure is 'cubic' or 'hexagonal'
+def phase(name, a, hkl, structure="cubic", c=None):
+    if structure not in ("cubic", "hexagonal"):
+        raise ValueError(f"Unknown structure {structure}: cubic or hexagonal expected")
+    if structure == "hexagonal" and c is None:
+        raise ValueError("The lattice parameter c is needed for a hexagonal structure")
+    return {"name": name, "a": a, "c": c, "hkl": list(hkl), "structure": structure}
+
+
+# This function calculates the d-spacing and the bragg angle of all the reflections of all the phases
+# phases is a list of phases (see phase)
+# energy is the array of energies (keV)
+# It returns the labels of the reflections (phase name + (hkl)), the d-spacings (nreflections)
+# and the bragg angles (nreflections, nenergies)
+def bragg_angles(phases, energy):
+    energy = np.atleast_1d(energy)
+    labels, d, theta = [], [], []
+    for p in phases:
+        h, k, l = np.array(p["hkl"], dtype=float).reshape(-1, 3).T[:, :, None]
+        if p["structure"] == "hexagonal":
+            d_phase, theta_phase = hexdspacing(energy, p["a"], p["c"], h, k, l)
+        else:
+            d_phase, theta_phase = cubicdspacing(energy, p["a"], h, k, l)
+        labels += [p["name"] + "(" + "".join(map(str, hkl)) + ")" for hkl in p["hkl"]]
+        d.append(d_phase[:, 0])
+        theta.append(theta_phase)
+    return labels, np.concatenate(d), np.concatenate(theta)
+
+
+# This function calculates the slit radius and the gauge volume length for all the combinations
+# of reflections, slit to sample distances, slit openings and energies with one broadcast calculation
+# phases is a list of phases (see phase)
+# energy is the array of energies (keV)
+# lss is the slit to sample distance, a scalar or an array
+# sddistance is the slit to detector distance
+# slitopening is the opening of the slit, a scalar or an array
+# beamsize is the size of the used beam
+# pixelsize is the pixel size of the used detector
+# It returns a dictionary with the inputs and:
+# reflections: the labels of the reflections, d: the d-spacings (nreflections)
+# theta: the bragg angles (nreflections, nenergies)
+# radius: the slit radius (nreflections, nlss, nenergies)
+# gauge_volume: the gauge volume length (nreflections, nlss, nslitopenings, nenergies)
+def slit_design(phases, energy, lss, sddistance, slitopening, beamsize, pixelsize):
+    energy = np.atleast_1d(np.asarray(energy, dtype=float))
+    lss = np.atleast_1d(np.asarray(lss, dtype=float))
+    slitopening = np.atleast_1d(np.asarray(slitopening, dtype=float))
+    labels, d, theta = bragg_angles(phases, energy)
+    theta4d = theta[:, None, None, :]
+    lss4d = lss[None, :, None, None]
+    radius = slitradius(None, lss4d, theta4d)[:, :, 0, :]
+    gauge_volume = lengthgv(
+        theta4d,
+        lss4d,
+        sddistance,
+        slitopening[None, None, :, None],
+        beamsize,
+        pixelsize,
+    )
+    return {
+        "reflections": labels,
+        "d": d,
+        "theta": theta,
+        "energy": energy,
+        "lss": lss,
+        "slitopening": slitopening,
+        "radius": radius,
+        "gauge_volume": gauge_volume,
+    }
+
+
+# This function gives all the energy windows (emin, emax) of an energy grid which are at least min_width wide
+# emin and emax are the limits of the energy grid, step is the step of the grid (keV)
+def energy_windows(emin, emax, step, min_width):
+    limits = np.arange(emin, emax + step / 2, step)
+    start, end = np.meshgrid(limits, limits, indexing="ij")
+    keep = end - start >= min_width - step / 2
+    return np.column_stack((start[keep], end[keep]))
+
+
+# This function evaluates the designs of a block of slit to sample distances (see optimize_slit_design)
+# It returns the relative rms and max deviations from the target length and the mean gauge volume length
+# of each (lss, slitopening, energy window) combination
+def _evaluate_designs(
+    phases,
+    energy,
+    lss,
+    slitopening,
+    in_window,
+    target_length,
+    sddistance,
+    beamsize,
+    pixelsize,
+):
+    gauge_volume = slit_design(
+        phases, energy, lss, sddistance, slitopening, beamsize, pixelsize
+    )["gauge_volume"]
+    deviation = np.abs(gauge_volume - target_length) / target_length
+    npoints = len(gauge_volume) * np.sum(in_window, axis=1)
+    rms_deviation = np.sqrt(np.sum(deviation**2, axis=0) @ in_window.T / npoints)
+    mean_length = np.sum(gauge_volume, axis=0) @ in_window.T / npoints
+    max_deviation = np.amax(
+        np.where(in_window, np.amax(deviation, axis=0)[:, :, None, :], 0), axis=-1
+    )
+    return rms_deviation, max_deviation, mean_length
+
+
+# This function searches the slit to sample distance, the slit opening and the energy window which give
+# a gauge volume length as close as possible to target_length for all the reflections of the phases
+# All the combinations of lss, slitopening and windows are evaluated with broadcast calculations
+# phases is a list of phases (see phase) with the reflections to consider
+# target_length is the wanted gauge volume length (micron)
+# lss and slitopening are the arrays of slit to sample distances and slit openings to try
+# windows is the array of energy windows (nwindows, 2) to try (see energy_windows)
+# npoints is the number of energies used to describe each window
+# n_best is the number of designs returned
+# max_workers: if given, the blocks of lss are evaluated in parallel with max_workers threads
+# It returns a table (numpy structured array) of the n_best designs ranked by relative rms deviation
+# from target_length over the reflections and the energies of the window
+def optimize_slit_design(
+    phases,
+    target_length,
+    lss,
+    slitopening,
+    windows,
+    sddistance,
+    beamsize,
+    pixelsize,
+    npoints=500,
+    n_best=10,
+    max_workers=None,
+):
+    lss = np.atleast_1d(np.asarray(lss, dtype=float))
+    slitopening = np.atleast_1d(np.asarray(slitopening, dtype=float))
+    windows = np.atleast_2d(np.asarray(windows, dtype=float))
+    energy = np.linspace(np.amin(windows), np.amax(windows), npoints)
+    in_window = (energy >= windows[:, :1] - 1e-9) & (energy <= windows[:, 1:] + 1e-9)
+    ncombinations = len(slitopening) * len(windows) * len(energy)
+    block = max(1, int(1e7 // ncombinations))  # limits the memory used by a block
+    blocks = [lss[i : i + block] for i in range(0, len(lss), block)]
+
+    def evaluate(lss_block):
+        return _evaluate_designs(
+            phases,
+            energy,
+            lss_block,
+            slitopening,
+            in_window,
+            target_length,
+            sddistance,
+            beamsize,
+            pixelsize,
+        )
+
+    if max_workers is None:
+        results = [evaluate(lss_block) for lss_block in blocks]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(evaluate, blocks))
+    rms_deviation, max_deviation, mean_length = (
+        np.concatenate(result) for result in zip(*results)
+    )
+    best = np.argsort(rms_deviation, axis=None)[:n_best]
+    ilss, iopening, iwindow = np.unravel_index(best, np.shape(rms_deviation))
+    table = np.zeros(
+        len(best),
+        dtype=[
+            ("lss", float),
+            ("slitopening", float),
+            ("emin", float),
+            ("emax", float),
+            ("rms_deviation", float),
+            ("max_deviation", float),
+            ("mean_length", float),
+        ],
+    )
+    table["lss"] = lss[ilss]
+    table["slitopening"] = slitopening[iopening]
+    table["emin"] = windows[iwindow, 0]
+    table["emax"] = windows[iwindow, 1]
+    table["rms_deviation"] = rms_deviation.flat[best]
+    table["max_deviation"] = max_deviation.flat[best]
+    table["mean_length"] = mean_length.flat[best]
+    return table
@@ -0,0 +1,164 @@
+import numpy as np
+from easistrain.func_fitting_functions import (
+    func_Gauss,
+    func_Lorentz,
+    func_PearsonVII,
+    func_pseudo_voigt,
+    jac_Gauss,
+    jac_Lorentz,
+    jac_PearsonVII,
+    jac_pseudo_voigt,
+)
+
+### Fitting functions which can be used for the fit of the peaks (name given by the user: function)
+fitting_functions = {
+    "PVII": func_PearsonVII,
+    "gauss": func_Gauss,
+    "Lorentz": func_Lorentz,
+    "PsV": func_pseudo_voigt,
+}
+
+### Partial derivatives of the fitting functions (name given by the user: function)
+fitting_jacobians = {
+    "PVII": jac_PearsonVII,
+    "gauss": jac_Gauss,
+    "Lorentz": jac_Lorentz,
+    "PsV": jac_pseudo_voigt,
+}
+
+
+### This function fits the background of all the azimuthal sectors with a one degree polynome (a*x + b)
+### It solves one linear least squares problem with one right hand side per sector
+### x: the two theta range (npts)
+### data: the intensities (npts, nsectors)
+### bgd_left: number of point to take at left (at the beginning of the tth range) for background fitting
+### bgd_right: number of point to take at right (at the end of the tth range) for background fitting
+### Returns the coefficients of the background (nsectors, 2): the constant b and the slope a
+def fit_background_sectors(x, data, bgd_left, bgd_right):
+    npts = np.shape(data)[0]
+    index_bgd = np.append(
+        np.arange(0, int(bgd_left)), np.arange(npts - int(bgd_right), npts - 1)
+    )  # points to be considered for bgd fitting
+    design = np.ones((np.size(index_bgd), 2), float)
+    design[:, 1] = x[index_bgd]
+    coef_bgd = np.linalg.lstsq(design, data[index_bgd, :], rcond=None)[0]
+    return np.transpose(coef_bgd)
+
+
+### This function calculates the background of all the sectors from the coefficients of fit_background_sectors
+### Returns the background (npts, nsectors)
+def background_sectors(x, coef_bgd):
+    return coef_bgd[:, 0] + np.outer(x, coef_bgd[:, 1])
+
+
+### This function gives the first guess of the parameters of the peak of each sector (nsectors, 4)
+### data_bgd_subs: the intensities with the background subtracted (npts, nsectors)
+### P[0]: max of intensity, P[1]: tth of the max, P[2]: FWHM guess, P[3]: shape factor (0.5)
+def guess_sectors(x, data_bgd_subs):
+    nsectors = np.shape(data_bgd_subs)[1]
+    P = np.zeros((nsectors, 4), float)
+    P[:, 0] = np.amax(data_bgd_subs, axis=0)  # Max of intensity
+    P[:, 1] = x[np.argmax(data_bgd_subs, axis=0)]  # tth
+    with np.errstate(divide="ignore", invalid="ignore"):
+        half_max = np.round(data_bgd_subs / (P[:, 0] / 2)) == 1
+    found = np.any(half_max, axis=0) & (P[:, 0] != 0)
+    P[:, 2] = np.where(
+        found, np.abs(x[np.argmax(half_max, axis=0)] - P[:, 1]), 0.01
+    )  # FWHM
+    P[:, 3] = 0.5
+    return P
+
+
+### This function calculates a fitting function for all the sectors at once
+### fitfunc: one of the fitting functions of func_fitting_functions (P, x)
+### P: the parameters of all the sectors (nsectors, nparams)
+### x: the two theta range (npts)
+### Returns the calculated intensities (nsectors, npts)
+def eval_sectors(fitfunc, P, x):
+    return fitfunc(np.transpose(P)[:, :, np.newaxis], x[np.newaxis, :])
+
+
+### This function calculates the jacobian of a fitting function for all the sectors at once
+### jacfunc: one of the analytic partial derivatives of func_fitting_functions (P, x)
+### Returns the jacobian (nsectors, npts, nparams)
+def jacobian_sectors(jacfunc, P, x):
+    return np.moveaxis(
+        jacfunc(np.transpose(P)[:, :, np.newaxis], x[np.newaxis, :]), 0, -1
+    )
+
+
+### This function minimizes sum((func(P) - y)**2) for all the sectors together (Levenberg-Marquardt)
+### Each sector is an independent problem but the residuals, the jacobians and the steps of all
+### the sectors are calculated with array operations
+### func: function (P, x) returning the calculated intensities (nsectors, npts)
+### jac: function (P, x) returning the jacobian (nsectors, npts, nparams)
+### P0: first guess of the parameters (nsectors, nparams)
+### y: the data to fit (nsectors, npts)
+### Returns the fitted parameters (nsectors, nparams) and the success flag of each sector
+### (1: converged, 5: maximum number of iterations reached, as scipy.optimize.leastsq)
+def batch_least_squares(func, jac, P0, x, y, max_iter=200, ftol=1.49012e-8):
+    P = np.array(P0, dtype=float)
+    nsectors, nparams = np.shape(P)
+    residual = func(P, x) - y
+    cost = np.sum(residual**2, axis=1)
+    damping = np.full(nsectors, 1e-3)
+    active = np.isfinite(cost)
+    success = np.full(nsectors, 5, int)
+    for _ in range(max_iter):
+        if not np.any(active):
+            break
+        idx = np.flatnonzero(active)
+        J = jac(P[idx], x)
+        JTJ = np.einsum("snp,snq->spq", J, J)
+        gradient = np.einsum("snp,sn->sp", J, residual[idx])
+        scale = np.diagonal(JTJ, axis1=1, axis2=2)
+        scale = np.where(scale > 0, scale, 1.0)
+        A = JTJ + damping[idx, np.newaxis, np.newaxis] * (
+            scale[:, :, np.newaxis] * np.eye(nparams)
+        )
+        finite = np.all(np.isfinite(A), axis=(1, 2)) & np.all(
+            np.isfinite(gradient), axis=1
+        )
+        active[idx[~finite]] = False  # the problem can not be solved for this sector
+        idx, A, gradient = idx[finite], A[finite], gradient[finite]
+        if np.size(idx) == 0:
+            break
+        step = -np.linalg.solve(A, gradient[:, :, np.newaxis])[:, :, 0]
+        P_new = P[idx] + step
+        residual_new = func(P_new, x) - y[idx]
+        cost_new = np.sum(residual_new**2, axis=1)
+        improved = np.isfinite(cost_new) & (cost_new <= cost[idx])
+        converged = improved & (cost[idx] - cost_new <= ftol * cost[idx])
+        accepted = idx[improved]
+        P[accepted] = P_new[improved]
+        residual[accepted] = residual_new[improved]
+        cost[accepted] = cost_new[improved]
+        damping[idx] = np.where(improved, damping[idx] * 0.1, damping[idx] * 10)
+        stalled = ~improved & (damping[idx] > 1e16)  # no better solution can be found
+        success[idx[converged | stalled]] = 1
+        active[idx[converged | stalled]] = False
+    return P, success
+
+
+### This function fits the peak of all the azimuthal sectors of an image
+### x: the two theta range (npts)
+### data_raw: the raw intensities (npts, nsectors)
+### fct: the name of function to use for peak fitting: PVII, gauss, Lorentz or PsV
+### Returns the background coefficients (nsectors, 2), the data with the background subtracted (npts, nsectors),
+### the fitted parameters (nsectors, 4), the success flags (nsectors) and the fitted data with the background (npts, nsectors)
+def fit_sectors(x, data_raw, bgd_left, bgd_right, fct):
+    fitfunc = fitting_functions[fct]
+    jacfunc = fitting_jacobians[fct]
+    coef_bgd = fit_background_sectors(x, data_raw, bgd_left, bgd_right)
+    background = background_sectors(x, coef_bgd)
+    data_bgd_subs = data_raw - background
+    P0 = guess_sectors(x, data_bgd_subs)
+    R1, success = batch_least_squares(
+        lambda P, x: eval_sectors(fitfunc, P, x),
+        lambda P, x: jacobian_sectors(jacfunc, P, x),
+        P0,
+        x,
+        np.transpose(data_bgd_subs),
+    )
+    data_fitted = np.transpose(eval_sectors(fitfunc, R1, x)) + background
+    return coef_bgd, data_bgd_subs, R1, success, data_fitted
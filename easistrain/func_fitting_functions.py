@@ -36,3 +36,86 @@ def func_Lorentz(P, x):
 ### P[3]: Shape factor (Lorentzian: shape factor --> 1 , Gaussian: shape factor --> 0)
 def func_pseudo_voigt(P, x):
     return P[3] * func_Lorentz(P, x) + ((1 - P[3]) * func_Gauss(P, x))
+
+
+### This function is the split Pseudo-Voigt function (same definition as silx.math.fit.sum_splitpvoigt for one peak)
+### P[0]: Intensity of the peak (maximum intensity of the peak)
+### P[1]: Position of the peak
+### P[2]: FWHM at the left of the peak
+### P[3]: FWHM at the right of the peak
+### P[4]: Shape factor (Lorentzian: shape factor --> 1 , Gaussian: shape factor --> 0)
+def func_split_pseudo_voigt(P, x):
+    fwhm = np.where(x < P[1], P[2], P[3])
+    u2 = 4 * ((x - P[1]) / fwhm) ** 2
+    return P[0] * (P[4] / (1 + u2) + (1 - P[4]) * np.exp(-np.log(2) * u2))
+
+
+### The following functions are the partial derivatives of the functions above with respect to P
+### They return an array J where J[i] is the derivative with respect to P[i]
+### P[i] and x can be arrays: the profiles of several peaks or spectra are then calculated at once
+def jac_PearsonVII(P, x):
+    k = 2 ** (1 / P[3]) - 1
+    B = 1 + 4 * k * ((x - P[1]) / P[2]) ** 2
+    f = P[0] * B ** (-P[3])
+    dfdB = -P[3] * f / B
+    return np.stack(
+        np.broadcast_arrays(
+            B ** (-P[3]),
+            dfdB * (-8 * k * (x - P[1]) / P[2] ** 2),
+            dfdB * (-8 * k * (x - P[1]) ** 2 / P[2] ** 3),
+            -f * np.log(B)
+            + dfdB
+            * (-4 * np.log(2) * 2 ** (1 / P[3]) * ((x - P[1]) / P[2]) ** 2 / P[3] ** 2),
+        )
+    )
+
+
+def jac_Gauss(P, x):
+    u = (x - P[1]) / P[2]
+    E = np.exp(-(np.pi) * u**2)
+    return np.stack(
+        np.broadcast_arrays(
+            E,
+            P[0] * E * 2 * np.pi * u / P[2],
+            P[0] * E * 2 * np.pi * u**2 / P[2],
+            0 * E,
+        )
+    )
+
+
+def jac_Lorentz(P, x):
+    u = (x - P[1]) / P[2]
+    D = 1 + ((np.pi) ** 2) * u**2
+    return np.stack(
+        np.broadcast_arrays(
+            1 / D,
+            P[0] * 2 * (np.pi) ** 2 * u / (P[2] * D**2),
+            P[0] * 2 * (np.pi) ** 2 * u**2 / (P[2] * D**2),
+            0 * D,
+        )
+    )
+
+
+def jac_pseudo_voigt(P, x):
+    J = P[3] * jac_Lorentz(P, x) + (1 - P[3]) * jac_Gauss(P, x)
+    J[3] = func_Lorentz(P, x) - func_Gauss(P, x)
+    return J
+
+
+def jac_split_pseudo_voigt(P, x):
+    left = x < P[1]
+    fwhm = np.where(left, P[2], P[3])
+    u2 = 4 * ((x - P[1]) / fwhm) ** 2
+    L = 1 / (1 + u2)
+    G = np.exp(-np.log(2) * u2)
+    dfdu2 = -P[0] * (P[4] * L**2 + (1 - P[4]) * np.log(2) * G)
+    dfdfwhm = dfdu2 * (-2 * u2 / fwhm)
+    return np.stack(
+        np.broadcast_arrays(
+            P[4] * L + (1 - P[4]) * G,
+            dfdu2 * (-8 * (x - P[1]) / fwhm**2),
+            np.where(left, dfdfwhm, 0),
+            np.where(left, 0, dfdfwhm),
+            P[0] * (L - G),
+        )
+    )
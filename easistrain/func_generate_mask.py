@@ -1,26 +1,190 @@
-import fabio
-import numpy as np
-from fabio.edfimage import edfimage
-from func_save_edf_image import *
-
-### This function generate automatically a mask for an image. It masks the pixels lower than int_min and bigger than int_max
-### root: the path of the folder of the image for which the mask will be generated
-### image: The name of the image for which the mask will be generated
-### int_min: minimum intensity below which the pixels have to be masked
-### int_max: maximum intensity above which the pixels have to be masked
-### root_save: The path of the folder pn which the mask have to be saved
-### mask_name: The name of the mask
-### extension: The format of the mask image (edf, tif, ...)
-
-
-def mask(root, image, int_min, int_max, root_save, mask_name, extension):
-    image_matrix = fabio.open(root + "/" + image + "." + extension).data
-    mask_matrix = np.zeros_like(image_matrix)
-    for i in range(np.shape(image_matrix)[0]):
-        for j in range(np.shape(image_matrix)[1]):
-            if image_matrix[i, j] < np.float64(int_min) or image_matrix[
-                i, j
-            ] > np.float64(int_max):
-                mask_matrix[i, j] = 1
-    save_edf_image(root_save, mask_name, extension, mask_matrix)
-    return
+import fabio
+import h5py
+import numpy as np
+from easistrain.func_save_edf_image import save_edf_image
+
+### Values of the pixels of the mask given by statistical_mask (a pixel can have several flags)
+DEAD_PIXEL = 1
+HOT_PIXEL = 2
+INTERMITTENT_PIXEL = 4
+
+### Maximum number of values read at once by default by stack_statistics (32 MB of float64)
+MAX_VALUES_PER_READ = 2**22
+
+
+### This function gives the pixels of an image lower than int_min or bigger than int_max (True: pixel to mask)
+### image_matrix: the matrix of the image
+### int_min: minimum intensity below which the pixels have to be masked (None: no minimum)
+### int_max: maximum intensity above which the pixels have to be masked (None: no maximum)
+def threshold_mask(image_matrix, int_min=None, int_max=None):
+    masked = np.zeros(np.shape(image_matrix), bool)
+    if int_min is not None:
+        masked |= image_matrix < float(int_min)
+    if int_max is not None:
+        masked |= image_matrix > float(int_max)
+    return masked
+
+
+### This function calculates the statistics of each pixel of a stack of frames, with a memory independent of the number of frames
+### The median and the MAD (median absolute deviation) are estimated on sample_frames frames evenly spaced in the stack,
+### then the stack is read once by blocks of frames_per_read frames for the maximum and the outliers of each pixel
+### The sampling is an approximation chosen to keep the memory bounded (an exact median needs all the values of a pixel):
+### - the median and the MAD are exact only if the stack has at most sample_frames frames
+### - otherwise their statistical error is about 1.25 * sigma / sqrt(sample_frames) (0.22 sigma for 32 frames)
+### - a pixel which is abnormal only between the sampled frames (a drift, a failure during a part of the scan)
+###   is compared to a median which does not see it: all its values are outliers, it is masked as intermittent
+###   if they are more than intermittent_fraction of the frames (see statistical_mask), never as hot
+### stack: the frames (nframes, ny, nx), a numpy array or a h5py dataset
+### n_sigma: a value is an outlier if it differs from the median of its pixel by more than n_sigma * sigma
+### where sigma is 1.4826 * MAD or the poisson noise sqrt(median) if bigger
+### frames_per_read: number of frames read at once (None: the frames of a chunk of the h5py dataset, usually one frame,
+### or 16 frames, at most MAX_VALUES_PER_READ values)
+### sample_frames: number of frames used to estimate the median and the MAD (sample_frames * ny * nx values in memory)
+### Returns the median, the MAD, the maximum and the fraction of outlier frames of each pixel (ny, nx)
+def stack_statistics(stack, n_sigma=5, frames_per_read=None, sample_frames=32):
+    nframes = np.shape(stack)[0]
+    if frames_per_read is None:
+        chunks = getattr(stack, "chunks", None)
+        frames_per_read = min(
+            chunks[0] if chunks else 16,
+            max(1, MAX_VALUES_PER_READ // int(np.prod(np.shape(stack)[1:]))),
+        )
+    sample = np.unique(
+        np.linspace(0, nframes - 1, min(sample_frames, nframes)).round().astype(int)
+    )
+    frames = np.asarray(stack[sample], dtype=float)
+    median = np.median(frames, axis=0)
+    mad = np.median(np.abs(frames - median), axis=0)
+    sigma = np.maximum(1.4826 * mad, np.sqrt(np.maximum(median, 1)))
+    maximum = np.full(np.shape(stack)[1:], -np.inf)
+    outliers = np.zeros(np.shape(stack)[1:], int)
+    for start in range(0, nframes, frames_per_read):
+        frames = np.asarray(stack[start : start + frames_per_read], dtype=float)
+        maximum = np.maximum(maximum, np.amax(frames, axis=0))
+        outliers += np.sum(np.abs(frames - median) > n_sigma * sigma, axis=0)
+    return median, mad, maximum, outliers / nframes
+
+
+### This function masks the dead, hot and intermittent pixels of a stack of frames (see stack_statistics)
+### dead pixels: never count more than dead_max
+### hot pixels: their median is more than n_sigma * sigma above the median of all the pixels (sigma calculated
+### from the medians of all the pixels as in stack_statistics)
+### intermittent pixels: more than intermittent_fraction of the frames are outliers (zingers, unstable pixels)
+### Returns the mask (ny, nx): 0 for valid pixels, else the sum of DEAD_PIXEL, HOT_PIXEL and INTERMITTENT_PIXEL
+def statistical_mask(
+    stack,
+    n_sigma=5,
+    dead_max=0,
+    intermittent_fraction=0.05,
+    frames_per_read=None,
+    sample_frames=32,
+):
+    median, mad, maximum, outlier_fraction = stack_statistics(
+        stack, n_sigma, frames_per_read, sample_frames
+    )
+    dead = maximum <= dead_max
+    hot = np.zeros(np.shape(dead), bool)
+    if not np.all(dead):  ## no hot pixel if all the pixels are dead
+        median_all = np.median(median[~dead])
+        sigma_all = max(
+            1.4826 * np.median(np.abs(median[~dead] - median_all)),
+            np.sqrt(max(median_all, 1)),
+        )
+        hot = ~dead & (median > median_all + n_sigma * sigma_all)
+    intermittent = ~dead & (outlier_fraction > intermittent_fraction)
+    return (
+        DEAD_PIXEL * np.uint8(dead)
+        + HOT_PIXEL * np.uint8(hot)
+        + INTERMITTENT_PIXEL * np.uint8(intermittent)
+    )
+
+
+### This function masks the dead, hot and intermittent pixels of all the frames of a scan (see statistical_mask)
+### root_data: the path of the folder where the h5 file is saved
+### h5file: The name of the h5 file from which the frames are read
+### scan: The name of the group on which the concerned measurement are saved
+### detector name: The name of the detector
+### root_save, mask_name, extension: if root_save is given, the mask is saved as root_save/mask_name.extension
+def scan_statistical_mask(
+    root_data,
+    h5file,
+    scan,
+    detector_name,
+    root_save=None,
+    mask_name="mask",
+    extension="edf",
+    **kwargs
+):
+    with h5py.File(root_data + "/" + h5file, "r") as r_h5file:
+        mask_matrix = statistical_mask(
+            r_h5file["/" + scan + "/measurement/" + detector_name], **kwargs
+        )
+    if root_save is not None:
+        save_edf_image(root_save, mask_name, extension, mask_matrix)
+    return mask_matrix
+
+
+### This function gives the matrix of an existing mask given as a file name (read with fabio) or as a matrix
+def read_mask(mask_image):
+    if isinstance(mask_image, str):
+        return fabio.open(mask_image).data
+    return np.asarray(mask_image)
+
+
+### This function builds a mask (1: masked pixel, 0: valid pixel) combining all the given sources
+### image_matrix: image on which the intensity thresholds int_min and int_max are applied
+### stack: stack of frames from which the dead, hot and intermittent pixels are masked (see statistical_mask)
+### n_sigma, dead_max, intermittent_fraction: parameters of statistical_mask
+### masks: list of existing masks (file names or matrices), their non zero pixels are masked
+### At least one source is needed (the shape of the mask is the shape of the sources)
+def build_mask(
+    image_matrix=None,
+    int_min=None,
+    int_max=None,
+    stack=None,
+    masks=(),
+    n_sigma=5,
+    dead_max=0,
+    intermittent_fraction=0.05,
+):
+    if image_matrix is None and stack is None and not masks:
+        raise ValueError("No image, stack or mask given to build the mask")
+    masked = False
+    if image_matrix is not None:
+        masked = masked | threshold_mask(image_matrix, int_min, int_max)
+    if stack is not None:
+        masked = masked | (
+            statistical_mask(stack, n_sigma, dead_max, intermittent_fraction) != 0
+        )
+    for mask_image in masks:
+        masked = masked | (read_mask(mask_image) != 0)
+    return np.uint8(masked)
+
+
+### This function builds a mask from all the given sources (see build_mask), saves it and returns it
+### The returned matrix can be given directly as im_mask to the integration (integration_2D)
+### root_save: The path of the folder in which the mask have to be saved
+### mask_name: The name of the mask
+### extension: The format of the mask image (edf, tif, ...)
+def generate_mask(root_save, mask_name, extension, **sources):
+    mask_matrix = build_mask(**sources)
+    save_edf_image(root_save, mask_name, extension, mask_matrix)
+    return mask_matrix
+
+
+### This function generate automatically a mask for an image. It masks the pixels lower than int_min and bigger than int_max
+### root: the path of the folder of the image for which the mask will be generated
+### image: The name of the image for which the mask will be generated
+### int_min: minimum intensity below which the pixels have to be masked
+### int_max: maximum intensity above which the pixels have to be masked
+### root_save: The path of the folder pn which the mask have to be saved
+### mask_name: The name of the mask
+### extension: The format of the mask image (edf, tif, ...)
+
+
+def mask(root, image, int_min, int_max, root_save, mask_name, extension):
+    image_matrix = fabio.open(root + "/" + image + "." + extension).data
+    mask_matrix = np.zeros_like(image_matrix)
+    mask_matrix[threshold_mask(image_matrix, int_min, int_max)] = 1
+    save_edf_image(root_save, mask_name, extension, mask_matrix)
+    return mask_matrix
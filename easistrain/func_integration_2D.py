@@ -1,8 +1,10 @@
+import time
 import numpy as np
 import pyFAI
 import h5py
 import fabio
 import hdf5plugin  # noqa
+from easistrain.func_generate_mask import read_mask
 
 ### This function integrates a 2D image using integrate2D pyfai's function and save the results in a h5file named Results_name of the h5 file containing the image
 ### 1) It looks on the image on the h5 file
@@ -21,9 +23,10 @@ import hdf5plugin  # noqa
 ### npt_azim: number of sectors for the integration in the azimutha direction (around the ring)
 ### x_unit: the unity of the x axis (2th_deg or 2th_rad or q_A^-1...)
 ### im_dark: the name of the dark image (if no dark image exist please give 0 as argument)
-### im_mask: the name of the mask image (if no mask image exist please give 0 as argument)
+### im_mask: the name of the mask image or the mask matrix, e.g. returned by func_generate_mask.generate_mask (if no mask image exist please give None as argument)
 ### rad_range: the radial range to integrate in the radial direction (2tth, q, d, ...)
 ### azim_range: the range of azimuthal range (if we want to integrate just a portion of DS ring)
+### results_file: the path of the h5 file in which the results are saved (if None: root_data/Results_h5file), e.g. one file per scan merged later (see execute_workflow.execute_scans)
 
 
 def integration_2D(
@@ -48,10 +51,11 @@ def integration_2D(
     chiGon1,
     omegaGon2,
     phiGon3,
+    results_file=None,
 ):
     print(im_dark)
     fh5_save = h5py.File(
-        root_data + "/" + "Results" + "_" + h5file, "a"
+        results_file or root_data + "/" + "Results" + "_" + h5file, "a"
     )  ### Create th file in which will be saved the results (integration, ...)
     r_h5file = h5py.File(root_data + "/" + h5file, "r")  ## Read the h5 file of raw data
     r_groups_scan = list(
@@ -286,15 +290,23 @@ def integration_2D(
                     rslt_matrix_cts = np.zeros((int(npt_rad), int(npt_azim) + 1), float)
                     rslt_matrix_chi = np.zeros((int(npt_azim)), float)
                     rslt_matrix_tth = np.zeros((int(npt_rad)), float)
-                    if im_mask == None:
+                    if im_mask is None:
                         mask_mat = None
                         print("### No mask was used for the integration")
                         flog.write("### No mask was used for the integration \n")
                     else:
-                        mask_mat = fabio.open(im_mask).data
-                        print("### The image: " + im_mask + " " + "was used as mask")
+                        mask_mat = read_mask(im_mask)
+                        print(
+                            "### The image: "
+                            + _mask_name(im_mask)
+                            + " "
+                            + "was used as mask"
+                        )
                         flog.write(
-                            "### The image: " + im_mask + " " + "was used as mask \n"
+                            "### The image: "
+                            + _mask_name(im_mask)
+                            + " "
+                            + "was used as mask \n"
                         )
                     if im_dark == None:
                         dark_mat = None
@@ -410,15 +422,23 @@ def integration_2D(
                     print("### Saving in h5file completed")
                     flog.write("### Saving in h5file completed \n")
                 else:  # is executed if the matrix dimension is not 2 (meaninig if it contains more than one image)
-                    if im_mask == None:
+                    if im_mask is None:
                         mask_mat = None
                         print("### No mask was used for the integration")
                         flog.write("### No mask was used for the integration \n")
                     else:
-                        mask_mat = fabio.open(im_mask).data
-                        print("### The image: " + im_mask + " " + "was used as mask")
+                        mask_mat = read_mask(im_mask)
+                        print(
+                            "### The image: "
+                            + _mask_name(im_mask)
+                            + " "
+                            + "was used as mask"
+                        )
                         flog.write(
-                            "### The image: " + im_mask + " " + "was used as mask \n"
+                            "### The image: "
+                            + _mask_name(im_mask)
+                            + " "
+                            + "was used as mask \n"
                         )
                     if im_dark == None:
                         dark_mat = None
@@ -662,15 +682,23 @@ def integration_2D(
                     rslt_matrix_cts = np.zeros((int(npt_rad), int(npt_azim) + 1), float)
                     rslt_matrix_chi = np.zeros((int(npt_azim)), float)
                     rslt_matrix_tth = np.zeros((int(npt_rad)), float)
-                    if im_mask == None:
+                    if im_mask is None:
                         mask_mat = None
                         print("### No mask was used for the integration")
                         flog.write("### No mask was used for the integration \n")
                     else:
-                        mask_mat = fabio.open(im_mask).data
-                        print("### The image: " + im_mask + " " + "was used as mask")
+                        mask_mat = read_mask(im_mask)
+                        print(
+                            "### The image: "
+                            + _mask_name(im_mask)
+                            + " "
+                            + "was used as mask"
+                        )
                         flog.write(
-                            "### The image: " + im_mask + " " + "was used as mask \n"
+                            "### The image: "
+                            + _mask_name(im_mask)
+                            + " "
+                            + "was used as mask \n"
                         )
                     if im_dark == None:
                         dark_mat = None
@@ -786,15 +814,23 @@ def integration_2D(
                     print("### Saving in h5file completed")
                     flog.write("### Saving in h5file completed \n")
                 else:  # is executed if the matrix dimension is not 2 (meaninig if it contains more than one image)
-                    if im_mask == None:
+                    if im_mask is None:
                         mask_mat = None
                         print("### No mask was used for the integration")
                         flog.write("### No mask was used for the integration \n")
                     else:
-                        mask_mat = fabio.open(im_mask).data
-                        print("### The image: " + im_mask + " " + "was used as mask")
+                        mask_mat = read_mask(im_mask)
+                        print(
+                            "### The image: "
+                            + _mask_name(im_mask)
+                            + " "
+                            + "was used as mask"
+                        )
                         flog.write(
-                            "### The image: " + im_mask + " " + "was used as mask \n"
+                            "### The image: "
+                            + _mask_name(im_mask)
+                            + " "
+                            + "was used as mask \n"
                         )
                     if im_dark == None:
                         dark_mat = None
@@ -945,3 +981,273 @@ def integration_2D(
     flog.write("### Hope to see you again \n")
     flog.close
     return
+
+
+### This function gives the name of the mask used for the integration (for the logs)
+def _mask_name(im_mask):
+    return im_mask if isinstance(im_mask, str) else "mask matrix"
+
+
+### This function integrates the images of a scan while it is still being acquired (online/live mode)
+### The raw h5 file is opened once in SWMR mode and the detector dataset is refreshed at each poll:
+### only the new frames are integrated and appended to the results file as 'image_XXXXX' groups
+### The layout of the results is the same as the one given by integration_2D ('Position' group included)
+### Definition of the specific function inputs (the others are the same as integration_2D):
+### scan: the full name of the scan to follow (e.g. 'CeO2_0001_1.1')
+### poll_interval: time (in seconds) to wait between two checks of the detector dataset
+### timeout: time (in seconds) without new frame after which the follow mode stops
+### npoints: number of frames of the scan if known (the follow mode stops when they are all integrated)
+### results_file: the path of the h5 file in which the results are saved (if None: root_data/Results_h5file)
+### The follow mode stops when the scan is ended ('end_time' written in the scan) and all the frames are integrated,
+### when the npoints frames are integrated, or after timeout without new frame
+### A reader in SWMR mode does not see the objects created after the opening of the file (e.g. 'end_time'):
+### the file is closed while waiting for new frames and opened again at the next poll
+### The raw h5 file has to be written in SWMR mode (or closed by its writer): an OSError is raised otherwise
+def integration_2D_follow(
+    root_data,
+    h5file,
+    scan,
+    detector_name,
+    poni_file,
+    npt_rad,
+    npt_azim,
+    x_unit,
+    im_dark=None,
+    im_mask=None,
+    rad_range=None,
+    azim_range=None,
+    errorModel=None,
+    imFlat=None,
+    gon1=None,
+    gon2=None,
+    gon3=None,
+    chiGon1=None,
+    omegaGon2=None,
+    phiGon3=None,
+    poll_interval=1.0,
+    timeout=60.0,
+    npoints=None,
+    results_file=None,
+):
+    ai = pyFAI.load(
+        poni_file
+    )  ### Load the poni file describing the integration geometry
+    mask_mat = None if im_mask is None else read_mask(im_mask)
+    dark_mat = None if im_dark is None else fabio.open(im_dark).data
+    flat_mat = None if imFlat is None else fabio.open(imFlat).data
+    positioners = {
+        "S1": gon1,
+        "S2": gon2,
+        "S3": gon3,
+        "Chi": chiGon1,
+        "Omega": omegaGon2,
+        "phi": phiGon3,
+    }  # name of the position in the results: name of the positioner in the raw data
+    flog = open(root_data + "/" + "exe_integration.log", "a")
+    print("#*#*#*#*#*# Following the scan: " + scan + " #*#*#*#*#*#*")
+    flog.write("#*#*#*#*#*# Following the scan: " + scan + " #*#*#*#*#*#\n")
+    r_h5file = None
+    image_nc = None
+    try:
+        with h5py.File(
+            results_file or root_data + "/" + "Results" + "_" + h5file, "a"
+        ) as fh5_save:
+            level_1 = fh5_save.require_group(scan)
+            level_1_subg_1 = level_1.require_group("raw_integration_2D")
+            if "Integration_parameter" not in level_1_subg_1:
+                level_1_subg_3 = level_1_subg_1.create_group("Integration_parameter")
+                level_1_subg_3.create_dataset("npt_azim", dtype="f", data=int(npt_azim))
+                level_1_subg_3.create_dataset("npt_rad", dtype="f", data=int(npt_rad))
+                if rad_range is not None:
+                    level_1_subg_3.create_dataset(
+                        "rad_range", dtype="f", data=rad_range
+                    )
+                if azim_range is not None:
+                    level_1_subg_3.create_dataset(
+                        "azim_range", dtype="f", data=azim_range
+                    )
+            nb_done = len(
+                [name for name in level_1_subg_1.keys() if name.startswith("image_")]
+            )  # frames already integrated (allows to restart the follow mode)
+            last_new_frame = time.time()
+            reopen = True  # open the file (again) to see the objects created since the last opening
+            opened = False  # the raw h5 file was opened at least once
+            while True:
+                if reopen:
+                    r_h5file = _reopen_swmr(
+                        r_h5file, root_data + "/" + h5file, first=not opened
+                    )
+                    opened = opened or r_h5file is not None
+                    image_nc = (
+                        None
+                        if r_h5file is None
+                        else r_h5file.get(scan + "/measurement/" + detector_name)
+                    )
+                else:
+                    image_nc.refresh()
+                scan_ended = (
+                    r_h5file is not None
+                    and scan in r_h5file
+                    and "end_time" in r_h5file[scan]
+                )
+                nb_frames = nb_done
+                if image_nc is not None:
+                    nb_frames = _integrate_new_frames(
+                        image_nc,
+                        nb_done,
+                        lambda i, image: _integrate_and_save_frame(
+                            ai,
+                            image,
+                            i,
+                            level_1_subg_1,
+                            npt_rad,
+                            npt_azim,
+                            x_unit,
+                            mask_mat,
+                            dark_mat,
+                            flat_mat,
+                            rad_range,
+                            azim_range,
+                            errorModel,
+                        ),
+                    )
+                reopen = image_nc is None  # until the detector dataset exists
+                if nb_frames > nb_done:
+                    _save_positions(r_h5file, scan, level_1_subg_1, positioners)
+                    print(
+                        "### Images "
+                        + str(nb_done)
+                        + " to "
+                        + str(nb_frames - 1)
+                        + " integrated and saved"
+                    )
+                    flog.write(
+                        "### Images "
+                        + str(nb_done)
+                        + " to "
+                        + str(nb_frames - 1)
+                        + " integrated and saved \n"
+                    )
+                    nb_done = nb_frames
+                    fh5_save.flush()  # make the new images readable as soon as possible
+                    last_new_frame = time.time()
+                elif scan_ended or (npoints is not None and nb_done >= npoints):
+                    break
+                elif time.time() - last_new_frame > timeout:
+                    print("### No new image since " + str(timeout) + " seconds")
+                    flog.write("### No new image since " + str(timeout) + " seconds \n")
+                    break
+                else:
+                    reopen = True  # no new frame: check if the scan is ended in the file opened again
+                    if r_h5file is not None:
+                        r_h5file.close()  # the writer can open the file meanwhile (e.g. to write end_time)
+                        r_h5file = None
+                    time.sleep(poll_interval)
+            if r_h5file is not None:
+                _save_positions(r_h5file, scan, level_1_subg_1, positioners)
+    finally:
+        if r_h5file is not None:
+            r_h5file.close()
+    print("### " + str(nb_done) + " images integrated for the scan " + scan)
+    flog.write("### " + str(nb_done) + " images integrated for the scan " + scan + "\n")
+    flog.close()
+    return nb_done
+
+
+### Open the raw h5 file in SWMR read mode, the follow mode cannot read a file held by a writer without SWMR
+def _open_swmr(filename):
+    try:
+        return h5py.File(filename, "r", libver="latest", swmr=True)
+    except OSError as error:
+        raise OSError(
+            "Cannot open "
+            + filename
+            + " in SWMR mode: the follow mode needs a raw h5 file written in SWMR mode (or closed by its writer)"
+        ) from error
+
+
+### Close the raw h5 file (if opened) and open it again in SWMR read mode
+### A failure is only raised at the first opening: later, the writer may hold the file for a moment
+### (e.g. to write 'end_time' without SWMR) and None is returned, the file is opened again at the next poll
+def _reopen_swmr(r_h5file, filename, first):
+    if r_h5file is not None:
+        r_h5file.close()
+    try:
+        return _open_swmr(filename)
+    except OSError:
+        if first:
+            raise
+        return None
+
+
+### Process the frames of the (refreshed) detector dataset from the index 'start' one by one
+### Returns the number of frames available in the dataset
+def _integrate_new_frames(image_nc, start, process_frame):
+    if np.ndim(image_nc) == 2:  # a single image is saved in the scan
+        if start == 0:
+            process_frame(0, np.float64(image_nc[()]))
+        return 1
+    nb_frames = np.shape(image_nc)[0]
+    for i in range(start, nb_frames):
+        process_frame(i, np.float64(image_nc[i]))
+    return max(nb_frames, start)
+
+
+### Save the positions of the goniometer in the group 'Position' of the results, as integration_2D
+### (S1, S2 and S3 are the opposite of the positioners gon1, gon2 and gon3)
+### The positions are written again at each call: the positioners of a running scan grow with its frames
+def _save_positions(r_h5file, scan, level_1_subg_1, positioners):
+    for name, positioner in positioners.items():
+        path = scan + "/instrument/positioners/" + str(positioner)
+        if positioner is None or path not in r_h5file:
+            continue
+        position = r_h5file[path]
+        position.refresh()
+        level_1_subg_4 = level_1_subg_1.require_group("Position")
+        if name in level_1_subg_4:
+            del level_1_subg_4[name]
+        level_1_subg_4.create_dataset(
+            name,
+            dtype="f",
+            data=-position[()] if name.startswith("S") else position[()],
+        )
+
+
+### Integrate one image and save the result in the group 'image_XXXXX' of the results file
+def _integrate_and_save_frame(
+    ai,
+    image,
+    i,
+    level_1_subg_1,
+    npt_rad,
+    npt_azim,
+    x_unit,
+    mask_mat,
+    dark_mat,
+    flat_mat,
+    rad_range,
+    azim_range,
+    errorModel,
+):
+    cts, tth, chi = ai.integrate2d(
+        image,
+        int(npt_rad),
+        int(npt_azim),
+        correctSolidAngle=True,
+        error_model=errorModel,
+        radial_range=rad_range,
+        azimuth_range=azim_range,
+        mask=mask_mat,
+        polarization_factor=0.95,
+        dark=dark_mat,
+        flat=flat_mat,
+        method="splitpixel",
+        unit=x_unit,
+    )
+    rslt_matrix_cts = np.zeros((int(npt_rad), int(npt_azim) + 1), float)
+    rslt_matrix_cts[:, 0] = tth[:]
+    rslt_matrix_cts[:, 1:] = np.transpose(cts)
+    level_1_subg_2 = level_1_subg_1.create_group("image_" + str(i).zfill(5))
+    level_1_subg_2.create_dataset("tth_vs_cts", dtype="f", data=rslt_matrix_cts)
+    level_1_subg_2.create_dataset("chi", dtype="f", data=chi)
+    level_1_subg_2.create_dataset("tth", dtype="f", data=tth)
@@ -108,3 +108,82 @@ def lattice_param(root_data, h5file, poni_file, h, k, l):
             img_save1.create_dataset("latt_param_std", dtype="f", data=a_std)
             print("######### data saved in h5 file ############")
     return
+
+
+### This function calculates the d-spacing and the lattice parameter of all the images of all the scans at once
+### The cleaned tth positions of all the images of a scan are read and concatenated, then the calculations are done
+### on the concatenated arrays and the results are saved in one compact group per scan:
+### 'latt_param_d_spacing_(hkl)_summary' with the datasets:
+### image: the names of the images
+### index: the images are the rows index[i]:index[i+1] of the d_spacing and latt_param tables
+### d_spacing, latt_param: tables of the d-spacing (lattice parameter) and chi of all the images of the scan
+### d_spacing_mean, d_spacing_std, latt_param_mean, latt_param_std: one value per image
+def lattice_param_summary(root_data, h5file, poni_file, h, k, l):
+    ai = pyFAI.load(poni_file)  # loading the poni file (integration geometry)
+    wlgth = (ai.wavelength) * 10**10  # the wavelength in angstrom
+    hkl = str(h) + str(k) + str(l)
+    with h5py.File(
+        root_data + "/" + "Results" + "_" + h5file, "a"
+    ) as fh5_save:  ### Open the file in which are saved the results (integration, ...)
+        for scan_name in list(fh5_save.keys()):  # Iteration on the scans
+            print("#*#*#*#*#*# Processing of the scan: " + scan_name + " #*#*#*#*#*#*")
+            clean_group = fh5_save[
+                scan_name + "/fitting_HKL=" + "(" + hkl + ")_cleaned"
+            ]
+            images = list(clean_group.keys())  # getting the list images in a scan
+            tth_pos = [
+                clean_group[image + "/tth_position_cleaned"][()] for image in images
+            ]  # read the tth positions of all the images
+            chi_cleaned = [clean_group[image + "/chi_cleaned"][()] for image in images]
+            nb_points = np.array([np.size(tth) for tth in tth_pos], int)
+            index = np.append(0, np.cumsum(nb_points))
+            image_of_point = np.repeat(np.arange(len(images)), nb_points)
+            tth_all = np.concatenate(tth_pos + [np.zeros(0, "f")])
+            chi_all = np.concatenate(chi_cleaned + [np.zeros(0, "f")])
+            d_spacing_matrix = np.zeros(
+                (np.size(tth_all), 2), float
+            )  # table of the calculated d_spacings of all the images
+            d_spacing_matrix[:, 0] = wlgth / (
+                2 * np.sin(np.radians(0.5 * tth_all))
+            )  # Calculation of the d_spacing
+            d_spacing_matrix[:, 1] = chi_all
+            a_matrix = np.zeros(
+                (np.size(tth_all), 2), float
+            )  # table of the calculated lattice parameters of all the images
+            a_matrix[:, 0] = d_spacing_matrix[:, 0] * np.sqrt(
+                (int(h) ** 2) + (int(k) ** 2) + (int(l) ** 2)
+            )  # Calculation of the lattice parameter
+            a_matrix[:, 1] = chi_all
+            d_mean, d_std = _mean_std_per_image(
+                d_spacing_matrix[:, 0], image_of_point, len(images)
+            )
+            a_mean, a_std = _mean_std_per_image(
+                a_matrix[:, 0], image_of_point, len(images)
+            )
+            summary = fh5_save[scan_name].create_group(
+                "latt_param_d_spacing_" + "(" + hkl + ")_summary"
+            )  # Creating of the group where the results will be saved
+            summary.create_dataset("image", data=np.array(images, dtype="S"))
+            summary.create_dataset("index", data=index)
+            summary.create_dataset("d_spacing", dtype="f", data=d_spacing_matrix)
+            summary.create_dataset("d_spacing_mean", dtype="f", data=d_mean)
+            summary.create_dataset("d_spacing_std", dtype="f", data=d_std)
+            summary.create_dataset("latt_param", dtype="f", data=a_matrix)
+            summary.create_dataset("latt_param_mean", dtype="f", data=a_mean)
+            summary.create_dataset("latt_param_std", dtype="f", data=a_std)
+            print("######### data saved in h5 file ############")
+    return
+
+
+### This function calculates the mean and the std of the values of each image (NaN for images without values)
+### values: the values of all the images
+### image_of_point: the index of the image of each value
+def _mean_std_per_image(values, image_of_point, nb_images):
+    count = np.bincount(image_of_point, minlength=nb_images)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(image_of_point, values, nb_images) / count
+        std = np.sqrt(
+            np.bincount(image_of_point, (values - mean[image_of_point]) ** 2, nb_images)
+            / count
+        )
+    return mean, std
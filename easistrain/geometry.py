@@ -0,0 +1,89 @@
+"""Rotation and transformation matrices shared by the EDD and the alignment code.
+
+x is in the direction of the beam, y is perpendicular to the beam and in its plane,
+z is perpendicular to the beam and out of the beam plane.
+Angles can be scalars or arrays: a (3, 3) matrix is built for a scalar, a stack of
+(..., 3, 3) matrices for an array of angles.
+"""
+from functools import lru_cache
+import numpy as np
+
+
+def _stack_matrix(rows) -> np.ndarray:
+    """Builds (..., n, n) matrices from nested lists of scalars or broadcastable arrays"""
+    elements = np.broadcast_arrays(
+        *[np.asarray(e, dtype=float) for r in rows for e in r]
+    )
+    matrices = np.stack(elements, axis=-1)
+    return matrices.reshape(matrices.shape[:-1] + (len(rows), len(rows)))
+
+
+def rotation_x(rx) -> np.ndarray:
+    """Rotation matrices around x (angles in rad)"""
+    c, s = np.cos(rx), np.sin(rx)
+    return _stack_matrix([[1, 0, 0], [0, c, -s], [0, s, c]])
+
+
+def rotation_y(ry) -> np.ndarray:
+    """Rotation matrices around y (angles in rad)"""
+    c, s = np.cos(ry), np.sin(ry)
+    return _stack_matrix([[c, 0, s], [0, 1, 0], [-s, 0, c]])
+
+
+def rotation_z(rz) -> np.ndarray:
+    """Rotation matrices around z (angles in rad)"""
+    c, s = np.cos(rz), np.sin(rz)
+    return _stack_matrix([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+
+
+def rotation_xyz(rx, ry, rz) -> np.ndarray:
+    """Rotation matrices for 3 rotations: first around x, second around y and third around z (angles in rad)"""
+    return np.matmul(rotation_z(rz), np.matmul(rotation_y(ry), rotation_x(rx)))
+
+
+def homogeneous_matrix(rotation: np.ndarray, translation) -> np.ndarray:
+    """(..., 4, 4) transformation matrices from (..., 3, 3) rotations and (..., 3) translations"""
+    rotation = np.asarray(rotation, dtype=float)
+    translation = np.asarray(translation, dtype=float)
+    shape = np.broadcast(
+        np.empty(rotation.shape[:-2]), np.empty(translation.shape[:-1])
+    ).shape
+    matrix = np.zeros(shape + (4, 4))
+    matrix[..., 0:3, 0:3] = rotation
+    matrix[..., 0:3, 3] = translation
+    matrix[..., 3, 3] = 1
+    return matrix
+
+
+def to_homogeneous(points) -> np.ndarray:
+    """Adds a coordinate equal to 1 to (..., 3) points"""
+    points = np.asarray(points, dtype=float)
+    return np.concatenate((points, np.ones(points.shape[:-1] + (1,))), axis=-1)
+
+
+def from_homogeneous(points) -> np.ndarray:
+    """(..., 3) points from (..., 4) homogeneous points"""
+    points = np.asarray(points, dtype=float)
+    return points[..., 0:3] / points[..., 3:4]
+
+
+def apply_transformation(matrix: np.ndarray, points) -> np.ndarray:
+    """Applies (4, 4) or (..., 4, 4) transformation matrices to (..., 3) points"""
+    transformed = np.matmul(matrix, to_homogeneous(points)[..., None])[..., 0]
+    return from_homogeneous(transformed)
+
+
+@lru_cache(maxsize=128)
+def transformation_matrix(
+    rx: float, ry: float, rz: float, tx: float, ty: float, tz: float
+) -> np.ndarray:
+    """Transformation matrix (4, 4) of the rotations rx, ry, rz (in degrees, see rotation_xyz)
+    followed by the translation tx, ty, tz.
+
+    The matrices are cached: the returned array is read-only.
+    """
+    matrix = homogeneous_matrix(
+        rotation_xyz(np.deg2rad(rx), np.deg2rad(ry), np.deg2rad(rz)), (tx, ty, tz)
+    )
+    matrix.setflags(write=False)
+    return matrix
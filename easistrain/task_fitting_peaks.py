@@ -8,16 +8,21 @@ class Fit(
         "root_data",
         "h5file",
         "scan",
-        "detector_name",
-        "poni_file",
-        "npt_rad",
-        "npt_azim",
-        "x_unit",
-        "im_dark",
-        "im_mask",
+        "tth_min",
+        "tth_max",
+        "bgd_left",
+        "bgd_right",
+        "fct",
+        "hkl",
+        "Rp",
     ],
-    optional_input_names=[],
+    optional_input_names=["clean", "criteria"],
     output_names=["result"],
 ):
     def run(self):
-        self.outputs.result = fit(**self.input_values)
+        inputs = {
+            name: value
+            for name, value in self.input_values.items()
+            if value is not self.MISSING_DATA
+        }
+        self.outputs.result = fit(**inputs)
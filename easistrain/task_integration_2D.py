@@ -28,8 +28,22 @@ class Integrate2D(
         "chiGon1",
         "omegaGon2",
         "phiGon3",
+        "raw_data_stat",
+        "input_files_stat",
+        "results_file",
     ],
     output_names=["result"],
 ):
+    """raw_data_stat and input_files_stat (modification time and size of the raw data file and of
+    the other input files) are not used by the integration: they only change the hash of the inputs,
+    which keys the cached outputs (see execute_workflow.cache_parameters).
+    results_file is the file in which the results are saved (default: root_data/Results_<h5file>)"""
+
     def run(self):
-        self.outputs.result = integration_2D(**self.input_values)
+        inputs = {
+            name: value
+            for name, value in self.input_values.items()
+            if value is not self.MISSING_DATA
+            and name not in ("raw_data_stat", "input_files_stat")
+        }
+        self.outputs.result = integration_2D(**inputs)
@@ -1,12 +1,11 @@
 from pathlib import Path
 from typing import Union
 import h5py
+from easistrain.EDD.calibrants import CALIBRANTS_DIRECTORY
 from easistrain.EDD.angleCalibEDD import angleCalibrationEDD
 
 
 def generate_config(tmp_path: Path, test_data_path: Union[Path, str]) -> dict:
-    HERE = Path(__file__).parent.resolve()
-
     with h5py.File(test_data_path, "r") as test_file:
         nb_peaks_in_boxes = test_file["infos/nbPeaksInBoxes"][()]
         fit_ranges_h = test_file["infos/rangeFitHD"][()]
@@ -25,7 +24,7 @@ def generate_config(tmp_path: Path, test_data_path: Union[Path, str]) -> dict:
         "rangeFitVD": fit_ranges_v,
         "pathFileDetectorCalibration": str(tmp_path / "calib.h5"),
         "scanDetectorCalibration": 5,
-        "sampleCalibrantFile": str(HERE.parent.parent / "Calibrants" / "TiC.d"),
+        "sampleCalibrantFile": str(CALIBRANTS_DIRECTORY / "TiC.d"),
     }
 
 
@@ -103,3 +102,37 @@ def test_angleCalibrationEDD(tmp_path: Path):
 
     assert abs(vertical_angle - ref_vertical_angle) <= vertical_angle_error
     assert abs(horizontal_angle - ref_horizontal_angle) <= horizontal_angle_error
+
+
+def test_angleCalibrationEDD_auto_boxes(tmp_path: Path):
+    energy_calib_data_path = (
+        Path(__file__).parent.parent.resolve() / "data" / "Ba_calibration_data.hdf5"
+    )
+    angle_calib_data_path = (
+        Path(__file__).parent.parent.resolve() / "data" / "TiC_angle_calib_data.hdf5"
+    )
+    with h5py.File(angle_calib_data_path, "r") as h5file:
+        ref_vertical_angle = h5file["vertical/angle"][()]
+        ref_horizontal_angle = h5file["horizontal/angle"][()]
+    config = generate_input_files(
+        tmp_path, angle_calib_data_path, energy_calib_data_path
+    )
+    config.update(
+        numberOfBoxes=None,
+        nbPeaksInBoxes=None,
+        rangeFitHD=None,
+        rangeFitVD=None,
+        roughTwoTheta=5,
+        boxSearch={"tolerance": 0.05},
+    )
+
+    angleCalibrationEDD(**config)
+
+    with h5py.File(config["fileSave"], "r") as h5file:
+        grp = h5file[f'angleCalibration/fit_{config["dataset"]}_{config["scanNumber"]}']
+        vertical_angle = grp["calibratedAngle/calibratedAngleVD"][()]
+        horizontal_angle = grp["calibratedAngle/calibratedAngleHD"][()]
+        assert grp["infos/rangeFitHD"].shape == grp["infos/rangeFitVD"].shape
+    # The boxes found are not the ones chosen by hand for the reference
+    assert abs(vertical_angle - ref_vertical_angle) <= 0.1
+    assert abs(horizontal_angle - ref_horizontal_angle) <= 0.1
@@ -0,0 +1,68 @@
+import os
+from pathlib import Path
+import numpy
+import pytest
+from easistrain.EDD.calibrants import (
+    CALIBRANTS_DIRECTORY,
+    calibrantEnergies,
+    calibrantRegistry,
+    phaseCalibrant,
+    readCalibrant,
+    saveCalibrant,
+)
+
+
+def test_calibrant_registry():
+    registry = calibrantRegistry()
+
+    assert set(registry) == {"BaSource", "CeO2.d", "Cr2O3.d", "TiC.d"}
+    tic = registry["TiC.d"]
+    assert tic["kind"] == "d"
+    assert numpy.array_equal(
+        tic["lines"], numpy.loadtxt(CALIBRANTS_DIRECTORY / "TiC.d")
+    )
+    assert tic["hkl"] == ("",) * len(tic["lines"])
+    assert registry["BaSource"]["kind"] == "energy"
+    assert readCalibrant(CALIBRANTS_DIRECTORY / "TiC.d") is tic
+    with pytest.raises(ValueError):
+        tic["lines"][0] = 0
+    energies = calibrantEnergies(tic, 5)
+    assert energies[0] == pytest.approx(
+        12.398 / (2 * 2.491844 * numpy.sin(numpy.radians(2.5))), rel=1e-4
+    )
+    with pytest.raises(ValueError):
+        calibrantEnergies(tic)
+
+
+def test_calibrant_cache_follows_modifications(tmp_path: Path):
+    filename = tmp_path / "phase.d"
+    filename.write_text("2.5 # 111\n2.1 # 200\n")
+    first = readCalibrant(filename)
+
+    assert first["lines"].tolist() == [2.5, 2.1]
+    assert first["hkl"] == ("111", "200")
+    filename.write_text("2.5 # 111\n2.1 # 200\n1.5 # 220\n")
+    os.utime(filename, ns=(0, 10**9))
+    assert readCalibrant(filename)["hkl"] == ("111", "200", "220")
+
+
+def test_phase_calibrant(tmp_path: Path):
+    tic = phaseCalibrant(
+        "TiC", 4.3160, [(2, 0, 0), (1, 1, 1), (2, 2, 0), (3, 1, 1), (2, 2, 2)]
+    )
+
+    assert tic["hkl"] == ("111", "200", "220", "311", "222")
+    reference = numpy.loadtxt(CALIBRANTS_DIRECTORY / "TiC.d")[:5]
+    assert numpy.allclose(tic["lines"], reference, rtol=1e-4)
+
+    merged = phaseCalibrant("bcc", 3.0, [(2, 2, 1), (3, 0, 0)])
+    assert merged["hkl"] == ("221/300",)
+
+    hcp = phaseCalibrant("Ti", 2.95, [(0, 0, 2), (1, 0, 0)], "hexagonal", c=4.68)
+    assert hcp["hkl"] == ("100", "002")
+    assert numpy.allclose(hcp["lines"], [2.95 * numpy.sqrt(3) / 2, 4.68 / 2])
+
+    saveCalibrant(tic, tmp_path / "TiC.d")
+    saved = readCalibrant(tmp_path / "TiC.d")
+    assert saved["hkl"] == tic["hkl"]
+    assert numpy.allclose(saved["lines"], tic["lines"])
@@ -2,7 +2,10 @@ from pathlib import Path
 from typing import Union
 import numpy
 import h5py
+from easistrain.EDD.calibrants import CALIBRANTS_DIRECTORY
+from easistrain.EDD.calibrationBoxes import findCalibrationBoxes, linearEnergyAxis
 from easistrain.EDD.calibrationEDD import calibEdd as calib_edd
+from easistrain.EDD.utils import calibrationBoxFit, calibrationFits
 
 
 def test_calib_edd(tmp_path: Path):
@@ -11,9 +14,107 @@ def test_calib_edd(tmp_path: Path):
     calib_edd_assert(test_data_path, config)
 
 
-def generate_config(tmp_path: Path, test_data_path: Union[Path, str]) -> dict:
-    HERE = Path(__file__).parent.resolve()
+def test_calib_edd_start_time(tmp_path: Path):
+    test_data_path, config = calib_edd_init(tmp_path)
+    with h5py.File(config["fileRead"], "a") as h5file:
+        h5file["sample_0000_2.1/start_time"] = "2022-03-01T08:00:00"
+
+    calib_edd(**config)
+
+    with h5py.File(config["fileSave"], "r") as h5file:
+        infos = h5file["detectorCalibration/fit_0000_2_1/infos"]
+        assert infos["startTime"][()].decode() == "2022-03-01T08:00:00"
+
+
+def test_calib_edd_auto_boxes(tmp_path: Path):
+    test_data_path, config = calib_edd_init(tmp_path)
+    config.update(numberOfBoxes=None, nbPeaksInBoxes=None, rangeFit=None)
+
+    calib_edd(**config, roughCalibration=[0.075, 0.1])
+
+    calib_edd_assert(test_data_path, config)
+    with h5py.File(config["fileSave"], "r") as h5file:
+        infos = h5file["detectorCalibration/fit_0000_2_1/infos"]
+        assert infos["nbPeaksInBoxes"][()].tolist() == [1, 2, 1, 1]
+        assert infos["rangeFitHD"].shape == (8,)
+
+
+def test_calib_edd_average_of_frames(tmp_path: Path):
+    test_data_path, config = calib_edd_init(tmp_path)
+    dead_time = numpy.array([0.1, 0.4, 0.2, 0.3])
+    with h5py.File(config["fileRead"], "a") as h5file:
+        for scan, name in (
+            (config["scanNumberHorizontalDetector"], config["nameHorizontalDetector"]),
+            (config["scanNumberVerticalDetector"], config["nameVerticalDetector"]),
+        ):
+            measurement = h5file[
+                f'{config["sample"]}_{config["dataset"]}_{scan}.1/measurement'
+            ]
+            pattern = measurement[name][0]
+            del measurement[name]
+            # Frames with the counts of the pattern reduced by the dead time
+            measurement[name] = numpy.outer(1 - dead_time, pattern)
+            measurement[f"{name}_deadtime"] = dead_time
+
+    calib_edd(
+        **config,
+        spectraAccumulation="average",
+        deadTimeCounters=[
+            config["nameHorizontalDetector"] + "_deadtime",
+            config["nameVerticalDetector"] + "_deadtime",
+        ],
+        framesPerRead=3,
+    )
+    calib_edd_assert(test_data_path, config)
+
+
+def test_calibration_boxes_close_lines():
+    energy = linearEnergyAxis(4096, [0.075, 0.1])
+    lines = numpy.array([53.161, 79.623, 80.998, 276.398])
+    pattern = numpy.full(4096, 10.0)
+    for line, height in zip(
+        lines, [2000, 500, 5000, 1000]
+    ):  # the 80.998 keV peak is the highest
+        pattern += height * numpy.exp(-0.5 * ((energy - line) / 0.15) ** 2)
+
+    range_fits, nb_peaks_in_boxes = findCalibrationBoxes(
+        [pattern], [energy], [lines], tolerance=0.03, windowFactor=2
+    )
+
+    assert nb_peaks_in_boxes == [1, 2, 1]
+    (range_fit,) = range_fits
+    for line, first, last in zip(lines[[0, 1, 3]], range_fit[::2], range_fit[1::2]):
+        assert energy[first] < line < energy[last]
+    assert energy[range_fit[3]] > lines[2]
+
+
+def test_calibration_fits():
+    test_data_path = (
+        Path(__file__).parent.parent.resolve() / "data" / "Ba_calibration_data.hdf5"
+    )
+    with h5py.File(test_data_path, "r") as test_file:
+        nb_peaks_in_boxes = test_file["infos/nbPeaksInBoxes"][()]
+        fit_ranges = test_file["infos/rangeFit"][()]
+        patterns = {
+            "HorizontalDetector": test_file["horizontal/data"][0],
+            "VerticalDetector": test_file["vertical/data"][0],
+        }
+    ranges = {"HorizontalDetector": fit_ranges, "VerticalDetector": fit_ranges}
 
+    fits = calibrationFits(patterns, ranges, nb_peaks_in_boxes, 5000)
+
+    for detector, pattern in patterns.items():
+        assert len(fits[detector]) == len(nb_peaks_in_boxes)
+        for i, (fit, nb_peaks) in enumerate(zip(fits[detector], nb_peaks_in_boxes)):
+            assert fit["fitParams"].shape == (nb_peaks, 6)
+            box_fit = calibrationBoxFit(
+                pattern, fit_ranges[2 * i : 2 * i + 2], nb_peaks, 5000
+            )
+            for name, value in fit.items():
+                assert numpy.array_equal(value, box_fit[name])
+
+
+def generate_config(tmp_path: Path, test_data_path: Union[Path, str]) -> dict:
     with h5py.File(test_data_path, "r") as test_file:
         nb_peaks_in_boxes = test_file["infos/nbPeaksInBoxes"][()]
         fit_ranges = test_file["infos/rangeFit"][()]
@@ -29,7 +130,7 @@ def generate_config(tmp_path: Path, test_data_path: Union[Path, str]) -> dict:
         "numberOfBoxes": len(nb_peaks_in_boxes),
         "nbPeaksInBoxes": nb_peaks_in_boxes,
         "rangeFit": fit_ranges,
-        "sourceCalibrantFile": str(HERE.parent.parent / "Calibrants" / "BaSource"),
+        "sourceCalibrantFile": str(CALIBRANTS_DIRECTORY / "BaSource"),
     }
 
 
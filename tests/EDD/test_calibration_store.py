@@ -0,0 +1,117 @@
+import os
+from pathlib import Path
+import h5py
+import numpy
+import pytest
+from easistrain.EDD.calibrationStore import (
+    calibrationLookup,
+    calibrationResults,
+    calibrationStore,
+)
+
+
+def generate_calibrations(filename: Path):
+    with h5py.File(filename, "w") as h5file:
+        for scan, start_time, offset in (
+            (10, "2022-03-01T08:00:00", 0.1),
+            (30, "2022-03-02T08:00:00", 0.3),
+            (20, "2022-03-01T20:00:00", 0.2),
+        ):
+            group = h5file.create_group(f"detectorCalibration/fit_0001_{scan}_{scan}")
+            group["calibCoeffs/calibCoeffsHD"] = [1e-8, 0.075, offset]
+            group["calibCoeffs/uncertaintyCalibCoeffsHD"] = [1e-9, 1e-4, offset / 10]
+            group["infos/scanNumberHorizontalDetector"] = str(scan)
+            group["infos/startTime"] = start_time
+        h5file["detectorCalibration/fit_0001_40_40/calibCoeffs/calibCoeffsHD"] = [
+            0,
+            0.075,
+            0.4,
+        ]
+
+
+def test_calibration_store(tmp_path: Path):
+    filename = tmp_path / "calibrations.h5"
+    generate_calibrations(filename)
+
+    store = calibrationStore(str(filename))
+
+    assert store["names"] == (
+        "fit_0001_10_10",
+        "fit_0001_20_20",
+        "fit_0001_30_30",
+        "fit_0001_40_40",
+    )
+    assert store["scans"][:3].tolist() == [10, 20, 30]
+    assert numpy.isnan(store["times"][3])
+    assert calibrationStore(str(filename)) is store
+    with h5py.File(filename, "a") as h5file:
+        del h5file["detectorCalibration/fit_0001_40_40"]
+    os.utime(filename, ns=(0, 10**9))
+    assert len(calibrationStore(str(filename))["names"]) == 3
+
+
+def test_calibration_lookup(tmp_path: Path):
+    filename = str(tmp_path / "calibrations.h5")
+    generate_calibrations(filename)
+
+    name, values = calibrationLookup(filename, time="2022-03-01T10:00:00")
+    assert name == "fit_0001_10_10"
+    assert values["calibCoeffsHD"][2] == 0.1
+    assert calibrationLookup(filename, scan=28)[0] == "fit_0001_30_30"
+    # Without infos, a calibration is only found by its name
+    assert calibrationLookup(filename, scan=38)[0] == "fit_0001_30_30"
+    assert calibrationLookup(filename, name="fit_0001_40_40")[0] == "fit_0001_40_40"
+    assert calibrationLookup(filename, name="fit_0001_20_20")[0] == "fit_0001_20_20"
+
+    name, values = calibrationLookup(
+        filename, time="2022-03-01T11:00:00", interpolate=True
+    )
+    assert name == "fit_0001_10_10+fit_0001_20_20"
+    assert values["calibCoeffsHD"][2] == pytest.approx(0.125)
+    assert values["uncertaintyCalibCoeffsHD"][2] == pytest.approx(0.0125)
+    name, _ = calibrationLookup(filename, time="2022-03-05T00:00:00", interpolate=True)
+    assert name == "fit_0001_30_30"
+
+    with pytest.raises(KeyError):
+        calibrationLookup(filename, name="fit_0001_50_50")
+    with pytest.raises(ValueError):
+        calibrationLookup(filename)
+
+
+def test_calibration_lookup_without_times(tmp_path: Path):
+    filename = str(tmp_path / "calibrations.h5")
+    generate_calibrations(filename)
+    with h5py.File(filename, "a") as h5file:
+        for group in h5file["detectorCalibration"].values():
+            if "infos" in group:
+                del group["infos/startTime"]  # saved before the start time was recorded
+
+    assert (
+        calibrationLookup(filename, time="2022-03-02T07:00:00", scan=12)[0]
+        == "fit_0001_10_10"
+    )
+    with pytest.raises(ValueError, match="has a time or a scan number"):
+        calibrationLookup(filename, time="2022-03-02T07:00:00")
+
+
+def test_calibration_results(tmp_path: Path):
+    filename = str(tmp_path / "calibrations.h5")
+    generate_calibrations(filename)
+
+    results = calibrationResults(filename, "detectorCalibration", "fit_0001_20_20")
+
+    assert results["calibCoeffsHD"].tolist() == [1e-8, 0.075, 0.2]
+    assert not results["calibCoeffsHD"].flags.writeable
+    assert (
+        calibrationResults(filename, "detectorCalibration", "fit_0001_20_20") is results
+    )
+    with h5py.File(filename, "a") as h5file:
+        h5file["detectorCalibration/fit_0001_20_20/calibCoeffs/calibCoeffsHD"][2] = 0.5
+    os.utime(filename, ns=(0, 2 * 10**9))
+    assert calibrationResults(filename, "detectorCalibration", "fit_0001_20_20")[
+        "calibCoeffsHD"
+    ][2] == pytest.approx(0.5)
+    with pytest.raises(KeyError):
+        calibrationResults(filename, "detectorCalibration", "fit_0001_50_50")
+    with pytest.raises(ValueError):
+        calibrationResults(filename, "strainCalibration", "fit_0001_20_20")
@@ -2,6 +2,7 @@ from pathlib import Path
 from typing import Union
 import h5py
 import numpy
+from easistrain.EDD.calibrationStore import timestamp
 from easistrain.EDD.coordTransformation import coordTransformation
 
 ORIENTATION = "OR1"
@@ -61,3 +62,20 @@ def test_coordTransform(tmp_path: Path):
             ref_errors = h5file[f"{ORIENTATION}/ref_{peak_name}/errors"][()]
 
         assert numpy.all(numpy.abs(peak_data - ref_data) <= numpy.abs(ref_errors))
+
+
+def test_coordTransform_source_scan(tmp_path: Path):
+    test_data_path = (
+        Path(__file__).parent.parent.resolve() / "data" / "BAIII_coord_transform.hdf5"
+    )
+    config = generate_input_files(tmp_path, test_data_path)
+    with h5py.File(config["fileRead"], "a") as h5file:
+        h5file["scan/infos/scanNumber"] = 12
+        h5file["scan/infos/startTime"] = "2022-03-01T20:00:00"
+        n_rows = len(h5file["scan/tthPositionsGroup/peak_0000"])
+
+    coordTransformation(**config)
+
+    with h5py.File(config["fileSave"], "r") as h5file:
+        source_scan = h5file["global/sourceScan"][()]
+    assert source_scan.tolist() == [[12, timestamp("2022-03-01T20:00:00")]] * n_rows
@@ -1,10 +1,14 @@
 from pathlib import Path
+import pickle
+import h5py
 
 from ewokscore.utils import qualname
 from ewokscore import execute_graph
 
 from easistrain.EDD.calibrationEDD import calibEdd
+from easistrain.EDD.io import resultsToDict
 from .test_calibration import calib_edd_init, calib_edd_assert
+from . import test_angle_calibration
 
 
 def edd_graph(config):
@@ -30,3 +34,90 @@ def test_edd_graph(tmp_path: Path):
         assert task.succeeded, node_id
         if node_id == "calib":
             calib_edd_assert(test_data_path, config)
+
+
+def edd_tasks_graph(tmp_path: Path):
+    (tmp_path / "calib").mkdir()
+    (tmp_path / "angle").mkdir()
+    test_data_path, calib_config = calib_edd_init(tmp_path / "calib")
+    angle_data_path = test_data_path.parent / "TiC_angle_calib_data.hdf5"
+    angle_config = test_angle_calibration.generate_input_files(
+        tmp_path / "angle", angle_data_path, test_data_path
+    )
+    for config in (calib_config, angle_config):
+        config.pop("fileSave")
+    angle_config.pop("pathFileDetectorCalibration")
+    angle_config["scanDetectorCalibration"] = "fit_0000_2_1"
+    graph = {
+        "nodes": [
+            {
+                "id": node_id,
+                "task_type": "class",
+                "task_identifier": f"easistrain.EDD.tasks.{task}",
+                "default_inputs": [
+                    {"name": name, "value": value} for name, value in config.items()
+                ],
+            }
+            for node_id, task, config in (
+                ("calib", "CalibEdd", calib_config),
+                ("angle", "AngleCalibrationEDD", angle_config),
+            )
+        ],
+        "links": [
+            {
+                "source": "calib",
+                "target": "angle",
+                "data_mapping": [
+                    {
+                        "source_output": "results",
+                        "target_input": "pathFileDetectorCalibration",
+                    }
+                ],
+            }
+        ],
+    }
+    return graph, angle_data_path
+
+
+def assert_calibrated_angles(results: dict, angle_data_path: Path):
+    with h5py.File(angle_data_path, "r") as reference:
+        for detector, direction in (("HD", "horizontal"), ("VD", "vertical")):
+            angle = results["angleCalibration"]["fit_0000_2"]["calibratedAngle"][
+                f"calibratedAngle{detector}"
+            ]
+            assert (
+                abs(angle - reference[f"{direction}/angle"][()])
+                <= reference[f"{direction}/error"][()]
+            )
+
+
+def test_edd_tasks_in_memory(tmp_path: Path):
+    graph, angle_data_path = edd_tasks_graph(tmp_path)
+    files = set(tmp_path.rglob("*"))
+
+    results = execute_graph(graph)
+
+    assert all(task.succeeded for task in results.values())
+    # The results are passed as arrays, nothing is written on disk
+    assert set(tmp_path.rglob("*")) == files
+    angle_results = results["angle"].output_values["results"]
+    pickle.loads(pickle.dumps(angle_results))
+    assert_calibrated_angles(angle_results, angle_data_path)
+
+
+def test_edd_tasks_persisted(tmp_path: Path):
+    graph, angle_data_path = edd_tasks_graph(tmp_path)
+    fileSave = str(tmp_path / "angle_calibration.h5")
+    graph["nodes"][1]["default_inputs"].append({"name": "fileSave", "value": fileSave})
+    (tmp_path / "cache").mkdir()
+
+    results = execute_graph(
+        graph, varinfo={"root_uri": str(tmp_path / "cache"), "scheme": "nexus"}
+    )
+
+    assert all(task.succeeded for task in results.values())
+    # The results kept in memory are persisted by ewoks (nexus scheme)
+    assert len(list((tmp_path / "cache").glob("*.nx"))) == 2
+    assert results["angle"].output_values["results"] == fileSave
+    with h5py.File(fileSave, "r") as h5file:
+        assert_calibrated_angles(resultsToDict(h5file), angle_data_path)
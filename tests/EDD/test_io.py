@@ -0,0 +1,149 @@
+from pathlib import Path
+import h5py
+import numpy
+import pytest
+from easistrain.EDD.io import (
+    WritePolicy,
+    accumulatedSpectrum,
+    inMemoryFile,
+    resultsFile,
+    resultsToDict,
+    save_fit_data,
+)
+
+
+def test_write_policy(tmp_path: Path):
+    policy = WritePolicy.from_config(
+        {"curveDtype": "float32", "compression": "blosc-lz4"}
+    )
+    data = numpy.random.default_rng(0).poisson(100, (50, 2048)).astype(float)
+
+    with h5py.File(tmp_path / "output.h5", "w") as h5file:
+        curve = policy.create_dataset(h5file, "curve", data=data, curve=True)
+        params = policy.create_dataset(h5file, "params", dtype="float64", data=data)
+        small = policy.create_dataset(h5file, "small", data=data[0, :5])
+        empty = policy.create_dataset(h5file, "empty", (6,))
+        text = policy.create_dataset(
+            h5file, "text", dtype=h5py.string_dtype(encoding="utf-8"), data="PsV"
+        )
+
+        assert curve.dtype == numpy.float32
+        assert curve.chunks is not None
+        assert curve.id.get_create_plist().get_nfilters() > 0
+        assert numpy.array_equal(curve[()], data)
+        assert params.dtype == numpy.float64
+        assert numpy.array_equal(params[()], data)
+        assert params.id.get_storage_size() < data.nbytes / 2
+        assert small.chunks is None
+        assert empty.dtype == numpy.float32
+        assert text[()] == b"PsV"
+
+
+def test_write_policy_default(tmp_path: Path):
+    data = numpy.arange(40000, dtype=float).reshape(20, 2000)
+
+    with h5py.File(tmp_path / "output.h5", "w") as h5file:
+        dataset = WritePolicy().create_dataset(h5file, "data", data=data)
+        assert dataset.chunks is None
+        assert dataset.id.get_create_plist().get_nfilters() == 0
+        chunked = WritePolicy(chunks=True).create_dataset(h5file, "chunked", data=data)
+        assert chunked.chunks is not None
+        compressed = WritePolicy(compression="gzip").create_dataset(
+            h5file, "compressed", data=data
+        )
+        assert compressed.chunks is not None
+        assert compressed.id.get_create_plist().get_nfilters() == 1
+
+
+@pytest.mark.parametrize("compression", ["bitshuffle", "gzip", "lzf", None])
+def test_write_policy_compressions(tmp_path: Path, compression):
+    policy = WritePolicy(compression=compression, chunks=(10, 256))
+    data = numpy.arange(40000, dtype=float).reshape(20, 2000)
+
+    with h5py.File(tmp_path / "output.h5", "w") as h5file:
+        dataset = policy.create_dataset(h5file, "data", data=data)
+        assert dataset.chunks == (10, 256)
+        assert numpy.array_equal(dataset[()], data)
+
+
+def test_write_policy_unknown_compression():
+    with pytest.raises(ValueError):
+        WritePolicy(compression="zip")
+
+
+def test_write_policy_compression_without_chunks():
+    with pytest.raises(ValueError):
+        WritePolicy(compression="gzip", chunks=False)
+
+
+def test_save_fit_data(tmp_path: Path):
+    channels = numpy.arange(1000, dtype=float)
+    raw_data = numpy.random.default_rng(0).poisson(100, 1000).astype(float)
+
+    with h5py.File(tmp_path / "output.h5", "w") as h5file:
+        save_fit_data(
+            h5file,
+            "horizontal",
+            channels,
+            raw_data,
+            numpy.full(1000, 90.0),
+            numpy.full(1000, 100.0),
+            WritePolicy(curveDtype="float32"),
+        )
+        assert h5file["horizontal/raw_data"].dtype == numpy.float32
+        assert numpy.array_equal(h5file["horizontal/raw_data"][()], raw_data)
+
+
+def test_results_dict():
+    h5file = inMemoryFile()
+    save_fit_data(
+        h5file,
+        "horizontal",
+        numpy.arange(10, dtype=float),
+        numpy.ones(10),
+        numpy.ones(10),
+        numpy.ones(10),
+        WritePolicy(),
+    )
+    h5file["infos/sample"] = "sample"
+    h5file.create_dataset("infos/scanNumber", dtype="int", data=3)
+
+    results = resultsToDict(h5file)
+    h5file.close()
+
+    assert results["horizontal"]["@signal"] == "fitted_data"
+    assert results["infos"] == {"sample": "sample", "scanNumber": 3}
+    with resultsFile(results) as copy:
+        assert copy.driver == "core"
+        assert resultsToDict(copy)["infos"] == results["infos"]
+        assert copy["horizontal"].attrs["signal"] == "fitted_data"
+        assert numpy.array_equal(
+            copy["horizontal/channels"][()], results["horizontal"]["channels"]
+        )
+
+
+def test_accumulated_spectrum(tmp_path: Path):
+    frames = numpy.random.default_rng(0).poisson(10, (2, 25, 100))
+    dead_time = numpy.random.default_rng(1).uniform(0, 0.5, (2, 25))
+    with h5py.File(tmp_path / "raw.h5", "w") as h5file:
+        for scan in range(2):
+            h5file[f"scan_{scan}/det"] = frames[scan]
+            h5file[f"scan_{scan}/deadtime"] = dead_time[scan]
+
+        spectra = ["scan_0/det", "scan_1/det"]
+        assert numpy.array_equal(
+            accumulatedSpectrum(h5file, spectra, framesPerRead=7),
+            numpy.sum(frames, axis=(0, 1)),
+        )
+        assert numpy.allclose(
+            accumulatedSpectrum(h5file, spectra[:1], "average"),
+            numpy.mean(frames[0], axis=0),
+        )
+        assert numpy.allclose(
+            accumulatedSpectrum(
+                h5file, spectra, "average", ["scan_0/deadtime", "scan_1/deadtime"], 4
+            ),
+            numpy.sum(frames, axis=(0, 1)) / numpy.sum(1 - dead_time),
+        )
+        with pytest.raises(ValueError):
+            accumulatedSpectrum(h5file, spectra, "median")
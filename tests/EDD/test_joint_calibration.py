@@ -0,0 +1,128 @@
+from pathlib import Path
+import h5py
+import numpy
+import pytest
+from easistrain.EDD.angleCalibEDD import angleCalibrationEDD
+from easistrain.EDD.calibrants import CALIBRANTS_DIRECTORY
+from easistrain.EDD.calibrationEDD import calibEdd
+from easistrain.EDD.jointCalibEDD import jointCalibrationEDD
+from easistrain.EDD.utils import jointCalibrationFit
+
+DATA = Path(__file__).parent.parent.resolve() / "data"
+
+
+def test_joint_calibration_fit():
+    a, b, c, k = 3e-8, 0.075, 0.1, 70.0
+    source_energies = numpy.array([53.161, 79.623, 80.998, 276.398, 302.853])
+    source_channels = (-b + numpy.sqrt(b**2 - 4 * a * (c - source_energies))) / (
+        2 * a
+    )
+    d_spacings = numpy.array([2.49, 2.16, 1.53, 1.30, 1.25])
+    sample_channels = (-b + numpy.sqrt(b**2 - 4 * a * (c - k / d_spacings))) / (2 * a)
+
+    params, covariance = jointCalibrationFit(
+        source_channels,
+        source_energies,
+        sample_channels,
+        d_spacings,
+        numpy.full(5, 0.1),
+        numpy.full(5, 0.2),
+    )
+
+    assert numpy.allclose(params, [a, b, c, k], rtol=1e-6)
+    assert covariance.shape == (4, 4)
+    assert numpy.allclose(covariance, covariance.T)
+    with pytest.raises(ValueError):
+        jointCalibrationFit(source_channels[:2], source_energies[:2], [], [])
+
+
+def test_joint_calibration_edd(tmp_path: Path):
+    with h5py.File(DATA / "Ba_calibration_data.hdf5", "r") as source, h5py.File(
+        DATA / "TiC_angle_calib_data.hdf5", "r"
+    ) as calibrant, h5py.File(tmp_path / "input_file.h5", "w") as h5file:
+        for scan, data in ((1, source), (2, calibrant)):
+            h5file[f"sample_0000_{scan}.1/measurement/horz_detector"] = data[
+                "horizontal/data"
+            ][()]
+            h5file[f"sample_0000_{scan}.1/measurement/vert_detector"] = data[
+                "vertical/data"
+            ][()]
+        nb_peaks_in_boxes = source["infos/nbPeaksInBoxes"][()]
+        range_fit = source["infos/rangeFit"][()]
+        sample_nb_peaks_in_boxes = calibrant["infos/nbPeaksInBoxes"][()]
+        range_fit_h = calibrant["infos/rangeFitHD"][()]
+        range_fit_v = calibrant["infos/rangeFitVD"][()]
+    common = {
+        "fileRead": str(tmp_path / "input_file.h5"),
+        "sample": "sample",
+        "dataset": "0000",
+        "nameHorizontalDetector": "horz_detector",
+        "nameVerticalDetector": "vert_detector",
+    }
+    # Calibration in two steps
+    calibEdd(
+        **common,
+        fileSave=str(tmp_path / "two_steps.h5"),
+        scanNumberHorizontalDetector=1,
+        scanNumberVerticalDetector=1,
+        numberOfBoxes=len(nb_peaks_in_boxes),
+        nbPeaksInBoxes=nb_peaks_in_boxes,
+        rangeFit=range_fit,
+        sourceCalibrantFile=str(CALIBRANTS_DIRECTORY / "BaSource"),
+    )
+    angleCalibrationEDD(
+        **common,
+        fileSave=str(tmp_path / "two_steps.h5"),
+        scanNumber=2,
+        numberOfBoxes=len(sample_nb_peaks_in_boxes),
+        nbPeaksInBoxes=sample_nb_peaks_in_boxes,
+        rangeFitHD=range_fit_h,
+        rangeFitVD=range_fit_v,
+        pathFileDetectorCalibration=str(tmp_path / "two_steps.h5"),
+        scanDetectorCalibration="fit_0000_1_1",
+        sampleCalibrantFile=str(CALIBRANTS_DIRECTORY / "TiC.d"),
+    )
+
+    jointCalibrationEDD(
+        **common,
+        fileSave=str(tmp_path / "joint.h5"),
+        scanNumberHorizontalDetector=1,
+        scanNumberVerticalDetector=1,
+        scanNumber=2,
+        nbPeaksInBoxes=nb_peaks_in_boxes,
+        rangeFit=range_fit,
+        sampleNbPeaksInBoxes=sample_nb_peaks_in_boxes,
+        rangeFitHD=range_fit_h,
+        rangeFitVD=range_fit_v,
+        sourceCalibrantFile=str(CALIBRANTS_DIRECTORY / "BaSource"),
+        sampleCalibrantFile=str(CALIBRANTS_DIRECTORY / "TiC.d"),
+    )
+
+    with h5py.File(tmp_path / "two_steps.h5", "r") as two_steps, h5py.File(
+        tmp_path / "joint.h5", "r"
+    ) as joint:
+        coeffs = "detectorCalibration/fit_0000_1_1/calibCoeffs"
+        angles = "angleCalibration/fit_0000_2/calibratedAngle"
+        for detector in ("HD", "VD"):
+            two_steps_coeffs = two_steps[f"{coeffs}/calibCoeffs{detector}"][()]
+            two_steps_errors = two_steps[f"{coeffs}/uncertaintyCalibCoeffs{detector}"][
+                ()
+            ]
+            joint_coeffs = joint[f"{coeffs}/calibCoeffs{detector}"][()]
+            assert numpy.all(
+                numpy.abs(joint_coeffs - two_steps_coeffs) <= two_steps_errors
+            )
+            assert numpy.all(
+                joint[f"{coeffs}/uncertaintyCalibCoeffs{detector}"][()]
+                < two_steps_errors
+            )
+            assert joint[f"{coeffs}/jointCovariance{detector}"].shape == (4, 4)
+            assert joint[f"{angles}/calibratedAngle{detector}"][()] == pytest.approx(
+                two_steps[f"{angles}/calibratedAngle{detector}"][()], abs=5e-3
+            )
+        assert (
+            joint["angleCalibration/fit_0000_2/infos/pathDetectorCalibrationParams"][
+                ()
+            ].decode()
+            == f"{tmp_path / 'joint.h5'}/{coeffs}"
+        )
@@ -0,0 +1,41 @@
+import numpy
+from easistrain.EDD import EDD_Test_fund_method
+from easistrain.EDD.math import strains_in_meas_direction
+from easistrain.EDD.strainStressd0cstEDD import strain_in_meas_direction
+
+
+def generate_angles(nb_angles: int):
+    rng = numpy.random.default_rng(0)
+    angles = rng.uniform(-180, 180, (nb_angles, 5))
+    angles[:, 4] = rng.uniform(1, 10, nb_angles)  # 2*theta
+    return angles
+
+
+def test_strains_in_meas_direction():
+    angles = generate_angles(50)
+    tensors = numpy.random.default_rng(1).normal(0, 1e-3, (7, 6))
+
+    strains = strains_in_meas_direction(angles, tensors)
+
+    assert strains.shape == (7, 50)
+    for tensor, strain in zip(tensors, strains):
+        assert numpy.allclose(strain, strain_in_meas_direction(angles, *tensor))
+    # A hydrostatic strain is the same in all the directions
+    assert numpy.allclose(
+        strains_in_meas_direction(angles, [1e-3, 1e-3, 1e-3, 0, 0, 0]), 1e-3
+    )
+
+
+def test_fund_method():
+    angles = generate_angles(20)
+    fund_angles = angles[:, [0, 1, 2, 4, 3]]
+    fund_angles[:, 3] /= 2  # theta
+    tensor = [1e-3, -2e-3, 3e-4, 1e-4, -5e-4, 2e-4]
+
+    q1, q2, q3, strain = EDD_Test_fund_method.diffVector(fund_angles, *tensor)
+
+    assert numpy.allclose(q1**2 + q2**2 + q3**2, 1)
+    assert numpy.allclose(strain, strain_in_meas_direction(angles, *tensor))
+    assert numpy.allclose(
+        EDD_Test_fund_method.deforDirMeas(fund_angles, *tensor), strain
+    )
@@ -0,0 +1,72 @@
+import numpy
+from easistrain.EDD.measurementPlan import (
+    planAngles,
+    predictedStrainUncertainty,
+    selectOrientations,
+    simulatePlans,
+)
+from easistrain.EDD.strainStressd0cstEDD import strain_in_meas_direction
+
+DETECTOR_ANGLES = [[0, 5], [90, 5]]  # horizontal and vertical detectors
+
+
+def generate_orientations(nb_orientations: int):
+    rng = numpy.random.default_rng(0)
+    return rng.uniform([-180, -90, -10], [180, 90, 10], (nb_orientations, 3))
+
+
+def test_simulate_plans():
+    orientations = generate_orientations(12)
+    plans = numpy.stack(
+        (
+            planAngles(orientations, DETECTOR_ANGLES),
+            planAngles(numpy.tile(orientations[:1], (12, 1)), DETECTOR_ANGLES),
+        )
+    )
+    assert plans.shape == (2, 24, 5)
+
+    result = simulatePlans(plans, 1e-4)
+
+    assert numpy.isfinite(result["conditionNumber"][0])
+    assert numpy.isinf(result["conditionNumber"][1])  # one orientation only
+    assert numpy.all(numpy.isinf(result["tensorUncertainty"][1]))
+
+    # Same uncertainties as the scipy fit of noisy strains with the known uncertainty
+    angles = plans[0]
+    rng = numpy.random.default_rng(1)
+    tensor = [1e-3, -5e-4, 2e-4, 1e-4, 0, -3e-4]
+    fits = []
+    for _ in range(200):
+        strain = strain_in_meas_direction(angles, *tensor)
+        strain += rng.normal(0, 1e-4, strain.shape)
+        design = numpy.column_stack(
+            [strain_in_meas_direction(angles, *e) for e in numpy.eye(6)]
+        )
+        fits.append(numpy.linalg.lstsq(design, strain, rcond=None)[0])
+    assert numpy.allclose(
+        numpy.std(fits, axis=0), result["tensorUncertainty"][0], rtol=0.2
+    )
+
+
+def test_predicted_strain_uncertainty():
+    uStrain = predictedStrainUncertainty(2000, (1e-6, 0.03, 0.1), (0, 0, 0), 0.1, 60, 0)
+    energy = 1e-6 * 2000**2 + 0.03 * 2000 + 0.1
+    assert numpy.isclose(uStrain, 0.1 * (2e-6 * 2000 + 0.03) / energy)
+
+
+def test_select_orientations():
+    orientations = generate_orientations(40)
+
+    selected = selectOrientations(orientations, DETECTOR_ANGLES, 1e-4, 8, [3])
+
+    assert len(selected) == 8
+    assert selected[0] == 3
+    assert len(set(selected)) == 8
+    plans = numpy.stack(
+        (
+            planAngles(orientations[selected], DETECTOR_ANGLES),
+            planAngles(orientations[:8], DETECTOR_ANGLES),
+        )
+    )
+    uncertainty = simulatePlans(plans, 1e-4)["tensorUncertainty"]
+    assert numpy.sum(uncertainty[0] ** 2) < numpy.sum(uncertainty[1] ** 2)
@@ -1,6 +1,7 @@
 from pathlib import Path
 import h5py
 import numpy
+from easistrain.EDD.calibrationStore import timestamp
 from easistrain.EDD.preStraind0cstEDD import preStraind0cstEDD
 from .utils import generate_angle_calib_file, generate_detector_calib_file
 
@@ -89,3 +90,125 @@ def test_preStrain(tmp_path: Path):
             ref_errors = h5file[f"peak_{i}/ref_{point_name}/errors"][()]
 
         assert numpy.all(numpy.abs(point_data - ref_data) <= numpy.abs(ref_errors))
+
+
+def add_later_calibrations(config: dict):
+    for filename, kind in (
+        (config["pathFileDetectorCalibration"], "detectorCalibration"),
+        (config["pathFileAngleCalibration"], "angleCalibration"),
+    ):
+        with h5py.File(filename, "a") as h5file:
+            h5file[f"{kind}/scan/infos/startTime"] = "2022-03-01T08:00:00"
+            # A later calibration which must not be used
+            h5file.copy(h5file[f"{kind}/scan"], f"{kind}/later")
+            h5file[f"{kind}/later/infos/startTime"][()] = "2022-03-03T08:00:00"
+            for name, values in h5file[f"{kind}/later"].items():
+                if name != "infos":
+                    for dataset in values.values():
+                        dataset[()] = 2 * dataset[()]
+    config.update(scanDetectorCalibration=None, scanAngleCalibration=None)
+
+
+def test_preStrain_nearest_calibration(tmp_path: Path):
+    data_folder = Path(__file__).parent.parent.resolve() / "data"
+    test_data_path = data_folder / "BAIII_pre_strain.hdf5"
+    config = generate_input_files(
+        tmp_path,
+        test_data_path,
+        data_folder / "BAIII_regroup_points.hdf5",
+        data_folder / "Ba_calibration_data.hdf5",
+        data_folder / "TiC_angle_calib_data.hdf5",
+    )
+    add_later_calibrations(config)
+
+    preStraind0cstEDD(**config, measurementTime="2022-03-01T20:00:00")
+
+    for i in range(config["numberOfPeaks"]):
+        with h5py.File(config["fileSave"], "r") as h5file:
+            point_data = h5file[f"STRAIN_with_d0/peak_{str(i).zfill(4)}/point_00000"][
+                ()
+            ]
+        with h5py.File(test_data_path, "r") as h5file:
+            ref_data = h5file[f"peak_{i}/ref_point_00000/value"][()]
+            ref_errors = h5file[f"peak_{i}/ref_point_00000/errors"][()]
+        assert numpy.all(numpy.abs(point_data - ref_data) <= numpy.abs(ref_errors))
+
+
+def test_preStrain_calibration_of_source_scan(tmp_path: Path):
+    data_folder = Path(__file__).parent.parent.resolve() / "data"
+    test_data_path = data_folder / "BAIII_pre_strain.hdf5"
+    config = generate_input_files(
+        tmp_path,
+        test_data_path,
+        data_folder / "BAIII_regroup_points.hdf5",
+        data_folder / "Ba_calibration_data.hdf5",
+        data_folder / "TiC_angle_calib_data.hdf5",
+    )
+    add_later_calibrations(config)
+    with h5py.File(config["fileRead"], "a") as h5file:
+        for i in range(config["numberOfPeaks"]):
+            peak_grp = h5file[f"pointsPerPeak_{str(i).zfill(4)}"]
+            source_scan = numpy.full((len(peak_grp["point_00000"]), 2), numpy.nan)
+            source_scan[:, 1] = timestamp("2022-03-01T20:00:00")
+            # The last measurement is from a scan just after the later calibration
+            source_scan[-1, 1] = timestamp("2022-03-03T09:00:00")
+            peak_grp["sourceScanPoint_00000"] = source_scan
+
+    preStraind0cstEDD(**config)
+
+    for i in range(config["numberOfPeaks"]):
+        with h5py.File(config["fileSave"], "r") as h5file:
+            point_data = h5file[f"STRAIN_with_d0/peak_{str(i).zfill(4)}/point_00000"][
+                ()
+            ]
+            names = h5file[
+                f"infos/pointCalibrations/peak_{str(i).zfill(4)}/point_00000"
+            ].asstr()[()]
+            assert h5file["infos/detectorCalibration"].asstr()[()].tolist() == [
+                "later",
+                "scan",
+            ]
+        with h5py.File(test_data_path, "r") as h5file:
+            ref_data = h5file[f"peak_{i}/ref_point_00000/value"][()]
+            ref_errors = h5file[f"peak_{i}/ref_point_00000/errors"][()]
+        assert numpy.all(
+            numpy.abs(point_data[:-1] - ref_data[:-1]) <= numpy.abs(ref_errors[:-1])
+        )
+        assert names[:-1].tolist() == [["scan", "scan"]] * (len(names) - 1)
+        assert names[-1].tolist() == ["later", "later"]
+
+
+def test_preStrain_calibration_of_source_scan_without_times(tmp_path: Path):
+    data_folder = Path(__file__).parent.parent.resolve() / "data"
+    config = generate_input_files(
+        tmp_path,
+        data_folder / "BAIII_pre_strain.hdf5",
+        data_folder / "BAIII_regroup_points.hdf5",
+        data_folder / "Ba_calibration_data.hdf5",
+        data_folder / "TiC_angle_calib_data.hdf5",
+    )
+    add_later_calibrations(config)
+    for filename, kind in (
+        (config["pathFileDetectorCalibration"], "detectorCalibration"),
+        (config["pathFileAngleCalibration"], "angleCalibration"),
+    ):
+        # Calibrations saved before the start time was recorded
+        with h5py.File(filename, "a") as h5file:
+            for name, scan in (("scan", 10), ("later", 50)):
+                del h5file[f"{kind}/{name}/infos/startTime"]
+                h5file[f"{kind}/{name}/infos/scanNumber"] = scan
+    with h5py.File(config["fileRead"], "a") as h5file:
+        for i in range(config["numberOfPeaks"]):
+            peak_grp = h5file[f"pointsPerPeak_{str(i).zfill(4)}"]
+            source_scan = numpy.empty((len(peak_grp["point_00000"]), 2))
+            source_scan[:, 0] = 12
+            source_scan[-1, 0] = 60
+            source_scan[:, 1] = timestamp("2022-03-01T20:00:00")
+            peak_grp["sourceScanPoint_00000"] = source_scan
+
+    preStraind0cstEDD(**config)
+
+    with h5py.File(config["fileSave"], "r") as h5file:
+        names = h5file["infos/pointCalibrations/peak_0000/point_00000"].asstr()[()]
+    assert names[:-1].tolist() == [["scan", "scan"]] * (len(names) - 1)
+    assert names[-1].tolist() == ["later", "later"]
@@ -69,3 +69,34 @@ def test_regroupPoints(tmp_path: Path):
             ref_errors = h5file[f"peak_{i}/ref_{point_name}/errors"][()]
 
         assert numpy.all(numpy.abs(point_data - ref_data) <= numpy.abs(ref_errors))
+
+
+def test_regroupPoints_source_scan(tmp_path: Path):
+    data_folder = Path(__file__).parent.parent.resolve() / "data"
+    config = generate_input_files(
+        tmp_path,
+        data_folder / "BAIII_regroup_points.hdf5",
+        data_folder / "BAIII_coord_transform.hdf5",
+    )
+    # The scans of the first orientation are known, not the ones of the second
+    with h5py.File(config["fileRead"][0], "a") as h5file:
+        n_rows = len(h5file["global/inSample_peak_0000"])
+        h5file["global/sourceScan"] = numpy.column_stack(
+            (numpy.arange(n_rows), numpy.full(n_rows, numpy.nan))
+        )
+
+    regroupPoints(**config)
+
+    with h5py.File(config["fileSave"], "r") as h5file:
+        for i in range(config["numberOfPeaks"]):
+            peak_grp = h5file[f"pointsPerPeak_{str(i).zfill(4)}"]
+            points = [name for name in peak_grp if name.startswith("point_")]
+            for point in points:
+                source_scan = peak_grp[f"sourceScan{point.capitalize()}"][()]
+                assert source_scan.shape == (len(peak_grp[point]), 2)
+                scans = source_scan[:, 0]
+                assert numpy.all(scans[numpy.isfinite(scans)] < n_rows)
+            scans = numpy.concatenate(
+                [peak_grp[f"sourceScan{point.capitalize()}"][:, 0] for point in points]
+            )
+            assert sorted(scans[numpy.isfinite(scans)]) == list(range(n_rows))
@@ -0,0 +1,21 @@
+import numpy
+from easistrain.func_CS_align import azim, tth, tthazim
+
+
+def test_tthazim():
+    coords = numpy.random.default_rng(0).normal(size=(50, 3))
+    rotations = (0.01, -0.02, 0.03)
+
+    theta, azimuth = tthazim(coords, *rotations)
+
+    assert theta.shape == azimuth.shape == (50,)
+    for point, point_theta, point_azimuth in zip(coords, theta, azimuth):
+        assert numpy.isclose(tth(*point, *rotations), point_theta)
+        assert numpy.isclose(azim(*point, *rotations), point_azimuth)
+
+
+def test_tthazim_without_rotation():
+    theta, azimuth = tthazim([[1, 1, 0], [1, 0, 1]], 0, 0, 0)
+
+    assert numpy.allclose(theta, numpy.pi / 8)
+    assert numpy.allclose(azimuth, [0, numpy.pi / 2])
@@ -0,0 +1,108 @@
+import numpy
+import pytest
+from easistrain.func_conicalslit import lengthgv, slitradius
+from easistrain.func_CS_design import (
+    BCC_HKL,
+    energy_windows,
+    optimize_slit_design,
+    phase,
+    slit_design,
+)
+from easistrain.func_tthdspacing import cubicdspacing, hexdspacing
+
+
+def test_slit_design():
+    energy = numpy.linspace(50, 150, 100)
+    lss = [50000, 75000, 100000]
+    slitopening = [10, 25]
+    phases = [
+        phase("Fe", 0.0002855, BCC_HKL),
+        phase("Ti", 0.000295, [(1, 0, 0), (1, 0, 1)], "hexagonal", c=0.000468),
+    ]
+
+    design = slit_design(phases, energy, lss, 1000000, slitopening, 50, 200)
+
+    assert design["reflections"][:2] == ["Fe(110)", "Fe(200)"]
+    assert design["reflections"][-1] == "Ti(101)"
+    assert design["radius"].shape == (10, 3, 100)
+    assert design["gauge_volume"].shape == (10, 3, 2, 100)
+    _, theta = cubicdspacing(energy, 0.0002855, 2, 1, 1)
+    for i, distance in enumerate(lss):
+        assert numpy.allclose(
+            design["radius"][2, i], slitradius(0.0002855, distance, theta)
+        )
+        for j, opening in enumerate(slitopening):
+            assert numpy.allclose(
+                design["gauge_volume"][2, i, j],
+                lengthgv(theta, distance, 1000000, opening, 50, 200),
+            )
+    d, theta = hexdspacing(energy, 0.000295, 0.000468, 1, 0, 1)
+    assert design["d"][-1] == pytest.approx(d)
+    assert numpy.allclose(design["theta"][-1], theta)
+
+
+def test_phase():
+    with pytest.raises(ValueError):
+        phase("Ti", 0.000295, [(1, 0, 0)], "hexagonal")
+    with pytest.raises(ValueError):
+        phase("Ti", 0.000295, [(1, 0, 0)], "tetragonal")
+
+
+def test_energy_windows():
+    windows = energy_windows(50, 70, 10, 10)
+    assert windows.tolist() == [[50, 60], [50, 70], [60, 70]]
+
+
+def test_optimize_slit_design():
+    phases = [phase("Fe", 0.0002855, BCC_HKL[:3])]
+    lss = [40000, 70000, 100000]
+    slitopening = [10, 25, 40]
+    windows = energy_windows(60, 120, 20, 20)
+
+    table = optimize_slit_design(
+        phases, 300, lss, slitopening, windows, 1000000, 50, 200, npoints=61
+    )
+    parallel_table = optimize_slit_design(
+        phases,
+        300,
+        lss,
+        slitopening,
+        windows,
+        1000000,
+        50,
+        200,
+        npoints=61,
+        max_workers=2,
+    )
+
+    assert numpy.array_equal(table, parallel_table)
+    assert len(table) == 10
+    assert numpy.all(numpy.diff(table["rms_deviation"]) >= 0)
+    # Brute force evaluation of the best design
+    energy = numpy.linspace(60, 120, 61)
+    costs = []
+    for distance in lss:
+        for opening in slitopening:
+            for emin, emax in windows:
+                in_window = (energy >= emin) & (energy <= emax)
+                lengths = [
+                    lengthgv(
+                        cubicdspacing(energy[in_window], 0.0002855, *hkl)[1],
+                        distance,
+                        1000000,
+                        opening,
+                        50,
+                        200,
+                    )
+                    for hkl in BCC_HKL[:3]
+                ]
+                cost = numpy.sqrt(numpy.mean(((numpy.array(lengths) - 300) / 300) ** 2))
+                costs.append((cost, distance, opening, emin, emax))
+    best = min(costs)
+    assert table["rms_deviation"][0] == pytest.approx(best[0])
+    assert (
+        table["lss"][0],
+        table["slitopening"][0],
+        table["emin"][0],
+        table["emax"][0],
+    ) == best[1:]
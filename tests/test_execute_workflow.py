@@ -0,0 +1,200 @@
+import json
+import os
+import h5py
+from concurrent.futures import ThreadPoolExecutor
+from ewokscore import Task
+from easistrain.execute_workflow import execute_graph1, execute_graph2, execute_scans
+
+
+class ScanTask(Task, input_names=["numScan"], output_names=["result"]):
+    def run(self):
+        first, last = self.inputs.numScan
+        if first == 3:
+            raise ValueError("bad scan")
+        self.outputs.result = first * 10
+
+
+class CountTask(
+    Task,
+    input_names=["root_data", "h5file"],
+    optional_input_names=[
+        "scan",
+        "numScan",
+        "detector_name",
+        "poni_file",
+        "raw_data_stat",
+        "input_files_stat",
+        "results_file",
+    ],
+    output_names=["result"],
+):
+    def run(self):
+        with open(os.path.join(self.inputs.root_data, "runs.txt"), "a") as f:
+            f.write(f"{self.inputs.h5file} {self.inputs.numScan}\n")
+        results_file = self.inputs.results_file
+        if results_file is self.MISSING_DATA:
+            results_file = os.path.join(
+                self.inputs.root_data, "Results_" + self.inputs.h5file
+            )
+        first, last = self.inputs.numScan
+        with h5py.File(results_file, "a") as h5file:
+            for numscan in range(first, last + 1):
+                h5file.require_group(f"{self.inputs.scan}{numscan}.1")
+        self.outputs.result = self.inputs.h5file
+
+
+class WriteTask(Task, input_names=["numScan", "results_file"], output_names=["result"]):
+    def run(self):
+        first, last = self.inputs.numScan
+        with h5py.File(self.inputs.results_file, "a") as h5file:
+            h5file[f"scan_{first}/value"] = first
+        if first == 3:
+            raise ValueError("bad scan")
+        self.outputs.result = self.inputs.results_file
+
+
+def scan_workflow(task="ScanTask"):
+    return {
+        "nodes": [
+            {
+                "id": "Integrate2D",
+                "task_type": "class",
+                "task_identifier": f"tests.test_execute_workflow.{task}",
+            }
+        ],
+        "links": [],
+    }
+
+
+def test_execute_scans():
+    results, failures = execute_scans(
+        scan_workflow(),
+        {"numScan": [1, 4]},
+        executor=ThreadPoolExecutor(max_workers=2),
+    )
+
+    assert sorted(results) == [1, 2, 4]
+    assert results[2]["Integrate2D"]["result"] == 20
+    assert list(failures) == [3]
+
+
+def test_execute_scans_results_file(tmp_path):
+    results_file = str(tmp_path / "Results_raw.h5")
+    with h5py.File(results_file, "w") as h5file:
+        h5file["scan_2/value"] = -1  # replaced by the new results of the scan
+
+    results, failures = execute_scans(
+        scan_workflow("WriteTask"),
+        {"numScan": [1, 4]},
+        max_workers=2,
+        results_file=results_file,
+    )
+
+    assert sorted(results) == [1, 2, 4]
+    assert list(failures) == [3]
+    # Each scan wrote its own file, merged in the results file
+    assert results[2]["Integrate2D"]["result"] == str(tmp_path / "Results_raw_scan2.h5")
+    with h5py.File(results_file, "r") as h5file:
+        assert {name: h5file[name]["value"][()] for name in h5file} == {
+            "scan_1": 1,
+            "scan_2": 2,
+            "scan_4": 4,
+        }
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["Results_raw.h5"]
+
+
+def test_execute_graph2(tmp_path):
+    workflow_filename = str(tmp_path / "workflow.json")
+    param_filename = str(tmp_path / "parameters.json")
+    with open(workflow_filename, "w") as f:
+        json.dump(scan_workflow(), f)
+    with open(param_filename, "w") as f:
+        json.dump(
+            {"root_data": str(tmp_path), "h5file": "raw.h5", "numScan": [4, 5]}, f
+        )
+
+    results, failures = execute_graph2(workflow_filename, param_filename, max_workers=2)
+
+    assert {
+        scan: tasks["Integrate2D"]["result"] for scan, tasks in results.items()
+    } == {
+        4: 40,
+        5: 50,
+    }
+    assert not failures
+    assert (tmp_path / "exe_integration.log").exists()
+
+
+def cache_test_files(tmp_path, parameters):
+    workflow_filename = str(tmp_path / "workflow.json")
+    param_filename = str(tmp_path / "parameters.json")
+    with open(workflow_filename, "w") as f:
+        json.dump(scan_workflow("CountTask"), f)
+    with open(param_filename, "w") as f:
+        json.dump(
+            {
+                "root_data": str(tmp_path),
+                "h5file": "raw.h5",
+                "scan": "sample_",
+                "detector_name": "det",
+                "poni_file": str(tmp_path / "geometry.poni"),
+                **parameters,
+            },
+            f,
+        )
+    with h5py.File(tmp_path / "raw.h5", "w") as h5file:
+        for numscan in range(1, 4):
+            h5file[f"sample_{numscan}.1/measurement/det"] = [numscan]
+    (tmp_path / "geometry.poni").write_text("Distance: 0.1")
+    return workflow_filename, param_filename
+
+
+def runs(tmp_path):
+    return (tmp_path / "runs.txt").read_text().splitlines()
+
+
+def test_execute_graph1_cache(tmp_path):
+    workflow_filename, param_filename = cache_test_files(tmp_path, {"numScan": [1, 1]})
+    cache_dir = str(tmp_path / "cache")
+
+    for _ in range(2):
+        execute_graph1(workflow_filename, param_filename, cache_dir=cache_dir)
+    assert runs(tmp_path) == ["raw.h5 [1, 1]"]
+
+    with h5py.File(tmp_path / "raw.h5", "a") as h5file:
+        h5file["sample_1.1/measurement/det"][0] = -1
+    execute_graph1(workflow_filename, param_filename, cache_dir=cache_dir)
+    assert len(runs(tmp_path)) == 2
+
+    (tmp_path / "geometry.poni").write_text("Distance: 0.2")
+    execute_graph1(workflow_filename, param_filename, cache_dir=cache_dir)
+    assert len(runs(tmp_path)) == 3
+
+    # The results were removed: the cached outputs are not used
+    os.remove(tmp_path / "Results_raw.h5")
+    execute_graph1(workflow_filename, param_filename, cache_dir=cache_dir)
+    assert len(runs(tmp_path)) == 4
+    assert (tmp_path / "Results_raw.h5").exists()
+    execute_graph1(workflow_filename, param_filename, cache_dir=cache_dir)
+    assert len(runs(tmp_path)) == 4
+
+
+def test_execute_graph2_cache(tmp_path):
+    workflow_filename, param_filename = cache_test_files(tmp_path, {"numScan": [1, 3]})
+    cache_dir = str(tmp_path / "cache")
+
+    execute_graph2(
+        workflow_filename, param_filename, max_workers=2, cache_dir=cache_dir
+    )
+    assert len(runs(tmp_path)) == 3
+
+    # Only the scan whose results were removed runs again
+    with h5py.File(tmp_path / "Results_raw.h5", "a") as h5file:
+        del h5file["sample_1.1"]
+    execute_graph2(
+        workflow_filename, param_filename, max_workers=2, cache_dir=cache_dir
+    )
+    assert runs(tmp_path)[-1] == "raw.h5 [1, 2]"
+    assert len(runs(tmp_path)) == 4
+    with h5py.File(tmp_path / "Results_raw.h5", "r") as h5file:
+        assert "sample_1.1" in h5file
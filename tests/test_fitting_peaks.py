@@ -0,0 +1,212 @@
+from pathlib import Path
+import h5py
+import numpy
+import pytest
+import scipy.optimize
+from easistrain import func_fitting_functions
+from easistrain.func_fitting_batch import fit_sectors, fitting_functions
+from easistrain.func_fitting_peaks import clean_fit, clean_mask, fit, fit_and_clean
+from easistrain.task_fitting_peaks import Fit
+
+
+def generate_sectors(nb_sectors: int):
+    rng = numpy.random.default_rng(0)
+    tth = numpy.linspace(9, 11, 200)
+    position = 10 + 0.05 * numpy.sin(numpy.linspace(0, numpy.pi, nb_sectors))
+    data = numpy.empty((tth.size, nb_sectors))
+    for i in range(nb_sectors):
+        P = [1000 + 50 * i, position[i], 0.2, 0.4]
+        data[:, i] = fitting_functions["PsV"](P, tth) + 20 + 3 * tth
+    data += rng.normal(0, 1, data.shape)
+    return tth, data, position
+
+
+@pytest.mark.parametrize("fct", ["PsV", "gauss", "Lorentz", "PVII"])
+def test_fit_sectors(fct):
+    tth, data, position = generate_sectors(12)
+
+    coef_bgd, data_bgd_subs, R1, success, data_fitted = fit_sectors(
+        tth, data, 20, 20, fct
+    )
+
+    assert numpy.all(success == 1)
+    assert numpy.allclose(R1[:, 1], position, atol=2e-3)
+    for i in range(data.shape[1]):
+        # Same result as one scipy least squares fit per sector
+        x_bgd = numpy.append(tth[0:20], tth[tth.size - 20 : -1])
+        y_bgd = numpy.append(data[0:20, i], data[tth.size - 20 : -1, i])
+        b_a = numpy.polyfit(x_bgd, y_bgd, 1)[::-1]
+        assert numpy.allclose(coef_bgd[i], b_a)
+        R1_ref, _ = scipy.optimize.leastsq(
+            lambda P: fitting_functions[fct](P, tth) - data_bgd_subs[:, i],
+            numpy.array([R1[i, 0], R1[i, 1], 0.2, 0.5]),
+            maxfev=10000,
+        )
+        assert numpy.allclose(R1[i], R1_ref, rtol=1e-4, atol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "name,P",
+    [
+        ("PearsonVII", [100, 10.1, 0.2, 1.7]),
+        ("Gauss", [100, 10.1, 0.2, 0.4]),
+        ("Lorentz", [100, 10.1, 0.2, 0.4]),
+        ("pseudo_voigt", [100, 10.1, 0.2, 0.4]),
+        ("split_pseudo_voigt", [100, 10.1, 0.2, 0.3, 0.4]),
+    ],
+)
+def test_jacobians(name, P):
+    func = getattr(func_fitting_functions, "func_" + name)
+    jac = getattr(func_fitting_functions, "jac_" + name)
+    tth = numpy.linspace(9, 11, 300)
+    P = numpy.array(P, dtype=float)
+
+    J = jac(P, tth)
+
+    assert J.shape == (P.size, tth.size)
+    for i in range(P.size):
+        dP = numpy.zeros_like(P)
+        dP[i] = 1e-6
+        derivative = (func(P + dP, tth) - func(P - dP, tth)) / 2e-6
+        assert numpy.allclose(J[i], derivative, rtol=1e-5, atol=1e-3)
+
+
+def generate_integration_file(filename: Path, nb_sectors: int):
+    tth, data, position = generate_sectors(nb_sectors)
+    chi = numpy.linspace(-180, 180, nb_sectors, endpoint=False)
+    with h5py.File(filename, "w") as h5file:
+        integration = h5file.create_group("sample_1.1/raw_integration_2D")
+        integration.create_group("Integration_parameter")
+        for name in ("image_00000", "image_00001"):
+            integration[name + "/tth"] = tth
+            integration[name + "/chi"] = chi
+            integration[name + "/tth_vs_cts"] = numpy.column_stack((tth, data))
+    return position, chi
+
+
+def test_fit(tmp_path: Path):
+    position, chi = generate_integration_file(tmp_path / "Results_raw.h5", 8)
+
+    fit(str(tmp_path), "raw.h5", "all", 9.2, 10.8, 10, 10, "PsV", "111", 20)
+
+    with h5py.File(tmp_path / "Results_raw.h5", "r") as h5file:
+        fitting = h5file["sample_1.1/fitting_HKL=(111)"]
+        assert list(fitting) == ["image_00000", "image_00001"]
+        fit_matrix = fitting["image_00001/fit"][()]
+        assert fit_matrix.shape == (8, 10)
+        assert numpy.allclose(fit_matrix[:, 3], position, atol=2e-3)
+        assert numpy.allclose(fit_matrix[:, 8], chi)
+        assert numpy.all(fit_matrix[:, 7] < 5)
+        nb_points = fitting["image_00001/tth_range"].shape[0]
+        assert fitting["image_00001/data_fitted"].shape == (nb_points, 9)
+
+
+def test_fit_task(tmp_path: Path):
+    generate_integration_file(tmp_path / "Results_raw.h5", 8)
+
+    task = Fit(
+        inputs={
+            "root_data": str(tmp_path),
+            "h5file": "raw.h5",
+            "scan": "all",
+            "tth_min": 9.2,
+            "tth_max": 10.8,
+            "bgd_left": 10,
+            "bgd_right": 10,
+            "fct": "PsV",
+            "hkl": "111",
+            "Rp": 20,
+        }
+    )
+    task.execute()
+
+    assert task.succeeded
+    with h5py.File(tmp_path / "Results_raw.h5", "r") as h5file:
+        assert list(h5file["sample_1.1/fitting_HKL=(111)"]) == [
+            "image_00000",
+            "image_00001",
+        ]
+
+
+def test_clean_mask():
+    fit_matrix = numpy.tile([10, 0, 1000, 10, 0.2, 0.5, 1, 5, 0, 1], (6, 1))
+    fit_matrix[1, 2] = -5  # negative intensity
+    fit_matrix[2, 5] = 1.5  # shape factor out of bounds
+    fit_matrix[3, 7] = 50  # Rp above the threshold
+    fit_matrix[4, 2] = 5  # peak in the background noise
+
+    assert clean_mask(fit_matrix, "PsV", 20).tolist() == [0, 1, 1, 1, 1, 0]
+    assert clean_mask(fit_matrix, "PVII", 20).tolist() == [0, 1, 0, 1, 1, 0]
+    assert clean_mask(
+        fit_matrix,
+        "PsV",
+        20,
+        criteria=[lambda fit_matrix, fct, Rp: fit_matrix[:, 8] >= 0],
+    ).all()
+
+
+def test_clean_fit(tmp_path: Path):
+    fit_matrix = numpy.tile([10, 0, 1000, 10, 0.2, 0.5, 1, 5, 0, 1], (4, 1))
+    fit_matrix[:, 8] = [0, 90, 180, 270]
+    fit_matrix[1, 7] = 50
+    with h5py.File(tmp_path / "Results_raw.h5", "w") as h5file:
+        img_fit = h5file.create_group("sample_1.1/fitting_HKL=(111)/image_00000")
+        img_fit["fit"] = fit_matrix
+        img_fit["tth_position"] = fit_matrix[:, 3]
+        img_fit["chi"] = fit_matrix[:, 8]
+
+    clean_fit(
+        str(tmp_path),
+        "raw.h5",
+        "sample_1.1",
+        9,
+        11,
+        10,
+        10,
+        "PsV",
+        "111",
+        20,
+        criteria=[lambda fit_matrix, fct, Rp: fit_matrix[:, 8] == 270],
+    )
+
+    with h5py.File(tmp_path / "Results_raw.h5", "r") as h5file:
+        cleaned = h5file["sample_1.1/fitting_HKL=(111)_cleaned/image_00000"]
+        assert cleaned["chi_cleaned"][()].tolist() == [0, 180]
+        assert cleaned["fit_cleaned"].shape == (2, 10)
+        assert cleaned["tth_position_cleaned"].shape == (2,)
+
+
+def test_fit_and_clean(tmp_path: Path):
+    generate_integration_file(tmp_path / "Results_fused.h5", 8)
+    generate_integration_file(tmp_path / "Results_separate.h5", 8)
+    criteria = [lambda fit_matrix, fct, Rp: fit_matrix[:, 8] < 0]
+
+    fit_and_clean(
+        str(tmp_path), "fused.h5", "all", 9.2, 10.8, 10, 10, "PsV", "111", 20, criteria
+    )
+    fit(str(tmp_path), "separate.h5", "all", 9.2, 10.8, 10, 10, "PsV", "111", 20)
+    clean_fit(
+        str(tmp_path),
+        "separate.h5",
+        "all",
+        9.2,
+        10.8,
+        10,
+        10,
+        "PsV",
+        "111",
+        20,
+        criteria,
+    )
+
+    with h5py.File(tmp_path / "Results_fused.h5", "r") as fused, h5py.File(
+        tmp_path / "Results_separate.h5", "r"
+    ) as separate:
+        cleaned = "sample_1.1/fitting_HKL=(111)_cleaned"
+        assert list(fused[cleaned]) == list(separate[cleaned])
+        for name in ("fit_cleaned", "tth_position_cleaned", "chi_cleaned"):
+            fused_data = fused[f"{cleaned}/image_00001/{name}"][()]
+            assert numpy.array_equal(
+                fused_data, separate[f"{cleaned}/image_00001/{name}"][()]
+            )
+        assert fused[f"{cleaned}/image_00001/chi_cleaned"].shape == (4,)
@@ -0,0 +1,158 @@
+from pathlib import Path
+import fabio
+import h5py
+import numpy
+import pytest
+from fabio.edfimage import edfimage
+from easistrain.func_generate_mask import (
+    DEAD_PIXEL,
+    HOT_PIXEL,
+    INTERMITTENT_PIXEL,
+    build_mask,
+    generate_mask,
+    mask,
+    scan_statistical_mask,
+    stack_statistics,
+    statistical_mask,
+)
+from easistrain.func_integration_2D import integration_2D_follow
+from .test_integration_2D import generate_input_files
+
+
+def test_mask(tmp_path: Path):
+    image = numpy.random.default_rng(0).uniform(0, 100, (50, 40))
+    edfimage(data=image).write(str(tmp_path / "image.edf"))
+
+    mask_matrix = mask(str(tmp_path), "image", "10", "90", str(tmp_path), "mask", "edf")
+
+    expected = (image < 10) | (image > 90)
+    assert numpy.array_equal(mask_matrix != 0, expected)
+    assert numpy.array_equal(fabio.open(str(tmp_path / "mask.edf")).data, mask_matrix)
+
+
+def test_build_mask(tmp_path: Path):
+    stack = numpy.random.default_rng(0).poisson(10, (25, 20, 30)).astype(float)
+    stack[:, 1, 2] = 0  # dead pixel
+    stack[:, 3, 4] = 1000  # hot pixel
+    image = stack[0].copy()
+    image[5, 6] = -1
+    existing_mask = numpy.zeros((20, 30), numpy.uint8)
+    existing_mask[7, 8] = 1
+    edfimage(data=existing_mask).write(str(tmp_path / "existing.edf"))
+
+    mask_matrix = build_mask(
+        image_matrix=image,
+        int_min=0,
+        stack=stack,
+        masks=[str(tmp_path / "existing.edf")],
+    )
+
+    assert mask_matrix.dtype == numpy.uint8
+    assert sorted(zip(*numpy.nonzero(mask_matrix))) == [(1, 2), (3, 4), (5, 6), (7, 8)]
+
+
+def test_build_mask_dark_stack():
+    stack = numpy.zeros((5, 20, 30))
+    stack[:, 3, 4] = 1000  # the only pixel which is not dead
+
+    with numpy.errstate(all="raise"):
+        mask_matrix = build_mask(stack=stack)
+
+    assert sorted(zip(*numpy.nonzero(mask_matrix == 0))) == [(3, 4)]
+
+
+def test_statistical_mask_all_dead():
+    with numpy.errstate(all="raise"):
+        mask_matrix = statistical_mask(numpy.zeros((5, 20, 30)))
+
+    assert numpy.all(mask_matrix == DEAD_PIXEL)
+
+
+def test_build_mask_without_source():
+    with pytest.raises(ValueError):
+        build_mask()
+
+
+def test_generate_mask_for_integration(tmp_path: Path):
+    generate_input_files(tmp_path, 2)
+    with h5py.File(tmp_path / "raw.h5", "r") as h5file:
+        stack = h5file["sample_1.1/measurement/det"]
+        mask_matrix = generate_mask(str(tmp_path), "mask", "edf", stack=stack)
+
+    nb_images = integration_2D_follow(
+        str(tmp_path),
+        "raw.h5",
+        "sample_1.1",
+        "det",
+        str(tmp_path / "geometry.poni"),
+        50,
+        8,
+        "2th_deg",
+        im_mask=mask_matrix,
+        timeout=0,
+    )
+
+    assert nb_images == 2
+    assert (tmp_path / "mask.edf").exists()
+
+
+def test_scan_statistical_mask(tmp_path: Path):
+    stack = numpy.random.default_rng(0).poisson(100, (40, 30, 20))
+    stack[:, 1, 2] = 0  # dead pixel
+    stack[:, 3, 4] += 500  # hot pixel
+    stack[::3, 5, 6] += 1000  # intermittent pixel
+    stack[7, 8, 9] += 1000  # single zinger
+    with h5py.File(tmp_path / "raw.h5", "w") as h5file:
+        h5file["sample_1.1/measurement/det"] = stack
+
+    mask_matrix = scan_statistical_mask(
+        str(tmp_path), "raw.h5", "sample_1.1", "det", str(tmp_path), frames_per_read=7
+    )
+
+    assert sorted(zip(*numpy.nonzero(mask_matrix))) == [(1, 2), (3, 4), (5, 6)]
+    assert mask_matrix[1, 2] == DEAD_PIXEL
+    assert mask_matrix[3, 4] == HOT_PIXEL
+    assert mask_matrix[5, 6] == INTERMITTENT_PIXEL
+    assert numpy.array_equal(fabio.open(str(tmp_path / "mask.edf")).data, mask_matrix)
+
+
+def test_stack_statistics_chunked(tmp_path: Path):
+    stack = numpy.random.default_rng(0).poisson(100, (200, 30, 20))
+    stack[::4, 5, 6] += 1000  # intermittent pixel
+    with h5py.File(tmp_path / "raw.h5", "w") as h5file:
+        dataset = h5file.create_dataset("det", data=stack, chunks=(1, 30, 20))
+
+        median, mad, maximum, outlier_fraction = stack_statistics(
+            dataset, sample_frames=50
+        )
+
+    assert numpy.array_equal(maximum, stack.max(axis=0))
+    assert numpy.abs(median - numpy.median(stack, axis=0)).max() < 10
+    assert outlier_fraction[5, 6] == 0.25
+    assert numpy.median(outlier_fraction) == 0
+
+
+def test_stack_statistics_bounded_reads(monkeypatch):
+    class Stack:
+        chunks = (200, 30, 20)  # all the frames in one chunk
+
+        def __init__(self, frames):
+            self.frames = frames
+            self.shape = frames.shape
+            self.reads = []
+
+        def __getitem__(self, index):
+            frames = self.frames[index]
+            self.reads.append(len(frames))
+            return frames
+
+    frames = numpy.random.default_rng(0).poisson(100, (200, 30, 20))
+    stack = Stack(frames)
+    monkeypatch.setattr(
+        "easistrain.func_generate_mask.MAX_VALUES_PER_READ", 10 * 30 * 20
+    )
+
+    _, _, maximum, _ = stack_statistics(stack, sample_frames=8)
+
+    assert stack.reads == [8] + [10] * 20
+    assert numpy.array_equal(maximum, frames.max(axis=0))
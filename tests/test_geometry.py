@@ -0,0 +1,48 @@
+import numpy
+import pytest
+from easistrain.EDD.coordTransformation import transformationMatrix
+from easistrain.geometry import (
+    apply_transformation,
+    homogeneous_matrix,
+    rotation_x,
+    rotation_xyz,
+    rotation_y,
+    rotation_z,
+    transformation_matrix,
+)
+
+
+def test_rotations():
+    angles = numpy.linspace(-numpy.pi, numpy.pi, 7)
+
+    matrices = rotation_xyz(angles, 2 * angles, 0.5)
+
+    assert matrices.shape == (7, 3, 3)
+    for angle, matrix in zip(angles, matrices):
+        expected = rotation_z(0.5) @ rotation_y(2 * angle) @ rotation_x(angle)
+        assert numpy.allclose(matrix, expected)
+        assert numpy.allclose(matrix @ matrix.T, numpy.eye(3))
+    assert numpy.allclose(rotation_z(numpy.pi / 2) @ [1, 0, 0], [0, 1, 0])
+    assert numpy.allclose(rotation_x(numpy.pi / 2) @ [0, 1, 0], [0, 0, 1])
+    assert numpy.allclose(rotation_y(numpy.pi / 2) @ [0, 0, 1], [1, 0, 0])
+
+
+def test_transformations():
+    points = numpy.random.default_rng(0).normal(size=(20, 3))
+    matrix = transformationMatrix(10, -20, 30, 1, 2, 3)
+
+    transformed = apply_transformation(matrix, points)
+
+    for point, transformed_point in zip(points, transformed):
+        assert numpy.allclose(numpy.dot(matrix, [*point, 1])[:3], transformed_point)
+    assert transformation_matrix(10, -20, 30, 1, 2, 3) is transformation_matrix(
+        10, -20, 30, 1, 2, 3
+    )
+    with pytest.raises(ValueError):
+        transformation_matrix(10, -20, 30, 1, 2, 3)[0, 0] = 0
+    # One transformation per point
+    matrices = homogeneous_matrix(rotation_z(numpy.linspace(0, 1, 20)), points)
+    assert numpy.allclose(
+        apply_transformation(matrices, points),
+        numpy.einsum("nij,nj->ni", matrices[:, :3, :3], points) + points,
+    )
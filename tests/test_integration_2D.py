@@ -0,0 +1,171 @@
+from pathlib import Path
+import subprocess
+import sys
+import time
+import h5py
+import numpy
+import pyFAI
+import pytest
+from pyFAI.detectors import Detector
+from easistrain.func_integration_2D import integration_2D_follow
+
+
+def generate_input_files(tmp_path: Path, nb_frames: int):
+    detector = Detector(pixel1=1e-4, pixel2=1e-4, max_shape=(100, 100))
+    ai = pyFAI.AzimuthalIntegrator(
+        dist=0.1, poni1=5e-3, poni2=5e-3, detector=detector, wavelength=1e-10
+    )
+    ai.write(str(tmp_path / "geometry.poni"))
+    with h5py.File(tmp_path / "raw.h5", "w", libver="latest") as h5file:
+        h5file.create_dataset(
+            "sample_1.1/measurement/det",
+            data=numpy.random.poisson(10, (nb_frames, 100, 100)),
+            maxshape=(None, 100, 100),
+        )
+        h5file["sample_1.1/instrument/positioners/sx"] = numpy.arange(nb_frames)
+        h5file["sample_1.1/instrument/positioners/chi"] = 45.0
+        h5file["sample_1.1/end_time"] = "2021-01-01T00:00:00"
+
+
+def test_integration_2D_follow(tmp_path: Path):
+    generate_input_files(tmp_path, 3)
+
+    nb_images = integration_2D_follow(
+        str(tmp_path),
+        "raw.h5",
+        "sample_1.1",
+        "det",
+        str(tmp_path / "geometry.poni"),
+        50,
+        8,
+        "2th_deg",
+        gon1="sx",
+        chiGon1="chi",
+        poll_interval=0.1,
+        timeout=1,
+    )
+
+    assert nb_images == 3
+    with h5py.File(tmp_path / "Results_raw.h5", "r") as h5file:
+        images = h5file["sample_1.1/raw_integration_2D"]
+        assert [name for name in images if name.startswith("image_")] == [
+            "image_00000",
+            "image_00001",
+            "image_00002",
+        ]
+        assert images["image_00002/tth_vs_cts"].shape == (50, 9)
+        assert numpy.array_equal(images["Position/S1"][()], [0, -1, -2])
+        assert images["Position/Chi"][()] == 45
+
+    # A second call only integrates the frames which were not processed yet
+    with h5py.File(tmp_path / "raw.h5", "a") as h5file:
+        h5file["sample_1.1/measurement/det"].resize(4, axis=0)
+    nb_images = integration_2D_follow(
+        str(tmp_path),
+        "raw.h5",
+        "sample_1.1",
+        "det",
+        str(tmp_path / "geometry.poni"),
+        50,
+        8,
+        "2th_deg",
+        poll_interval=0.1,
+        timeout=1,
+    )
+    assert nb_images == 4
+
+
+def test_integration_2D_follow_without_swmr(tmp_path: Path):
+    generate_input_files(tmp_path, 1)
+    writer = subprocess.Popen(  # a writer without SWMR in another process
+        [
+            sys.executable,
+            "-c",
+            "import h5py, sys, time\n"
+            f"f = h5py.File({str(tmp_path / 'raw.h5')!r}, 'a')\n"
+            "print('ready', flush=True)\n"
+            "time.sleep(60)\n",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert writer.stdout.readline().strip() == "ready"
+        with pytest.raises(OSError, match="SWMR mode"):
+            integration_2D_follow(
+                str(tmp_path),
+                "raw.h5",
+                "sample_1.1",
+                "det",
+                str(tmp_path / "geometry.poni"),
+                50,
+                8,
+                "2th_deg",
+                timeout=0,
+            )
+    finally:
+        writer.kill()
+        writer.wait()
+
+
+@pytest.mark.parametrize("end", ["end_time", "npoints"])
+def test_integration_2D_follow_swmr_writer(tmp_path: Path, end: str):
+    generate_input_files(tmp_path, 0)
+    with h5py.File(tmp_path / "raw.h5", "a") as h5file:
+        del h5file["sample_1.1/end_time"]  # the scan is running
+    writer = subprocess.Popen(  # frames written in SWMR mode while they are integrated
+        [
+            sys.executable,
+            "-c",
+            "import h5py, numpy, time\n"
+            f"f = h5py.File({str(tmp_path / 'raw.h5')!r}, 'a', libver='latest')\n"
+            "f.swmr_mode = True\n"
+            "det = f['sample_1.1/measurement/det']\n"
+            "print('ready', flush=True)\n"
+            "for i in range(3):\n"
+            "    time.sleep(0.3)\n"
+            "    det.resize(i + 1, axis=0)\n"
+            "    det[i] = numpy.full((100, 100), i + 1)\n"
+            "    det.flush()\n"
+            "f.close()\n"
+            # end of the scan: end_time cannot be created in SWMR mode
+            f"while {end == 'end_time'}:\n"
+            "    try:\n"
+            f"        f = h5py.File({str(tmp_path / 'raw.h5')!r}, 'a')\n"
+            "    except OSError:  # opened by the reader\n"
+            "        time.sleep(0.01)\n"
+            "        continue\n"
+            "    f['sample_1.1/end_time'] = '2021-01-01T00:00:00'\n"
+            "    f.close()\n"
+            "    break\n"
+            "time.sleep(60)\n",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert writer.stdout.readline().strip() == "ready"
+        start = time.time()
+        nb_images = integration_2D_follow(
+            str(tmp_path),
+            "raw.h5",
+            "sample_1.1",
+            "det",
+            str(tmp_path / "geometry.poni"),
+            50,
+            8,
+            "2th_deg",
+            poll_interval=0.05,
+            timeout=30,
+            npoints=3 if end == "npoints" else None,
+            results_file=str(tmp_path / "results.h5"),
+        )
+        # The end of the scan is seen, the follow mode does not wait for the timeout
+        assert time.time() - start < 15
+    finally:
+        writer.kill()
+        writer.wait()
+
+    assert nb_images == 3
+    with h5py.File(tmp_path / "results.h5", "r") as h5file:
+        assert "image_00002" in h5file["sample_1.1/raw_integration_2D"]
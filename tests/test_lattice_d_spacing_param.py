@@ -0,0 +1,52 @@
+from pathlib import Path
+import h5py
+import numpy
+import pyFAI
+from pyFAI.detectors import Detector
+from easistrain.func_lattice_d_spacing_param import (
+    lattice_param,
+    lattice_param_summary,
+)
+
+
+def generate_input_files(tmp_path: Path):
+    detector = Detector(pixel1=1e-4, pixel2=1e-4, max_shape=(100, 100))
+    ai = pyFAI.AzimuthalIntegrator(dist=0.1, detector=detector, wavelength=1e-10)
+    ai.write(str(tmp_path / "geometry.poni"))
+    rng = numpy.random.default_rng(0)
+    with h5py.File(tmp_path / "Results_raw.h5", "w") as h5file:
+        for scan in ("sample_1.1", "sample_2.1"):
+            for i, nb_points in enumerate((8, 0, 5)):
+                image = h5file.create_group(
+                    f"{scan}/fitting_HKL=(111)_cleaned/image_{i:05d}"
+                )
+                image["tth_position_cleaned"] = rng.uniform(20, 21, nb_points).astype(
+                    "f"
+                )
+                image["chi_cleaned"] = numpy.arange(nb_points, dtype="f")
+
+
+def test_lattice_param_summary(tmp_path: Path):
+    generate_input_files(tmp_path)
+    poni_file = str(tmp_path / "geometry.poni")
+
+    lattice_param(str(tmp_path), "raw.h5", poni_file, 1, 1, 1)
+    lattice_param_summary(str(tmp_path), "raw.h5", poni_file, 1, 1, 1)
+
+    with h5py.File(tmp_path / "Results_raw.h5", "r") as h5file:
+        for scan in ("sample_1.1", "sample_2.1"):
+            summary = h5file[f"{scan}/latt_param_d_spacing_(111)_summary"]
+            assert summary["index"][()].tolist() == [0, 8, 8, 13]
+            for i, image in enumerate(summary["image"].asstr()[()]):
+                per_image = h5file[f"{scan}/latt_param_d_spacing_(111)/{image}"]
+                start, stop = summary["index"][i : i + 2]
+                for name in ("d_spacing", "latt_param"):
+                    assert numpy.array_equal(
+                        summary[name][start:stop], per_image[name][()]
+                    )
+                    for stat in ("mean", "std"):
+                        assert numpy.allclose(
+                            summary[f"{name}_{stat}"][i],
+                            per_image[f"{name}_{stat}"][()],
+                            equal_nan=True,
+                        )